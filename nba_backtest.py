@@ -0,0 +1,255 @@
+"""Historical backtest of the pin handler's hit-rate signals.
+
+Stored game logs are replayed oldest game first. Before every game the
+signals the pin handler would have shown for each stat × line are rebuilt
+from the prior games only — L5 / L10 over-%, their average, the current
+streak and the L5-vs-L10 trend arrow — and scored against what actually
+happened in that game.
+
+Every signal is a rolling window over cumulative sums along the game axis of
+one (series, games, lines) array per stat, so a whole season costs a few
+NumPy passes per stat instead of a DataFrame slice per player and date.
+A series is one player's season: windows never reach into the previous
+season, just as the dashboard's log doesn't.
+
+Only lines a book would plausibly post are scored — within BAND of the
+player's prior L10 average, and at least MIN_BAND — so lines like PTS 0.5
+don't flood the 100% buckets.
+
+    python nba_backtest.py --season 2025-26 [--stat PTS --stat REB ...]
+    python nba_backtest.py --synthetic      # timing on a generated season
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import nba_hitrate
+
+WINDOWS = (5, 10)
+MIN_GAMES = 5      # prior games before a game is scored
+BAND = 0.35        # scored lines: prior L10 average ± BAND × that average …
+MIN_BAND = 1.5     # … but never narrower than this
+STREAK_CAP = 8     # longer streaks share the last bucket
+SIGNALS = ["L5", "L10", "AVG_O", "PICK", "STREAK", "TREND"]
+
+
+def stack_chronological(frame: pd.DataFrame, stats: list, key=("PLAYER_ID", "SEASON_ID")):
+    """(values, n_games): values is (series, games, stats), oldest game first and
+    NaN-padded after each series' last game; one series per key (player × season)."""
+    cols = [k for k in key if k in frame.columns]
+    series = frame.groupby(cols, sort=False, observed=True).ngroup()
+    _, newest_first, n_games = nba_hitrate.stack_logs(frame.assign(_SERIES=series), stats, key="_SERIES")
+    idx = n_games[:, None] - 1 - np.arange(newest_first.shape[1])[None, :]
+    values = np.take_along_axis(newest_first, np.maximum(idx, 0)[..., None], axis=1)
+    values[idx < 0] = np.nan
+    return values, n_games
+
+
+def signals(v: np.ndarray, lines, windows=WINDOWS) -> dict:
+    """Pin-handler signals before every game, for one stat.
+
+    v is (series, games), oldest first; entry t of every output only uses
+    games 0..t-1. Returns over (the result of game t itself), rates (…, windows),
+    avg_o, streak_over, streak_count and trend, each (series, games, lines),
+    plus avg10 (series, games): the average over the last 10 prior games.
+    """
+    lines = np.asarray(lines, dtype=float)
+    n_series, depth = v.shape
+    t = np.arange(depth)
+    over = v[..., None] > lines   # NaN compares False, as in nba_hitrate.over_mask
+
+    # counts[:, t] = overs in games 0..t-1; a window is the difference of two counts
+    counts = np.zeros((n_series, depth + 1, len(lines)), np.int16)
+    np.cumsum(over, axis=1, dtype=np.int16, out=counts[:, 1:])
+    rates = np.full(over.shape + (len(windows),), np.nan, np.float32)
+    for j, w in enumerate(windows):
+        if w < depth:   # a shorter log has no full window (and :depth - w would wrap)
+            rates[:, w:, :, j] = (counts[:, w:depth] - counts[:, :depth - w]) * (100 / w)
+
+    # Run length ending at each game; the streak shown before game t is the run ending at t-1
+    change = np.ones_like(over)
+    change[:, 1:] = over[:, 1:] != over[:, :-1]
+    start = np.maximum.accumulate(np.where(change, t[None, :, None], 0), axis=1)
+    streak_over = np.zeros_like(over)
+    streak_over[:, 1:] = over[:, :-1]
+    streak_count = np.zeros(over.shape, np.int16)
+    streak_count[:, 1:] = (t[None, :, None] - start + 1)[:, :-1]
+
+    # Trend: L5 vs L10 averages, games 6..n standing in for L10 below 10 games
+    sums = np.zeros((n_series, depth + 1))
+    np.cumsum(np.nan_to_num(v), axis=1, out=sums[:, 1:])
+    l5 = np.full(v.shape, np.nan)
+    l10 = np.full(v.shape, np.nan)
+    for avg, w in [(l5, 5), (l10, 10)]:
+        if w < depth:
+            avg[:, w:] = (sums[:, w:depth] - sums[:, :depth - w]) / w
+    early = t[6:10]
+    l10[:, early] = sums[:, early - 5] / (early - 5)
+    diff = (l5 - l10)[..., None]
+    threshold = np.maximum(lines * 0.08, 0.5)
+    trend = np.where(diff > threshold, 1, np.where(diff < -threshold, -1, 0)).astype(np.int8)
+    trend[:, :6] = 0
+
+    k = np.minimum(t, 10)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg10 = (sums[:, t] - sums[:, t - k]) / k
+    return {
+        "over": over,
+        "rates": rates,
+        "avg_o": nba_hitrate.avg_over(rates),
+        "streak_over": streak_over,
+        "streak_count": streak_count,
+        "trend": trend,
+        "avg10": avg10,
+    }
+
+
+def _buckets(values: np.ndarray, step: int) -> np.ndarray:
+    return (np.floor(np.nan_to_num(values) / step) * step).astype(int)
+
+
+def _score_stat(v, n_games, lines, windows, min_games, band) -> list:
+    """(SIGNAL, BUCKET, N, PRED_SUM, HIT_SUM) rows for one stat."""
+    sig = signals(v, lines, windows)
+    depth = v.shape[1]
+    played = (np.arange(depth)[None, :] < n_games[:, None]) & ~np.isnan(v)
+    played[:, :min_games] = False
+    avg10 = sig["avg10"][..., None]
+    scored = played[..., None] & (np.abs(lines - avg10) <= np.maximum(avg10 * band, MIN_BAND))
+    if not scored.any():
+        return []
+
+    hit = sig["over"][scored].astype(float) * 100
+    avg = sig["avg_o"][scored]
+    pick_over = avg >= 50
+    confidence = np.where(pick_over, avg, 100 - avg)
+    won = np.where(pick_over, hit, 100 - hit)
+    streak = np.minimum(sig["streak_count"][scored], STREAK_CAP)
+    side = np.where(sig["streak_over"][scored], "O", "U")
+    by_signal = {
+        "AVG_O": (_buckets(avg, 10), avg, hit),
+        "PICK": (_buckets(confidence, 5), confidence, won),
+        "STREAK": (np.char.add(side, np.where(streak == STREAK_CAP, f"{STREAK_CAP}+", streak.astype(str))),
+                   None, hit),
+        "TREND": (np.array(["↓", "→", "↑"])[sig["trend"][scored] + 1], None, hit),
+    }
+    for j, w in enumerate(windows):
+        rate = sig["rates"][..., j][scored]
+        by_signal[f"L{w}"] = (_buckets(rate, 10), rate, hit)
+
+    rows = []
+    for name, (bucket, pred, outcome) in by_signal.items():
+        if pred is not None:
+            # windows longer than the prior log are dropped, as in the pin handler
+            ok = ~np.isnan(pred)
+            bucket, pred, outcome = bucket[ok], pred[ok], outcome[ok]
+        labels, codes = np.unique(bucket, return_inverse=True)
+        n = np.bincount(codes)
+        pred_sum = np.bincount(codes, weights=pred) if pred is not None else np.full(len(n), np.nan)
+        hit_sum = np.bincount(codes, weights=outcome)
+        rows += [(name, label, c, p, h) for label, c, p, h in zip(labels, n, pred_sum, hit_sum)]
+    return rows
+
+
+def backtest(frame: pd.DataFrame, stats: list, lines, windows=WINDOWS, min_games: int = MIN_GAMES,
+             band: float = BAND, by_stat: bool = False, key=("PLAYER_ID", "SEASON_ID")) -> pd.DataFrame:
+    """Calibration of every pin signal over a stacked multi-player log.
+
+    Every (player season, game, stat, line) with min_games prior games and a
+    line inside the band is one observation. Returns SIGNAL, BUCKET, N,
+    PRED (mean signal %, NaN for STREAK / TREND) and HIT (% of observations
+    that went over — for PICK, % that landed on the picked side), plus STAT
+    when by_stat. Buckets: L5 / L10 / AVG_O floored to 10 %, PICK (the
+    scanner's side at max(AVG_O, 100 - AVG_O)) to 5 %, STREAK as O3 / U8+,
+    TREND as the arrow.
+    """
+    columns = (["STAT"] if by_stat else []) + ["SIGNAL", "BUCKET", "N", "PRED", "HIT"]
+    stats = [s for s in stats if s in frame.columns]
+    if frame.empty or not stats:
+        return pd.DataFrame(columns=columns)
+    values, n_games = stack_chronological(frame, stats, key)
+    lines = np.asarray(lines, dtype=float)
+    rows = []
+    for j, stat in enumerate(stats):
+        rows += [(stat, *row) for row in _score_stat(values[..., j], n_games, lines, windows, min_games, band)]
+    if not rows:
+        return pd.DataFrame(columns=columns)
+
+    table = pd.DataFrame(rows, columns=["STAT", "SIGNAL", "BUCKET", "N", "PRED", "HIT"])
+    table["BUCKET"] = table["BUCKET"].astype(str)
+    keys = (["STAT"] if by_stat else []) + ["SIGNAL", "BUCKET"]
+    table = table.groupby(keys, sort=False, as_index=False)[["N", "PRED", "HIT"]].sum(min_count=1)
+    table["PRED"] /= table["N"]
+    table["HIT"] /= table["N"]
+    order = table["SIGNAL"].map({s: i for i, s in enumerate(SIGNALS)})
+    numeric = pd.to_numeric(table["BUCKET"], errors="coerce")
+    table = table.assign(_order=order, _num=numeric).sort_values(keys[:-2] + ["_order", "_num", "BUCKET"])
+    return table.drop(columns=["_order", "_num"]).reset_index(drop=True)[columns]
+
+
+def calibration_error(table: pd.DataFrame) -> pd.Series:
+    """N-weighted mean |PRED - HIT| per signal (percentage points), for the signals that predict a rate."""
+    rated = table.dropna(subset=["PRED"])
+    gap = (rated["PRED"] - rated["HIT"]).abs() * rated["N"]
+    keys = [c for c in ("STAT", "SIGNAL") if c in rated.columns]
+    return gap.groupby([rated[k] for k in keys], sort=False).sum() / rated.groupby(keys, sort=False)["N"].sum()
+
+
+def load_season(season: str) -> pd.DataFrame:
+    """Every stored game log of a season (all season types) with the combo stats added."""
+    import nba_store
+
+    frame = nba_store.read_season(season)
+    if frame.empty:
+        return frame
+    frame = frame.drop_duplicates(subset=["PLAYER_ID", "GAME_ID"])
+    return nba_hitrate.add_derived_stats(frame)
+
+
+def synthetic_season(n_players: int = 450, n_games: int = 82, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    form = rng.gamma(4, 0.25, (n_players, 1)) * (1 + 0.15 * np.sin(np.arange(n_games) / 9))[None, :]
+    frame = pd.DataFrame({
+        "PLAYER_ID": np.repeat(np.arange(n_players).astype(str), n_games),
+        "SEASON_ID": "22025",
+        "GAME_DATE_DT": np.tile(pd.date_range("2025-10-21", periods=n_games, freq="2D").values, n_players),
+        **{c: rng.poisson(lam * form.ravel()) for c, lam in
+           [("PTS", 15), ("REB", 5), ("AST", 4), ("STL", 1), ("BLK", 1), ("TOV", 2), ("FGM", 6),
+            ("FGA", 13), ("FG3M", 2), ("FG3A", 5)]},
+    })
+    return nba_hitrate.add_derived_stats(frame)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest the pin handler's hit-rate signals on stored game logs")
+    parser.add_argument("--season", help="season to replay, e.g. 2025-26 (default: current)")
+    parser.add_argument("--stat", action="append", help="default: every dashboard stat")
+    parser.add_argument("--by-stat", action="store_true", help="one calibration table per stat")
+    parser.add_argument("--synthetic", action="store_true", help="generated 450-player season instead of the store")
+    parser.add_argument("--out", help="write the table to this CSV")
+    args = parser.parse_args()
+
+    stats = args.stat or ["PTS", "FG3M", "AST", "REB", "Ast+Reb", "STL", "BLK", "TOV", "FGM", "FGA",
+                          "FG3A", "2PM", "2PA", "Pts+Reb", "Pts+Ast", "Stl+Blk", "PRA"]
+    if args.synthetic:
+        frame = synthetic_season()
+    else:
+        import nba_data
+        frame = load_season(args.season or nba_data.CURRENT_SEASON)
+        if frame.empty:
+            raise SystemExit("No stored game logs for that season — load some players (or run the bulk loader) first")
+
+    started = time.perf_counter()
+    table = backtest(frame, stats, np.arange(0.5, 60.6, 1.0), by_stat=args.by_stat)
+    elapsed = time.perf_counter() - started
+    n_series = frame.groupby([c for c in ("PLAYER_ID", "SEASON_ID") if c in frame.columns]).ngroups
+    print(f"{n_series} player seasons, {len(frame)} games, {len(stats)} stats → "
+          f"{int(table.loc[table['SIGNAL'] == 'L5', 'N'].sum())} scored props in {elapsed:.1f} s")
+    with pd.option_context("display.max_rows", None, "display.width", 120):
+        print(table.round(1).to_string(index=False))
+        print("\nCalibration error (pp):")
+        print(calibration_error(table).round(1).to_string())
+    if args.out:
+        table.to_csv(args.out, index=False)
@@ -0,0 +1,297 @@
+"""End-to-end benchmark of the dashboard pipeline.
+
+Drives nba_wrk.py headlessly with Streamlit's AppTest against a recorded
+nba_api archive (see nba_replay) and reports wall time per scenario and per
+page section (nba_metrics laps), plus allocations from one extra traced pass.
+
+    NBA_API_MODE=record streamlit run nba_wrk.py      # once: click through a slate
+    python nba_bench.py [--repeat 5] [--out bench.json] [--compare old.json]
+                        [--scenario cold_start --scenario board_50 ...]
+
+Scenarios:
+    cold_start     first page load, every cache, in-process memo and the game-log store empty
+    warm_start     new session, caches warm
+    player_switch  player A loaded → select player B
+    add_line       player loaded → pick a line for the stat
+    board_50       first load of a URL carrying a 50-prop board
+    board_50_rerun rerun with that board already in the session
+
+The nba_api rate limiter is off unless NBA_API_MAX_RPS is set, so the numbers
+measure this code rather than the throttle; NBA_REPLAY_LATENCY adds upstream
+latency back in. Results go to JSON (meta + per-scenario medians) so runs can be compared
+across commits with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# Replay recorded data into a throwaway store before any nba_* module reads its env
+os.environ.setdefault("NBA_API_MODE", "replay")
+os.environ.setdefault("NBA_CACHE_BACKEND", "memory")
+os.environ.setdefault("NBA_API_MAX_RPS", "0")
+os.environ.pop("NBA_PREFETCH", None)
+STORE_DIR = os.environ.setdefault("NBA_STORE_DIR", tempfile.mkdtemp(prefix="nba_bench_store_"))
+os.environ.setdefault("NBA_PREFETCH_STATUS", os.path.join(STORE_DIR, "prefetch.json"))
+
+import pandas as pd
+import streamlit as st
+from streamlit import logger as st_logger
+from streamlit.testing.v1 import AppTest
+
+import nba_board
+import nba_cache
+import nba_data
+import nba_defense
+import nba_metrics
+import nba_players
+import nba_projection
+import nba_replay
+
+st_logger.set_log_level("error")   # widget-label warnings would drown the report
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nba_wrk.py")
+TIMEOUT = 300
+
+
+def reset_caches():
+    """Empties st.cache_*, the shared cache, the on-disk game-log store and the
+    in-process memos (defense matrices, projection parameters, lru_caches)."""
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    nba_cache.set_backend(nba_cache.MemoryBackend())
+    with nba_defense._memo_lock:
+        nba_defense._memo.clear()
+        nba_defense._build_locks.clear()
+    with nba_projection._params_lock:
+        nba_projection._params.clear()
+    for fn in (nba_data.get_team_abbr_map, nba_players.get_index, nba_players._folded_ids):
+        fn.cache_clear()
+    shutil.rmtree(STORE_DIR, ignore_errors=True)
+    os.makedirs(STORE_DIR, exist_ok=True)
+
+
+def new_app(board: str = None) -> AppTest:
+    at = AppTest.from_file(APP, default_timeout=TIMEOUT)
+    if board:
+        at.query_params["board"] = board
+    return at
+
+
+def player_options(n: int) -> list:
+    """(display, pid, team) for n rostered players, in a stable order."""
+    team_map = nba_data.get_active_players_with_teams()
+    name_by_id = nba_players.get_index().name_by_id
+    pids = sorted(p for p in team_map if p in name_by_id)[:n]
+    if len(pids) < n:
+        raise SystemExit("No roster in the recorded data — record a session that loads the player list")
+    return [(f"{name_by_id[p]} • {team_map[p]}", p, team_map[p]) for p in pids]
+
+
+def board_param(n: int) -> str:
+    name_by_id = nba_players.get_index().name_by_id
+    stats = ["PTS", "REB", "AST", "PRA", "FG3M"]
+    board = []
+    for i, (_, pid, team) in enumerate(player_options(n)):
+        board.append({
+            "player": name_by_id[pid], "player_id": pid, "team": team, "matchup": f"Game {i % 6}",
+            "stat": stats[i % len(stats)], "line": f"{5 + i % 20}.5", "odds": "-110",
+            "timestamp": datetime.now(), "sort_order": i,
+        })
+    return nba_board.encode(board)
+
+
+# ── Scenarios: each returns (setup, step); only step is measured ────────────────
+def _select_player(at, display):
+    at.selectbox(key="player_select").set_value(display).run()
+
+
+def scenario_cold_start():
+    holder = {}
+
+    def setup():
+        reset_caches()
+        holder["at"] = new_app()
+    return setup, lambda: holder["at"].run()
+
+
+def scenario_warm_start():
+    holder = {}
+
+    def setup():
+        new_app().run()
+        holder["at"] = new_app()
+    return setup, lambda: holder["at"].run()
+
+
+def scenario_player_switch():
+    holder = {}
+    (first, _, _), (second, _, _) = player_options(2)
+
+    def setup():
+        at = new_app()
+        at.run()
+        _select_player(at, first)
+        holder["at"] = at
+    return setup, lambda: _select_player(holder["at"], second)
+
+
+def scenario_add_line():
+    holder = {}
+    display = player_options(1)[0][0]
+
+    def setup():
+        at = new_app()
+        at.run()
+        _select_player(at, display)
+        holder["at"] = at
+    return setup, lambda: holder["at"].selectbox(key="line_key").set_value(14.5).run()
+
+
+def scenario_board_50():
+    holder = {}
+    board = board_param(50)
+
+    def setup():
+        holder["at"] = new_app(board)
+    return setup, lambda: holder["at"].run()
+
+
+def scenario_board_50_rerun():
+    holder = {}
+    board = board_param(50)
+
+    def setup():
+        at = new_app(board)
+        at.run()
+        holder["at"] = at
+    return setup, lambda: holder["at"].run()
+
+
+SCENARIOS = {
+    "cold_start": scenario_cold_start,
+    "warm_start": scenario_warm_start,
+    "player_switch": scenario_player_switch,
+    "add_line": scenario_add_line,
+    "board_50": scenario_board_50,
+    "board_50_rerun": scenario_board_50_rerun,
+}
+
+
+# ── Measurement ─────────────────────────────────────────────────────────────────
+def _merge_sections(runs: list) -> dict:
+    merged = {}
+    for run in runs:
+        for name, stats in run["sections"].items():
+            into = merged.setdefault(name, {})
+            for k, v in stats.items():
+                into[k] = max(into.get(k, 0), v) if k == "alloc_peak_kb" else into.get(k, 0) + v
+    return merged
+
+
+def measure(step) -> dict:
+    seq = nba_metrics.last_seq()
+    t0 = time.perf_counter()
+    step()
+    wall = (time.perf_counter() - t0) * 1000
+    runs = nba_metrics.recent_runs(since=seq)
+    return {"wall_ms": wall, "runs": len(runs), "sections": _merge_sections(runs)}
+
+
+def run_scenario(name: str, repeat: int) -> dict:
+    setup, step = SCENARIOS[name]()
+    samples = []
+    for _ in range(repeat):
+        setup()
+        samples.append(measure(step))
+
+    # Allocation pass — tracemalloc slows everything down, so it is kept out of the timings
+    setup()
+    tracemalloc.start()
+    try:
+        traced = measure(step)
+    finally:
+        tracemalloc.stop()
+
+    walls = [s["wall_ms"] for s in samples]
+    sections = {}
+    for sec in samples[-1]["sections"]:
+        sec_walls = [s["sections"].get(sec, {}).get("wall_ms", 0.0) for s in samples]
+        sections[sec] = {
+            "wall_ms": statistics.median(sec_walls),
+            "alloc_net_kb": traced["sections"].get(sec, {}).get("alloc_net_kb"),
+            "alloc_peak_kb": traced["sections"].get(sec, {}).get("alloc_peak_kb"),
+        }
+    return {
+        "wall_ms": {"median": statistics.median(walls), "min": min(walls), "max": max(walls)},
+        "script_runs": samples[-1]["runs"],
+        "alloc_peak_kb": max((s.get("alloc_peak_kb", 0) for s in traced["sections"].values()), default=0),
+        "sections": sections,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(APP), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(results: dict, baseline: dict = None):
+    base = (baseline or {}).get("scenarios", {})
+    for name, res in results["scenarios"].items():
+        med = res["wall_ms"]["median"]
+        line = f"{name:<16} {med:9.1f} ms  (min {res['wall_ms']['min']:.1f}, peak {res['alloc_peak_kb'] / 1024:.1f} MB)"
+        if name in base:
+            old = base[name]["wall_ms"]["median"]
+            line += f"  {(med - old) / old * 100:+.0f}% vs {baseline['meta']['commit']}"
+        print(line)
+        for sec, s in sorted(res["sections"].items(), key=lambda kv: -kv[1]["wall_ms"]):
+            alloc = f"{s['alloc_net_kb']:+10.0f} KB net {s['alloc_peak_kb']:8.0f} KB peak" if s["alloc_net_kb"] is not None else ""
+            print(f"    {sec:<14} {s['wall_ms']:9.1f} ms  {alloc}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard against recorded nba_api data")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="default: all")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="result JSON (default bench-<commit>.json)")
+    parser.add_argument("--compare", help="earlier result JSON to diff against")
+    args = parser.parse_args()
+    if nba_replay.MODE == "replay" and not os.path.exists(nba_replay.ARCHIVE):
+        raise SystemExit(f"No nba_api recordings at {nba_replay.ARCHIVE} — see NBA_API_MODE=record in nba_replay")
+
+    commit = _git_commit()
+    results = {
+        "meta": {
+            "commit": commit,
+            "when": datetime.now().isoformat(timespec="seconds"),
+            "repeat": args.repeat,
+            "api_mode": os.environ["NBA_API_MODE"],
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "streamlit": st.__version__,
+        },
+        "scenarios": {},
+    }
+    for name in args.scenario or SCENARIOS:
+        results["scenarios"][name] = run_scenario(name, args.repeat)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    out = args.out or f"bench-{commit}.json"
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"→ {out}")
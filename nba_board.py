@@ -0,0 +1,275 @@
+"""Pinned-prop board: the in-session model, its compact URL encoding and an
+optional server-side store.
+
+A board entry keeps raw fields only — player id, team, matchup, stat, line,
+odds, sort order, pin time and the numeric hit-rate snapshot (rates, avg_o,
+min_avg, streak, trend). The dashboard rebuilds the HTML at render time.
+The GAME_ID a snapshot was computed against (computed_game) is not encoded:
+a restored board is recomputed against the current logs on first render.
+
+Wire format (urlsafe base64, no padding):
+    VERSION byte + zlib( string table + fixed-size records )
+Strings (names, teams, matchups, stats, odds) are stored once and referenced by
+index; a player name that nba_players resolves from the id is stored as "".
+
+The legacy format — base64(JSON list of entries, with pre-rendered
+hitrate_str) — is still decoded; such entries lack "rates" (see needs_stats).
+
+NBA_BOARD_STORE=cache keeps the encoded board in nba_cache under a short id so
+the URL stays constant-size (shared across replicas with a sqlite/redis backend).
+"""
+import base64
+import hashlib
+import json
+import math
+import os
+import struct
+import zlib
+from datetime import datetime
+
+import nba_cache
+import nba_players
+
+VERSION = 2
+STORE = os.environ.get("NBA_BOARD_STORE", "url")   # url | cache
+STORE_TTL = float(os.environ.get("NBA_BOARD_STORE_TTL", str(30 * 86400)))
+
+# player_id, name, team, matchup, stat, odds (string-table indexes),
+# line ×10, L5, L10, avg_o (0-100, 255 = n/a), min_avg ×10 (65535 = n/a),
+# streak (+over / −under), trend, sort_order, pinned-at epoch seconds
+_RECORD = struct.Struct("<IHHHHHhBBBHbbHI")
+_NA8 = 255
+_NA16 = 65535
+
+
+def needs_stats(entry: dict) -> bool:
+    """True for entries without a numeric hit-rate snapshot (legacy boards)."""
+    return not isinstance(entry.get("rates"), list)
+
+
+# ── Board model ─────────────────────────────────────────────────────────────────
+def prop_key(entry) -> tuple:
+    return (entry["player"], entry["stat"], entry["line"])
+
+
+def odds_multiplier(odds) -> float:
+    """Decimal payout of American odds ("+150" → 2.5); 1.0 when blank, None when unreadable."""
+    if not odds or not str(odds).strip():
+        return 1.0
+    try:
+        val = float(str(odds).replace("+", ""))
+    except ValueError:
+        return None
+    return (val / 100 + 1) if val > 0 else (100 / abs(val) + 1)
+
+
+class Board:
+    """Pinned props, indexed by (player, stat, line) with an ordered list and a
+    parlay payout per matchup. Mutations only touch the affected matchup.
+
+    Iterates (and serializes) like the plain list of entry dicts it wraps.
+    """
+
+    def __init__(self, entries=()):
+        self._by_key = {}
+        self._groups = {}    # matchup → entries ordered by sort_order
+        self._payouts = {}   # matchup → parlay multiplier
+        for i, e in enumerate(sorted(entries, key=lambda e: e.get("sort_order", 0))):
+            e.setdefault("sort_order", i)
+            if prop_key(e) not in self._by_key:
+                self._by_key[prop_key(e)] = e
+                self._groups.setdefault(e.get("matchup"), []).append(e)
+        for matchup in self._groups:
+            self._reprice(matchup)
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def __iter__(self):
+        return iter(list(self._by_key.values()))
+
+    def __contains__(self, key):
+        return key in self._by_key
+
+    def _reprice(self, matchup):
+        multiplier = 1.0
+        for e in self._groups.get(matchup, ()):
+            m = odds_multiplier(e.get("odds"))
+            if m is None:   # one unreadable price voids the parlay, as before
+                multiplier = 1.0
+                break
+            multiplier *= m
+        self._payouts[matchup] = multiplier
+
+    def matchups(self) -> list:
+        return sorted(self._groups, key=str)
+
+    def group(self, matchup) -> list:
+        return self._groups.get(matchup, [])
+
+    def payout(self, matchup) -> float:
+        return self._payouts.get(matchup, 1.0)
+
+    def add(self, entry: dict) -> bool:
+        """Appends entry to its matchup; False if that (player, stat, line) is already pinned."""
+        key = prop_key(entry)
+        if key in self._by_key:
+            return False
+        group = self._groups.setdefault(entry.get("matchup"), [])
+        entry.setdefault("sort_order", max((e["sort_order"] for e in self._by_key.values()), default=-1) + 1)
+        self._by_key[key] = entry
+        group.append(entry)
+        self._reprice(entry.get("matchup"))
+        return True
+
+    def remove(self, key: tuple) -> bool:
+        """Drops one prop; True if its matchup group is now empty."""
+        entry = self._by_key.pop(key, None)
+        if entry is None:
+            return False
+        matchup = entry.get("matchup")
+        group = self._groups[matchup]
+        group.remove(entry)
+        if group:
+            self._reprice(matchup)
+            return False
+        del self._groups[matchup], self._payouts[matchup]
+        return True
+
+    def remove_group(self, matchup):
+        for e in self._groups.pop(matchup, ()):
+            del self._by_key[prop_key(e)]
+        self._payouts.pop(matchup, None)
+
+    def move(self, key: tuple, direction: int):
+        """Swaps a prop with its neighbour (direction −1 up, +1 down) within its matchup."""
+        entry = self._by_key.get(key)
+        if entry is None:
+            return
+        group = self._groups[entry.get("matchup")]
+        i = group.index(entry)
+        j = i + direction
+        if 0 <= j < len(group):
+            other = group[j]
+            entry["sort_order"], other["sort_order"] = other["sort_order"], entry["sort_order"]
+            group[i], group[j] = other, entry
+
+
+# ── Binary codec ────────────────────────────────────────────────────────────────
+def _pct(x):
+    return _NA8 if x is None or math.isnan(x) else max(0, min(100, round(x)))
+
+
+def _unpct(b):
+    return None if b == _NA8 else float(b)
+
+
+def _streak_code(streak: str) -> int:
+    if not streak:
+        return 0
+    n = min(int(streak[1:] or 0), 127)
+    return n if streak[0] == "O" else -n
+
+
+def _streak_str(code: int) -> str:
+    return f"O{code}" if code > 0 else f"U{-code}" if code < 0 else ""
+
+
+def encode(board: list) -> str:
+    strings, index = [], {}
+
+    def ref(s):
+        s = "" if s is None else str(s)
+        if s not in index:
+            index[s] = len(strings)
+            strings.append(s)
+        return index[s]
+
+    records = []
+    for e in board:
+        pid = int(e.get("player_id") or 0)
+        name = "" if pid and nba_players.get_player_name(pid) == e["player"] else e["player"]
+        rates = (list(e.get("rates") or []) + [None, None])[:2]
+        ts = e.get("timestamp")
+        min_avg = e.get("min_avg")
+        records.append(_RECORD.pack(
+            pid, ref(name), ref(e.get("team")), ref(e.get("matchup")), ref(e["stat"]), ref(e.get("odds")),
+            round(float(e["line"]) * 10),
+            _pct(rates[0]), _pct(rates[1]), _pct(e.get("avg_o")),
+            _NA16 if min_avg is None or math.isnan(min_avg) else min(_NA16 - 1, round(min_avg * 10)),
+            _streak_code(e.get("streak")), int(e.get("trend") or 0),
+            int(e.get("sort_order", 0)), int(ts.timestamp()) if isinstance(ts, datetime) else 0,
+        ))
+
+    table = "\0".join(strings).encode()
+    payload = struct.pack("<HI", len(records), len(table)) + table + b"".join(records)
+    raw = bytes([VERSION]) + zlib.compress(payload, 9)
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_v2(payload: bytes) -> list:
+    count, table_len = struct.unpack_from("<HI", payload)
+    offset = 6 + table_len
+    if len(payload) != offset + count * _RECORD.size:
+        raise ValueError("truncated or padded board payload")
+    strings = payload[6:offset].decode().split("\0")
+    board = []
+    for rec in _RECORD.iter_unpack(payload[offset:]):
+        pid, name, team, matchup, stat, odds, line10, l5, l10, avg_o, min_avg, streak, trend, order, ts = rec
+        board.append({
+            "player": strings[name] or nba_players.get_player_name(pid) or "",
+            "player_id": str(pid) if pid else None,
+            "team": strings[team],
+            "matchup": strings[matchup],
+            "stat": strings[stat],
+            "line": f"{line10 / 10:.1f}",
+            "odds": strings[odds],
+            "timestamp": datetime.fromtimestamp(ts) if ts else None,
+            "sort_order": order,
+            "rates": [_unpct(l5), _unpct(l10)],
+            "avg_o": _unpct(avg_o),
+            "min_avg": None if min_avg == _NA16 else min_avg / 10,
+            "streak": _streak_str(streak),
+            "trend": trend,
+        })
+    return board
+
+
+def _decode_legacy(raw: bytes) -> list:
+    data = json.loads(raw.decode())
+    for entry in data:
+        if isinstance(entry.get("timestamp"), str):
+            try:
+                entry["timestamp"] = datetime.fromisoformat(entry["timestamp"])
+            except Exception:
+                pass
+    return data
+
+
+def decode(value: str) -> list:
+    """Board from either wire format; [] if it cannot be read."""
+    try:
+        raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+        if raw[:1] == bytes([VERSION]):
+            return _decode_v2(zlib.decompress(raw[1:]))
+        return _decode_legacy(raw)
+    except Exception:
+        return []
+
+
+# ── Server-side store ───────────────────────────────────────────────────────────
+def _store_key(board_id: str) -> str:
+    return f"nba:board:{board_id}"
+
+
+def save(board: list) -> str:
+    """Stores the encoded board in nba_cache → short content-addressed id."""
+    encoded = encode(board).encode()
+    board_id = base64.urlsafe_b64encode(hashlib.blake2b(encoded, digest_size=6).digest()).decode()
+    nba_cache.get_backend().set(_store_key(board_id), encoded, STORE_TTL)
+    return board_id
+
+
+def load(board_id: str) -> list:
+    raw = nba_cache.get_backend().get(_store_key(board_id))
+    return decode(raw.decode()) if raw else []
@@ -0,0 +1,255 @@
+"""Pluggable cache shared across processes and replicas.
+
+Backends (NBA_CACHE_BACKEND):
+    memory  in-process LRU (default; one copy per process, like st.cache_data)
+    sqlite  local file at NBA_CACHE_URL — shared by every process on the host
+    redis   Redis-protocol server at NBA_CACHE_URL — shared by every replica
+
+DataFrames are stored as Arrow IPC streams, anything else is pickled. Misses
+are coalesced: one thread per process computes a key, and across processes the
+backend's lock lets only one fetch run while the others wait for its result.
+"""
+import contextlib
+import functools
+import hashlib
+import io
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+
+import nba_metrics
+
+BACKEND = os.environ.get("NBA_CACHE_BACKEND", "memory")
+URL = os.environ.get("NBA_CACHE_URL", "")
+MAX_ENTRIES = int(os.environ.get("NBA_CACHE_MAX_ENTRIES", "1024"))
+LOCK_TIMEOUT = float(os.environ.get("NBA_CACHE_LOCK_TIMEOUT", "60"))
+# Bump when a cached function's return shape changes so old entries are ignored
+KEY_VERSION = "3"
+
+
+# ── Serialization ───────────────────────────────────────────────────────────────
+def dumps(value) -> bytes:
+    if isinstance(value, pd.DataFrame):
+        table = pa.Table.from_pandas(value, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return b"A" + sink.getvalue().to_pybytes()
+    return b"P" + pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def loads(raw: bytes):
+    if raw[:1] == b"A":
+        return pa.ipc.open_stream(io.BytesIO(raw[1:])).read_all().to_pandas()
+    return pickle.loads(raw[1:])
+
+
+# ── Backends ────────────────────────────────────────────────────────────────────
+class MemoryBackend:
+    """In-process LRU with per-entry expiry. Locks are a no-op — the per-key
+    thread locks in get_or_compute already coalesce within one process."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()   # key → (raw, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[1] < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return item[0]
+
+    def set(self, key, raw, ttl):
+        with self._lock:
+            self._data[key] = (raw, time.time() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def acquire(self, key, ttl):
+        return True
+
+    def release(self, key):
+        pass
+
+
+class SQLiteBackend:
+    """One SQLite file (WAL mode) shared by every process on the host."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._sets = 0
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, expires REAL)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, raw, ttl):
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)", (key, raw, time.time() + ttl))
+        self._sets += 1
+        if self._sets % 100 == 0:
+            conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+
+    def acquire(self, key, ttl):
+        conn = self._conn()
+        conn.execute("DELETE FROM locks WHERE key = ? AND expires <= ?", (key, time.time()))
+        return conn.execute("INSERT OR IGNORE INTO locks VALUES (?, ?)", (key, time.time() + ttl)).rowcount == 1
+
+    def release(self, key):
+        self._conn().execute("DELETE FROM locks WHERE key = ?", (key,))
+
+
+class RedisBackend:
+    """Any Redis-protocol server; locks are SET NX with an expiry."""
+
+    def __init__(self, url: str):
+        import redis  # only needed for this backend
+        self._r = redis.Redis.from_url(url or "redis://localhost:6379/0")
+
+    def get(self, key):
+        return self._r.get(key)
+
+    def set(self, key, raw, ttl):
+        self._r.set(key, raw, px=max(1, int(ttl * 1000)))
+
+    def acquire(self, key, ttl):
+        return bool(self._r.set(f"lock:{key}", b"1", nx=True, px=max(1, int(ttl * 1000))))
+
+    def release(self, key):
+        self._r.delete(f"lock:{key}")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if BACKEND == "sqlite":
+                _backend = SQLiteBackend(URL or os.path.join(
+                    os.path.dirname(os.path.abspath(__file__)), ".nba_cache.sqlite"))
+            elif BACKEND == "redis":
+                _backend = RedisBackend(URL)
+            else:
+                _backend = MemoryBackend()
+        return _backend
+
+
+def set_backend(backend):
+    """Swap the backend (e.g. a MemoryBackend in a benchmark)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+# ── Coalescing get-or-compute ───────────────────────────────────────────────────
+_key_locks = {}   # key → [lock, threads holding or waiting]; dropped when the count hits 0
+_key_locks_guard = threading.Lock()
+
+
+@contextlib.contextmanager
+def _thread_lock(key):
+    with _key_locks_guard:
+        entry = _key_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _key_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _key_locks[key]
+
+
+def _count(key: str, result: str, nbytes: int = 0):
+    fn = key.split(":")[2] if key.count(":") >= 3 else key
+    nba_metrics.inc("nba_cache_requests_total", cache=BACKEND, fn=fn, result=result)
+    if nbytes:
+        nba_metrics.inc("nba_cache_bytes_total", nbytes, cache=BACKEND, fn=fn, result=result)
+
+
+def get_or_compute(key: str, ttl: float, fn, *args, force: bool = False):
+    """Cached fn(*args); force=True recomputes and overwrites the entry."""
+    backend = get_backend()
+    raw = None if force else backend.get(key)
+    if raw is not None:
+        _count(key, "hit", len(raw))
+        return loads(raw)
+
+    with _thread_lock(key):
+        raw = None if force else backend.get(key)
+        if raw is not None:
+            _count(key, "coalesced", len(raw))   # another thread filled it while we waited
+            return loads(raw)
+
+        # Another process may be fetching this key — wait for its result
+        deadline = time.time() + LOCK_TIMEOUT
+        acquired = backend.acquire(key, LOCK_TIMEOUT)
+        while not acquired and time.time() < deadline:
+            time.sleep(0.05)
+            raw = backend.get(key)
+            if raw is not None:
+                _count(key, "coalesced", len(raw))
+                return loads(raw)
+            acquired = backend.acquire(key, LOCK_TIMEOUT)
+        try:
+            value = fn(*args)
+            raw = dumps(value)
+            backend.set(key, raw, ttl)
+            _count(key, "refresh" if force else "miss", len(raw))
+            return value
+        finally:
+            if acquired:
+                backend.release(key)
+
+
+def cached(ttl: float):
+    """Decorator: cache fn(*args) in the shared backend for ttl seconds.
+
+    Args must have a stable repr (strings, numbers, tuples). Exceptions are not
+    cached. wrapper.refresh(*args) recomputes and stores regardless of the entry.
+    """
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        def key_for(args):
+            digest = hashlib.sha1(repr(args).encode()).hexdigest()[:16]
+            return f"nba:v{KEY_VERSION}:{name}:{digest}"
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            return get_or_compute(key_for(args), ttl, fn, *args)
+
+        wrapper.refresh = lambda *args: get_or_compute(key_for(args), ttl, fn, *args, force=True)
+        return wrapper
+    return decorator
@@ -0,0 +1,324 @@
+"""Data layer shared by the Streamlit dashboard and the headless API.
+
+Everything here is plain Python (no Streamlit). The fetch_*/load_* functions
+always go upstream; the get_* entry points at the bottom add the shared
+nba_cache layer, so every process and replica reuses the same fetch.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from nba_api.stats.static import teams as static_teams
+from nba_api.stats.endpoints import (
+    leaguedashplayerstats, leaguedashteamstats, leaguegamelog, PlayerGameLog, scoreboardv3,
+)
+
+import nba_cache
+import nba_fetch
+import nba_hitrate
+import nba_metrics
+import nba_store
+
+# ── Season helpers ──────────────────────────────────────────────────────────────
+def get_current_season():
+    today = datetime.today()
+    return f"{today.year}-{str(today.year + 1)[-2:]}" if today.month >= 10 else f"{today.year-1}-{str(today.year)[-2:]}"
+
+CURRENT_SEASON = get_current_season()
+current_year = int(CURRENT_SEASON.split('-')[0])
+PREVIOUS_SEASON = f"{current_year - 1}-{str(current_year)[-2:]}"
+# Seasons of game logs kept for multi-season views (current one included)
+HISTORY_SEASONS = int(os.environ.get("NBA_HISTORY_SEASONS", "3"))
+PLAYER_WORKERS = int(os.environ.get("NBA_PLAYER_WORKERS", "4"))   # players loaded at once by get_players_games
+
+def history_seasons(n: int = HISTORY_SEASONS) -> list:
+    """The current season and the n - 1 before it, newest first ("2025-26", "2024-25", ...)."""
+    return [f"{y}-{str(y + 1)[-2:]}" for y in range(current_year, current_year - n, -1)]
+
+# (season_type_all_star value, label stored in GAME_TYPE)
+SEASON_TYPES = [
+    ("Playoffs", "Playoffs"),
+    ("PlayIn", "Play-In"),
+    ("Regular Season", "Regular"),
+]
+
+# ── Team abbreviation lookup ────────────────────────────────────────────────────
+@lru_cache(maxsize=1)
+def get_team_abbr_map():
+    all_teams = static_teams.get_teams()
+    return {str(t['id']): t['abbreviation'] for t in all_teams}
+
+# ── Opponent Defensive Rankings ─────────────────────────────────────────────────
+# Opponent columns where a higher number is the better defense
+DEF_HIGHER_IS_BETTER = {'OPP_TOV'}
+
+class DefRankings:
+    """Opponent defensive ranks for one (season, per_mode, last_n) as two
+    [team × column] arrays — rank (0 = no data) and average — with dict indexes,
+    so a lookup is two dict hits and an array read. The dashboard's badges use
+    the per-position / last-N matrix in nba_defense instead."""
+
+    def __init__(self, teams, columns, ranks, avgs, per_mode='PerGame', last_n=0):
+        self.teams = list(teams)
+        self.columns = list(columns)
+        self.ranks = ranks
+        self.avgs = avgs
+        self.per_mode = per_mode
+        self.last_n = last_n
+        self._team_ix = {t: i for i, t in enumerate(self.teams)}
+        self._col_ix = {c: j for j, c in enumerate(self.columns)}
+
+    def __len__(self):
+        return len(self.teams)
+
+    def __contains__(self, team):
+        return team in self._team_ix
+
+    def get(self, team: str, col: str):
+        """(rank, avg, total_teams) or None."""
+        i, j = self._team_ix.get(team), self._col_ix.get(col)
+        if i is None or j is None or not self.ranks[i, j]:
+            return None
+        return int(self.ranks[i, j]), round(float(self.avgs[i, j]), 1), len(self.teams)
+
+    def to_dict(self) -> dict:
+        """team_abbr → {col: (rank, avg, total_teams)} — the JSON shape of /defense."""
+        return {t: {c: self.get(t, c) for c in self.columns if self.get(t, c)} for t in self.teams}
+
+def fetch_opp_def_rankings(season: str, per_mode: str = 'PerGame', last_n: int = 0):
+    """Ranks every OPP_* column for one season / per_mode / last-N window → DefRankings.
+
+    Rank 1 is the best defense (fewest allowed; most forced for DEF_HIGHER_IS_BETTER).
+    Empty when the request fails.
+    """
+    try:
+        df_opp = nba_fetch.call(
+            leaguedashteamstats.LeagueDashTeamStats,
+            season=season,
+            measure_type_detailed_defense="Opponent",
+            per_mode_detailed=per_mode,
+            last_n_games=str(last_n),
+        ).get_data_frames()[0]
+    except Exception:
+        df_opp = pd.DataFrame()
+    abbr_map = get_team_abbr_map()
+    if df_opp.empty:
+        return DefRankings([], [], np.zeros((0, 0), np.uint8), np.zeros((0, 0), np.float32), per_mode, last_n)
+
+    teams = df_opp['TEAM_ID'].astype(str).map(abbr_map)
+    df_opp = df_opp[teams.notna()]
+    cols = [c for c in df_opp.columns if c.startswith('OPP_') and not c.endswith('_RANK')]
+    values = df_opp[cols].apply(pd.to_numeric, errors='coerce')
+    # Flip the "more is better" columns so one ascending rank covers them all
+    sign = np.where([c in DEF_HIGHER_IS_BETTER for c in cols], -1.0, 1.0)
+    ranks = (values * sign).rank(method='min').fillna(0).to_numpy(np.uint8)
+    return DefRankings(teams[teams.notna()], cols, ranks, values.round(1).to_numpy(np.float32), per_mode, last_n)
+
+# ── Today's NBA Games ───────────────────────────────────────────────────────────
+def fetch_todays_games(game_date: str):
+    """Returns ([{'away', 'home', 'status', 'game_type', 'start_utc'}], count). Raises on upstream errors."""
+    sb = nba_fetch.call(scoreboardv3.ScoreboardV3, game_date=game_date, league_id="00")
+    header_df    = sb.game_header.get_data_frame()
+    line_score_df = sb.line_score.get_data_frame()
+
+    if header_df.empty:
+        return [], 0
+
+    # line_score has 2 rows per game (home first, away second) with teamTricode
+    # Build a lookup: gameId -> [home_tricode, away_tricode]
+    team_by_game = {}
+    for _, row in line_score_df.iterrows():
+        gid = str(row['gameId'])
+        team_by_game.setdefault(gid, []).append(row['teamTricode'])
+
+    games = []
+    seen_ids = set()
+    for _, row in header_df.iterrows():
+        game_id_str = str(row['gameId'])
+        if game_id_str in seen_ids:
+            continue
+        seen_ids.add(game_id_str)
+
+        tricodes = team_by_game.get(game_id_str, ['???', '???'])
+        home_abbr = tricodes[0] if len(tricodes) > 0 else '???'
+        away_abbr = tricodes[1] if len(tricodes) > 1 else '???'
+        status    = row.get('gameStatusText', '')
+
+        if game_id_str[3:5] == '04':
+            game_type = ' 🏆'
+        elif game_id_str[3:5] == '05':
+            game_type = ' 🎟️'
+        else:
+            game_type = ''
+
+        games.append({
+            'away': away_abbr,
+            'home': home_abbr,
+            'status': status,
+            'game_type': game_type,
+            'start_utc': row.get('gameTimeUTC') or '',
+        })
+    return games, len(games)
+
+# ── Active players ──────────────────────────────────────────────────────────────
+def fetch_active_players_with_teams():
+    """Returns {player_id (str): team_abbr} for the newest season with a full roster."""
+    season_types = [stype for stype, _ in SEASON_TYPES]
+    seasons = [CURRENT_SEASON, PREVIOUS_SEASON]
+
+    def _fetch(season, stype):
+        return nba_fetch.call(
+            leaguedashplayerstats.LeagueDashPlayerStats,
+            season=season, season_type_all_star=stype
+        ).get_data_frames()[0]
+
+    # Whole season × type grid in parallel; failed calls come back as None
+    fetched = nba_fetch.fetch_all({
+        (season, stype): (_fetch, (season, stype))
+        for season in seasons for stype in season_types
+    })
+    for season in seasons:
+        combined = {}
+        for stype in season_types:
+            df = fetched[(season, stype)]
+            if df is not None and not df.empty:
+                df = df[df['TEAM_ABBREVIATION'].notna() & (df['TEAM_ABBREVIATION'] != '')]
+                combined.update(dict(zip(df['PLAYER_ID'].astype(str), df['TEAM_ABBREVIATION'])))
+        if len(combined) > 80:
+            return combined
+    return {}
+
+# ── Player Game Log ─────────────────────────────────────────────────────────────
+# Box-score columns kept in the cached log (besides ids, dates, matchup, WL, MIN)
+GAME_LOG_STATS = ["FGM", "FGA", "FG3M", "FG3A", "FTM", "FTA", "REB", "AST", "STL", "BLK", "TOV", "PTS"]
+
+def _fetch_player_log(pid_str, season, stype_api, date_from):
+    return nba_fetch.call(
+        PlayerGameLog,
+        player_id=pid_str,
+        season=season,
+        season_type_all_star=stype_api,
+        date_from_nullable=date_from,
+    ).get_data_frames()[0]
+
+def _fetch_league_log(season, stype_api, date_from):
+    return nba_fetch.call(
+        leaguegamelog.LeagueGameLog,
+        season=season,
+        season_type_all_star=stype_api,
+        player_or_team_abbreviation="P",
+        date_from_nullable=date_from,
+    ).get_data_frames()[0]
+
+def sync_league_logs(season):
+    """Bulk-loads every player's log for a season into the store: one LeagueGameLog
+    request per season type instead of one PlayerGameLog request per player.
+    Returns {season type: partitions written (None if that request failed)}."""
+    synced = nba_fetch.fetch_all({
+        stype_label: (nba_store.sync_league, (season, stype_api, stype_label, CURRENT_SEASON, _fetch_league_log))
+        for stype_api, stype_label in SEASON_TYPES
+    })
+    return {label: synced[label] for _, label in SEASON_TYPES}
+
+def _load_partitions(pid_str, seasons):
+    """{season: [non-empty partition frames]}, every partition synced in parallel."""
+    synced = nba_fetch.fetch_all({
+        (season, stype_label): (
+            nba_store.sync_partition,
+            (pid_str, season, stype_api, stype_label, CURRENT_SEASON, _fetch_player_log),
+        )
+        for season in seasons for stype_api, stype_label in SEASON_TYPES
+    })
+    frames = {}
+    for season in seasons:
+        frames[season] = [synced[(season, label)] for _, label in SEASON_TYPES
+                          if synced[(season, label)] is not None and not synced[(season, label)].empty]
+    return frames
+
+def _compact(frames):
+    if not frames:
+        return pd.DataFrame()
+    combined = pd.concat(frames, ignore_index=True)
+    combined = combined.drop_duplicates(subset=["GAME_ID"]) if "GAME_ID" in combined.columns else combined
+    log = compact_game_log(combined.sort_values("GAME_DATE_DT", ascending=False))
+    nba_metrics.observe("nba_game_log_bytes", int(log.memory_usage(deep=True).sum()), buckets=nba_metrics.SIZE_BUCKETS)
+    return log
+
+def load_player_games(pid_str):
+    """Newest-first game log for one player (current season, else previous)."""
+    # Served from the on-disk store; only games newer than the stored ones hit nba_api,
+    # and nothing does once a league sync (sync_league_logs) vouches for the season.
+    # All six partitions sync in parallel — stored past seasons cost no request at all.
+    frames = _load_partitions(pid_str, [CURRENT_SEASON, PREVIOUS_SEASON])
+    return _compact(frames[CURRENT_SEASON] or frames[PREVIOUS_SEASON])
+
+def load_player_history(pid_str, n_seasons=HISTORY_SEASONS):
+    """Newest-first game log across the last n_seasons seasons (see history_seasons),
+    for views that want more than one season's sample; SEASON_ID tells them apart."""
+    frames = _load_partitions(pid_str, history_seasons(n_seasons))
+    return _compact([f for season_frames in frames.values() for f in season_frames])
+
+def _downcast(values: pd.Series) -> pd.Series:
+    """int16 when every value is a whole number in range, else float32."""
+    values = pd.to_numeric(values, errors="coerce")
+    if values.notna().all() and (values % 1 == 0).all() and values.abs().max(skipna=True) < 2 ** 15:
+        return values.astype(np.int16)
+    return values.astype(np.float32)
+
+def opponent_codes(matchup: pd.Series, categories=None) -> pd.Series:
+    """Opponent tricode — the last token of MATCHUP ("BOS vs. NYK", "BOS @ NYK") — as a
+    categorical, over `categories` when given (else the codes present)."""
+    return pd.Series(pd.Categorical(matchup.astype(str).str[-3:], categories=categories), index=matchup.index)
+
+def compact_game_log(df: pd.DataFrame) -> pd.DataFrame:
+    """Raw store rows → the cached game-log schema: only the columns the app reads,
+    int16 / float32 box-score stats, categorical WL / GAME_TYPE / OPP
+    and the combo stats (nba_hitrate.COMBO_STATS, 2PM, 2PA) computed once here.
+    Dates stay datetime64 (GAME_DATE_DT); see with_display_dates."""
+    log = pd.DataFrame({
+        "GAME_ID": df["GAME_ID"].astype(str),
+        "SEASON_ID": df["SEASON_ID"].astype(str),
+        "GAME_DATE_DT": df["GAME_DATE_DT"],
+        "GAME_TYPE": pd.Categorical(df["GAME_TYPE"], categories=[label for _, label in SEASON_TYPES]),
+        "MATCHUP": df["MATCHUP"].astype(str),
+        "OPP": opponent_codes(df["MATCHUP"], categories=sorted(get_team_abbr_map().values())),
+        "WL": pd.Categorical(df["WL"], categories=["W", "L"]),
+        "MIN": pd.to_numeric(df["MIN"], errors="coerce").astype(np.float32),
+        **{c: _downcast(df[c]) for c in GAME_LOG_STATS if c in df.columns},
+    }).reset_index(drop=True)
+    nba_hitrate.add_derived_stats(log)
+    for c in [*nba_hitrate.COMBO_STATS, "2PM", "2PA"]:
+        if c in log.columns:
+            log[c] = _downcast(log[c])
+    return log
+
+def with_display_dates(frame: pd.DataFrame, fmt: str = "%m/%d") -> pd.DataFrame:
+    """frame plus the display GAME_DATE column ("MM/DD" by default) — call on the rows actually shown."""
+    return frame.assign(GAME_DATE=frame["GAME_DATE_DT"].dt.strftime(fmt))
+
+# ── Shared-cache entry points ───────────────────────────────────────────────────
+get_opp_def_rankings = nba_cache.cached(ttl=3600)(fetch_opp_def_rankings)
+get_todays_games = nba_cache.cached(ttl=300)(fetch_todays_games)
+get_active_players_with_teams = nba_cache.cached(ttl=7200)(fetch_active_players_with_teams)
+get_player_games = nba_cache.cached(ttl=300)(load_player_games)
+get_player_history = nba_cache.cached(ttl=300)(load_player_history)
+
+def get_players_games(pids) -> dict:
+    """{pid: get_player_games(pid)} for many players at once (None where a load failed).
+    Players fan out on a separate small pool: each load already fans out its
+    partitions on nba_fetch's pool, and nesting both on that pool deadlocks."""
+    pids = list(pids)
+    if not pids:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(PLAYER_WORKERS, len(pids)), thread_name_prefix="player_logs") as pool:
+        futures = {p: pool.submit(get_player_games, p) for p in pids}
+    results = {}
+    for p, fut in futures.items():
+        try:
+            results[p] = fut.result()
+        except Exception:
+            results[p] = None
+    return results
@@ -0,0 +1,232 @@
+"""Opponent defense matrix: team × stat × window × position group.
+
+Built once per slate from a batch of LeagueDashTeamStats "Opponent" requests
+(every window × position group in parallel) and kept on disk next to the
+game-log store, so every process and rerun afterwards loads two small arrays
+instead of talking to nba_api.
+
+    ranks  uint8   [team, stat, window, position]   1 = best defense, 0 = no data
+    avgs   float32 [team, stat, window, position]   per-game amount allowed
+
+Combo stats (PRA, Pts+Reb, ...) are summed from their OPP_* components, so
+they are ranked on what they actually measure instead of falling back to
+points. Position groups are G / F / C (first letter of the PlayerIndex
+position), "" being all players.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from nba_api.stats.endpoints import leaguedashteamstats, playerindex
+
+import nba_cache
+import nba_data
+import nba_fetch
+import nba_hitrate
+import nba_store
+
+# (name, LastNGames) — 0 is the whole season
+WINDOWS = (("season", 0), ("L10", 10), ("L5", 5))
+POSITIONS = ("", "G", "F", "C")
+
+BASE_STATS = {
+    "PTS":  ("OPP_PTS",  "PTS allowed"),
+    "REB":  ("OPP_REB",  "REB allowed"),
+    "AST":  ("OPP_AST",  "AST allowed"),
+    "STL":  ("OPP_STL",  "STL allowed"),
+    "BLK":  ("OPP_BLK",  "BLK allowed"),
+    "TOV":  ("OPP_TOV",  "TOV forced"),
+    "FG3M": ("OPP_FG3M", "3PM allowed"),
+}
+STATS = list(BASE_STATS) + list(nba_hitrate.COMBO_STATS)
+LABELS = {**{s: label for s, (_, label) in BASE_STATS.items()},
+          **{s: f"{s} allowed" for s in nba_hitrate.COMBO_STATS}}
+# Stats where more is the better defense
+HIGHER_IS_BETTER = {"TOV"}
+
+# Component weights: OPP_* column × stat, so every stat of a slice is one matmul
+_COMPONENT_COLS = [col for col, _ in BASE_STATS.values()]
+_WEIGHTS = np.zeros((len(_COMPONENT_COLS), len(STATS)), np.float32)
+for _j, _stat in enumerate(STATS):
+    for _part in nba_hitrate.COMBO_STATS.get(_stat, (_stat,)):
+        _WEIGHTS[_COMPONENT_COLS.index(BASE_STATS[_part][0]), _j] = 1
+
+_STAT_IX = {s: i for i, s in enumerate(STATS)}
+_WINDOW_IX = {w: i for i, (w, _) in enumerate(WINDOWS)}
+_POSITION_IX = {p: i for i, p in enumerate(POSITIONS)}
+
+DEFENSE_DIR = os.path.join(nba_store.STORE_DIR, "defense")
+
+
+class DefenseMatrix:
+    def __init__(self, teams, ranks: np.ndarray, avgs: np.ndarray):
+        self.teams = list(teams)
+        self.ranks = ranks
+        self.avgs = avgs
+        self._team_ix = {t: i for i, t in enumerate(self.teams)}
+
+    def __len__(self):
+        return len(self.teams)
+
+    def __contains__(self, team):
+        return team in self._team_ix
+
+    def lookup(self, team: str, stat: str, window: str = "season", position: str = ""):
+        """(rank, avg, total_teams) or None."""
+        i = self._team_ix.get(team)
+        j = _STAT_IX.get(stat)
+        w = _WINDOW_IX.get(window)
+        p = _POSITION_IX.get(position)
+        if i is None or j is None or w is None or p is None or not self.ranks[i, j, w, p]:
+            return None
+        return int(self.ranks[i, j, w, p]), round(float(self.avgs[i, j, w, p]), 1), len(self.teams)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(tmp, teams=np.array(self.teams), stats=np.array(STATS), ranks=self.ranks, avgs=self.avgs)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str):
+        """Matrix stored at path, or None if missing or built for another stat list."""
+        try:
+            with np.load(path) as f:
+                if list(f["stats"]) != STATS:
+                    return None
+                return cls(f["teams"].tolist(), f["ranks"], f["avgs"])
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+def rank_info(matrix: DefenseMatrix, team: str, stat: str, position: str = ""):
+    """Badge data for team vs stat → dict (rank, avg, total, label, difficulty,
+    position, recent), or None. Falls back to all positions when the position
+    slice has no data; recent maps L10/L5 to their ranks."""
+    if not team or matrix is None:
+        return None
+    found = matrix.lookup(team, stat, "season", position)
+    if found is None and position:
+        position = ""
+        found = matrix.lookup(team, stat, "season", position)
+    if found is None:
+        return None
+    rank, avg, total = found
+    recent = {}
+    for window, _ in WINDOWS[1:]:
+        r = matrix.lookup(team, stat, window, position)
+        if r:
+            recent[window] = r[0]
+    # top 10 = easy matchup, bottom 10 = tough, else mid
+    difficulty = "Easy" if rank <= 10 else "Tough" if rank >= total - 9 else "Mid"
+    return {"rank": rank, "avg": avg, "total": total, "label": LABELS[stat], "difficulty": difficulty,
+            "position": position, "recent": recent}
+
+
+# ── Build ───────────────────────────────────────────────────────────────────────
+def _fetch_opponent(season: str, last_n: int, position: str) -> pd.DataFrame:
+    return nba_fetch.call(
+        leaguedashteamstats.LeagueDashTeamStats,
+        season=season,
+        measure_type_detailed_defense="Opponent",
+        per_mode_detailed="PerGame",
+        last_n_games=str(last_n),
+        player_position_abbreviation_nullable=position,
+    ).get_data_frames()[0]
+
+
+def build_matrix(season: str):
+    """Fetches every window × position slice in parallel → (DefenseMatrix, complete)."""
+    fetched = nba_fetch.fetch_all({
+        (w, p): (_fetch_opponent, (season, last_n, position))
+        for w, (_, last_n) in enumerate(WINDOWS) for p, position in enumerate(POSITIONS)
+    })
+    abbr_map = nba_data.get_team_abbr_map()
+    teams = sorted(set(abbr_map.values()))
+    team_ix = {t: i for i, t in enumerate(teams)}
+    avgs = np.full((len(teams), len(STATS), len(WINDOWS), len(POSITIONS)), np.nan, np.float32)
+
+    complete = True
+    for (w, p), df in fetched.items():
+        if df is None or df.empty:
+            complete = False
+            continue
+        rows = df["TEAM_ID"].astype(str).map(abbr_map).map(team_ix)
+        keep = rows.notna().to_numpy()
+        components = df.reindex(columns=_COMPONENT_COLS).apply(pd.to_numeric, errors="coerce").to_numpy(np.float32)
+        avgs[rows[keep].astype(int).to_numpy(), :, w, p] = components[keep] @ _WEIGHTS
+
+    # One rank over teams for every (stat, window, position) column at once;
+    # "more is better" stats are negated so ascending covers them too
+    sign = np.where([s in HIGHER_IS_BETTER for s in STATS], -1.0, 1.0)[None, :, None, None]
+    flat = pd.DataFrame((avgs * sign).reshape(len(teams), -1))
+    ranks = flat.rank(method="min").fillna(0).to_numpy(np.uint8).reshape(avgs.shape)
+    return DefenseMatrix(teams, ranks, np.round(avgs, 1)), complete
+
+
+MEMO_SIZE = 4          # slates kept in memory (server and dashboard may ask for different dates)
+PARTIAL_TTL = float(os.environ.get("NBA_DEFENSE_PARTIAL_TTL", "60"))   # seconds an incomplete build is reused
+
+_memo = OrderedDict()  # path → (matrix, expires_at or None when complete)
+_memo_lock = threading.Lock()
+_build_locks = {}      # path → lock held while that slate loads or builds
+
+
+def _memo_get(path: str):
+    """Matrix memoized for path unless its partial-build TTL ran out. Call under _memo_lock."""
+    entry = _memo.get(path)
+    if entry is None or (entry[1] is not None and entry[1] <= time.monotonic()):
+        return None
+    _memo.move_to_end(path)
+    return entry[0]
+
+
+def get_matrix(season: str, slate_date: str = None) -> DefenseMatrix:
+    """Matrix for a slate: from memory, else from disk, else built (and stored
+    when every slice came back). An incomplete build is served from memory for
+    PARTIAL_TTL seconds before the next attempt, so an outage doesn't cost the
+    full request batch on every call. Loads and builds run under a per-slate
+    lock: callers for another slate are never blocked behind the network."""
+    slate_date = slate_date or date.today().strftime("%Y-%m-%d")
+    path = os.path.join(DEFENSE_DIR, season, f"{slate_date}.npz")
+    with _memo_lock:
+        matrix = _memo_get(path)
+        if matrix is not None:
+            return matrix
+        build_lock = _build_locks.setdefault(path, threading.Lock())
+
+    with build_lock:
+        with _memo_lock:
+            matrix = _memo_get(path)   # built while we waited
+        if matrix is not None:
+            return matrix
+        matrix, expires = DefenseMatrix.load(path), None
+        if matrix is None:
+            matrix, complete = build_matrix(season)
+            if complete:
+                matrix.save(path)
+            else:
+                expires = time.monotonic() + PARTIAL_TTL
+        with _memo_lock:
+            _memo[path] = (matrix, expires)
+            _memo.move_to_end(path)
+            while len(_memo) > MEMO_SIZE:
+                evicted, _ = _memo.popitem(last=False)
+                _build_locks.pop(evicted, None)
+    return matrix
+
+
+# ── Player positions ────────────────────────────────────────────────────────────
+def fetch_player_positions(season: str) -> dict:
+    """{player_id (str): "G" | "F" | "C"} from PlayerIndex; players without a position are left out."""
+    df = nba_fetch.call(playerindex.PlayerIndex, season=season).get_data_frames()[0]
+    groups = df["POSITION"].fillna("").astype(str).str[:1]
+    keep = groups.isin(POSITIONS[1:])
+    return dict(zip(df.loc[keep, "PERSON_ID"].astype(str), groups[keep]))
+
+
+get_player_positions = nba_cache.cached(ttl=86400)(fetch_player_positions)
@@ -0,0 +1,257 @@
+"""Edge finder: bulk sportsbook odds against empirical and modelled hit rates.
+
+read_odds() takes a CSV / JSON / XLSX dump of player · stat · line · price
+(side and book optional) and normalizes it: column names and stat labels
+through alias tables, players to ids (nba_players.match_player_id), prices
+to decimal. score() then prices every row at once against the players'
+cached game logs:
+
+    IMPLIED   1 / decimal price (with the book's margin)
+    NO_VIG    IMPLIED rescaled so a line's over and under sum to 1, when the
+              sheet carries both sides for the same book
+    P_HIT     the pin handler's L5/L10 average for the row's side
+    P_MODEL   nba_projection P(over) (or 1 - it for unders)
+    EDGE      P_MODEL - NO_VIG
+    EV        P_MODEL × decimal - 1 per unit staked (EV_HIT: with P_HIT)
+
+Both probabilities come from one batch each (nba_hitrate.score_props, one
+Projection.p_over_at), so a 5,000-row sheet is a few array passes.
+
+    python nba_edges.py odds.csv [--top 50] [--out edges.csv]
+    python nba_edges.py --synthetic      # timing on a generated 5,000-row sheet
+"""
+import argparse
+import io
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import nba_hitrate
+import nba_players
+import nba_projection
+
+# Normalized column → spellings accepted in a sheet (lower-cased)
+COLUMN_ALIASES = {
+    "PLAYER":    ("player", "player_name", "name", "participant"),
+    "PLAYER_ID": ("player_id", "pid", "nba_id"),
+    "STAT":      ("stat", "market", "prop", "stat_type", "category"),
+    "LINE":      ("line", "point", "handicap", "total"),
+    "PRICE":     ("price", "odds", "american", "american_odds", "decimal", "decimal_odds"),
+    "SIDE":      ("side", "over_under", "selection", "ou"),
+    "BOOK":      ("book", "sportsbook", "bookmaker", "site"),
+}
+STAT_ALIASES = {
+    **{s.lower(): s for s in nba_projection.STATS},
+    "points": "PTS", "rebounds": "REB", "total rebounds": "REB", "assists": "AST",
+    "steals": "STL", "blocks": "BLK", "turnovers": "TOV",
+    "threes": "FG3M", "3pm": "FG3M", "3-pointers made": "FG3M", "three pointers made": "FG3M",
+    "3pa": "FG3A", "field goals made": "FGM", "field goals attempted": "FGA",
+    "pts+reb+ast": "PRA", "points + rebounds + assists": "PRA", "pts + reb + ast": "PRA",
+    "points + rebounds": "Pts+Reb", "pts + reb": "Pts+Reb",
+    "points + assists": "Pts+Ast", "pts + ast": "Pts+Ast",
+    "rebounds + assists": "Ast+Reb", "reb+ast": "Ast+Reb", "reb + ast": "Ast+Reb", "ast + reb": "Ast+Reb",
+    "steals + blocks": "Stl+Blk", "blocks + steals": "Stl+Blk", "stl + blk": "Stl+Blk", "blk+stl": "Stl+Blk",
+}
+MAX_LINE = 100.0   # lines outside 0..MAX_LINE are typos / feed junk: treated as "no line"
+COLUMNS = ["PLAYER", "PLAYER_ID", "STAT", "LINE", "SIDE", "PRICE", "BOOK", "IMPLIED", "NO_VIG",
+           "P_HIT", "P_MODEL", "EDGE", "EV", "EV_HIT", "GAMES", "NOTE"]
+
+
+# ── Import ──────────────────────────────────────────────────────────────────────
+def _load(source, filename: str) -> pd.DataFrame:
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext in (".xlsx", ".xlsm", ".xls"):
+        return pd.read_excel(source)
+    if ext == ".json":
+        if hasattr(source, "read"):
+            data = json.load(source)
+        else:
+            with open(source) as fh:
+                data = json.load(fh)
+        if isinstance(data, dict):   # {"props": [...]} or similar single-key wrappers
+            data = next((v for v in data.values() if isinstance(v, list)), [data])
+        return pd.json_normalize(data)
+    return pd.read_csv(source)
+
+
+def to_decimal(prices: pd.Series, decimal: bool = False) -> np.ndarray:
+    """Decimal payout per row. American odds ("+150", -110) unless decimal; without
+    the flag, values between 1 and 100 are taken as already decimal. NaN if unreadable."""
+    values = pd.to_numeric(prices.astype(str).str.strip().str.replace("+", "", regex=False), errors="coerce")
+    values = values.to_numpy(dtype=float)
+    american = np.where(values > 0, values / 100 + 1, 100 / np.abs(values) + 1)
+    if decimal:
+        out = values
+    else:
+        out = np.where((values > 1) & (values < 100), values, np.where(np.abs(values) >= 100, american, np.nan))
+    return np.where(out > 1, out, np.nan)
+
+
+def read_odds(source, filename: str = None, pool=None) -> pd.DataFrame:
+    """Normalized odds sheet: PLAYER, PLAYER_ID, STAT, LINE, SIDE ("O" / "U"),
+    PRICE (as given), DECIMAL, BOOK. source is a path or a file object
+    (filename then picks the format). Player names resolve against pool, e.g.
+    the rostered ids, when a suffix-less name is ambiguous. A LINE outside
+    0..MAX_LINE is read as missing."""
+    filename = filename or (source if isinstance(source, str) else getattr(source, "name", ""))
+    raw = _load(source, filename)
+    lower = {str(c).strip().lower(): c for c in raw.columns}
+    picked = {}
+    for col, aliases in COLUMN_ALIASES.items():
+        found = next((lower[a] for a in aliases if a in lower), None)
+        if found is not None:
+            picked[col] = found
+    missing = [c for c in ("STAT", "LINE", "PRICE") if c not in picked]
+    if missing or not ({"PLAYER", "PLAYER_ID"} & set(picked)):
+        raise ValueError(f"Odds sheet needs player, stat, line and price columns (missing: "
+                         f"{', '.join(missing) or 'player'})")
+
+    odds = pd.DataFrame({col: raw[src] for col, src in picked.items()})
+    if "PLAYER_ID" in odds:
+        odds["PLAYER_ID"] = odds["PLAYER_ID"].astype("string").str.replace(r"\.0$", "", regex=True)
+    else:
+        names = odds["PLAYER"].astype(str).str.strip()
+        ids = {n: nba_players.match_player_id(n, pool) for n in names.unique()}
+        odds["PLAYER_ID"] = names.map(ids).astype("string")
+    if "PLAYER" not in odds:
+        odds["PLAYER"] = odds["PLAYER_ID"].map(lambda p: nba_players.get_player_name(p) if pd.notna(p) else None)
+
+    stat_text = odds["STAT"].astype(str).str.strip().str.lower().str.replace(r"\s+", " ", regex=True)
+    odds["STAT"] = stat_text.map(STAT_ALIASES)
+    odds["LINE"] = pd.to_numeric(odds["LINE"], errors="coerce")
+    # score() sizes its CDF table by the largest line, so one 1e9 must not reach it
+    odds.loc[~odds["LINE"].between(0, MAX_LINE), "LINE"] = np.nan
+    side = odds["SIDE"].astype(str).str.strip().str.lower().str[:1] if "SIDE" in odds else pd.Series("o", odds.index)
+    odds["SIDE"] = np.where(side == "u", "U", "O")
+    odds["DECIMAL"] = to_decimal(odds["PRICE"], decimal="decimal" in str(picked["PRICE"]).lower())
+    if "BOOK" not in odds:
+        odds["BOOK"] = ""
+    return odds[["PLAYER", "PLAYER_ID", "STAT", "LINE", "SIDE", "PRICE", "DECIMAL", "BOOK"]].reset_index(drop=True)
+
+
+# ── Scoring ─────────────────────────────────────────────────────────────────────
+def score(odds: pd.DataFrame, frame: pd.DataFrame, key: str = "PLAYER_ID") -> pd.DataFrame:
+    """Edge table for a normalized odds sheet against a stacked log frame (PLAYER_ID
+    column, as for nba_hitrate.scan), best EV first; rows that can't be priced
+    sort last with a NOTE (unknown player / stat, bad price, no games)."""
+    if odds.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    pids = odds["PLAYER_ID"].fillna("").astype(str).to_numpy()
+    stats = odds["STAT"].fillna("").astype(str).to_numpy()
+    lines = odds["LINE"].to_numpy(dtype=float)
+    decimal = odds["DECIMAL"].to_numpy(dtype=float)
+    under = (odds["SIDE"] == "U").to_numpy()
+
+    have_logs = set(frame[key].astype(str)) if not frame.empty else set()
+    note = np.select(
+        [pids == "", stats == "", ~((lines >= 0) & (lines <= MAX_LINE)), np.isnan(decimal), ~np.isin(pids, list(have_logs))],
+        ["unknown player", "unknown stat", "no line", "bad price", "no games"], "")
+    ok = note == ""
+
+    p_hit = np.full(len(odds), np.nan)
+    p_model = np.full(len(odds), np.nan)
+    games = np.zeros(len(odds), dtype=int)
+    if ok.any():
+        frame = frame.assign(**{key: frame[key].astype(str)})
+        props = list(zip(pids[ok], stats[ok], lines[ok]))
+        hit = nba_hitrate.score_props(frame, props)["avg_o"] / 100
+        projection = nba_projection.project(frame, key=key)
+        model = projection.p_over_at(pids[ok], stats[ok], lines[ok])
+        p_hit[ok] = np.where(under[ok], 1 - hit, hit)
+        p_model[ok] = np.where(under[ok], 1 - model, model)
+        game_ix = {k: int(n) for k, n in zip(projection.keys, projection.games)}
+        games[ok] = [game_ix.get(p, 0) for p in pids[ok]]
+
+    implied = 1 / decimal
+    # Remove the margin where the sheet prices both sides of a line at one book
+    pair = pd.DataFrame({"P": pids, "S": stats, "L": lines, "B": odds["BOOK"].astype(str).to_numpy(), "I": implied})
+    grouped = pair.groupby(["P", "S", "L", "B"], sort=False, dropna=False)["I"]
+    both = (grouped.transform("count") == 2).to_numpy()
+    no_vig = np.where(both, implied / grouped.transform("sum").to_numpy(), implied)
+
+    table = pd.DataFrame({
+        "PLAYER": odds["PLAYER"].to_numpy(),
+        "PLAYER_ID": pids,
+        "STAT": odds["STAT"].to_numpy(),
+        "LINE": lines,
+        "SIDE": odds["SIDE"].to_numpy(),
+        "PRICE": odds["PRICE"].to_numpy(),
+        "BOOK": odds["BOOK"].to_numpy(),
+        "IMPLIED": implied,
+        "NO_VIG": no_vig,
+        "P_HIT": p_hit,
+        "P_MODEL": p_model,
+        "EDGE": p_model - no_vig,
+        "EV": p_model * decimal - 1,
+        "EV_HIT": p_hit * decimal - 1,
+        "GAMES": games,
+        "NOTE": note,
+    })
+    return table.sort_values("EV", ascending=False, na_position="last", kind="stable").reset_index(drop=True)
+
+
+def load_logs(pids) -> pd.DataFrame:
+    """Stacked cached game logs (with PLAYER_ID) for the given player ids, loaded in parallel."""
+    import nba_data
+
+    logs = nba_data.get_players_games(pids)
+    frames = [df.assign(PLAYER_ID=p) for p, df in logs.items() if df is not None and not df.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def synthetic_sheet(n_rows: int = 5000, n_players: int = 300, seed: int = 0):
+    """(odds sheet as CSV text, stacked log frame) for timing."""
+    rng = np.random.default_rng(seed)
+    n_games = 40
+    minutes = rng.normal(28, 6, n_players * n_games).clip(0, 44)
+    frame = pd.DataFrame({
+        "PLAYER_ID": np.repeat(np.arange(n_players).astype(str), n_games),
+        "GAME_ID": [f"g{g}" for _ in range(n_players) for g in range(n_games, 0, -1)],
+        "GAME_DATE_DT": np.tile(pd.date_range("2025-10-21", periods=n_games).values[::-1], n_players),
+        "MIN": minutes,
+        **{c: rng.poisson(lam * minutes / 28) for c, lam in
+           [("PTS", 15), ("REB", 5), ("AST", 4), ("STL", 1), ("BLK", 1), ("TOV", 2), ("FGM", 6),
+            ("FGA", 13), ("FG3M", 2), ("FG3A", 5)]},
+    })
+    nba_hitrate.add_derived_stats(frame)
+    markets = [("Points", 15), ("Rebounds", 5), ("Assists", 4), ("Threes", 2), ("PRA", 24), ("Pts+Reb", 20)]
+    m = rng.integers(0, len(markets), n_rows)
+    sheet = pd.DataFrame({
+        "player_id": rng.integers(0, n_players, n_rows),
+        "market": [markets[i][0] for i in m],
+        "line": np.array([markets[i][1] for i in m]) + rng.integers(-4, 5, n_rows) + 0.5,
+        "side": rng.choice(["Over", "Under"], n_rows),
+        "odds": rng.choice(["-130", "-120", "-115", "-110", "+100", "+105", "+115"], n_rows),
+        "book": rng.choice(["A", "B", "C"], n_rows),
+    })
+    return sheet.to_csv(index=False), frame
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank an odds sheet by model edge against cached game logs")
+    parser.add_argument("sheet", nargs="?", help="CSV / JSON / XLSX odds file")
+    parser.add_argument("--top", type=int, default=30)
+    parser.add_argument("--out", help="write the full edge table to this CSV")
+    parser.add_argument("--synthetic", action="store_true", help="generated 5,000-row sheet instead of a file")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        text, frame = synthetic_sheet()
+        odds = read_odds(io.StringIO(text), "synthetic.csv")
+    elif args.sheet:
+        odds = read_odds(args.sheet)
+        frame = load_logs(sorted(odds["PLAYER_ID"].dropna().unique()))
+    else:
+        raise SystemExit("Pass an odds file, or --synthetic")
+
+    started = time.perf_counter()
+    table = score(odds, frame)
+    print(f"{len(odds)} rows scored in {(time.perf_counter() - started) * 1000:.0f} ms "
+          f"({int((table['NOTE'] != '').sum())} unpriced)")
+    with pd.option_context("display.width", 160, "display.max_columns", None):
+        print(table.drop(columns=["PLAYER_ID", "NOTE"]).head(args.top).round(3).to_string(index=False))
+    if args.out:
+        table.to_csv(args.out, index=False)
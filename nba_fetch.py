@@ -0,0 +1,123 @@
+"""Bounded concurrent fetch layer for nba_api calls.
+
+Independent requests (the season × season-type grid) are fanned out over a
+shared thread pool so page latency tracks the slowest call, not the sum. Every
+call goes through one process-wide rate limiter and is retried with
+exponential backoff, which keeps us under stats.nba.com's throttling.
+
+NBA_STATS_BASE_URL points nba_api at another host (e.g. a local stub server);
+NBA_API_MODE=record|replay goes through nba_replay's fixture archive instead.
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from nba_api.stats.library.http import NBAStatsHTTP
+
+import nba_metrics
+import nba_replay
+
+MAX_WORKERS = int(os.environ.get("NBA_API_MAX_WORKERS", "6"))
+MAX_RPS     = float(os.environ.get("NBA_API_MAX_RPS", "4"))
+TIMEOUT     = float(os.environ.get("NBA_API_TIMEOUT", "15"))
+RETRIES     = int(os.environ.get("NBA_API_RETRIES", "3"))
+BACKOFF     = float(os.environ.get("NBA_API_BACKOFF", "0.5"))
+
+if os.environ.get("NBA_STATS_BASE_URL"):
+    NBAStatsHTTP.base_url = os.environ["NBA_STATS_BASE_URL"].rstrip("/") + "/{endpoint}"
+if nba_replay.MODE != "live":
+    nba_replay.install()
+
+
+class RateLimiter:
+    """Thread-safe token bucket: at most `rate` calls per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_limiter = RateLimiter(MAX_RPS, burst=int(MAX_RPS) or 1)
+_worker = threading.local()
+
+
+def _mark_worker():
+    _worker.in_pool = True
+
+
+_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="nba_api", initializer=_mark_worker)
+
+
+def call(endpoint_cls, **params):
+    """Instantiates an nba_api endpoint with rate limiting, a request timeout and retries.
+
+    Raises the last error once all retries are used up.
+    """
+    params.setdefault("timeout", TIMEOUT)
+    endpoint = endpoint_cls.__name__
+    for attempt in range(RETRIES + 1):
+        waited = time.perf_counter()
+        _limiter.acquire()
+        started = time.perf_counter()
+        nba_metrics.inc("nba_api_throttle_seconds_total", started - waited, endpoint=endpoint)
+        try:
+            result = endpoint_cls(**params)
+        except nba_replay.ReplayMiss:
+            nba_metrics.inc("nba_api_requests_total", endpoint=endpoint, outcome="replay_miss")
+            raise  # retrying cannot conjure a recording
+        except Exception:
+            nba_metrics.observe("nba_api_request_seconds", time.perf_counter() - started, endpoint=endpoint)
+            nba_metrics.inc("nba_api_requests_total", endpoint=endpoint, outcome="error")
+            if attempt == RETRIES:
+                raise
+            time.sleep(BACKOFF * (2 ** attempt) + random.uniform(0, BACKOFF))
+        else:
+            nba_metrics.observe("nba_api_request_seconds", time.perf_counter() - started, endpoint=endpoint)
+            nba_metrics.inc("nba_api_requests_total", endpoint=endpoint, outcome="ok")
+            response = getattr(result, "nba_response", None)
+            if response is not None:
+                nba_metrics.inc("nba_api_response_bytes_total", len(response.get_response() or ""), endpoint=endpoint)
+            return result
+
+
+def fetch_all(tasks: dict) -> dict:
+    """Runs {key: (fn, args)} concurrently on the shared pool.
+
+    Returns {key: result}; a task that raised maps to None, mirroring the
+    skip-on-error behaviour of the sequential loops this replaces.
+
+    Called from one of the pool's own workers, the tasks run inline: queueing
+    them behind the caller would deadlock once every worker waits on the pool.
+    Fan-outs whose tasks call fetch_all themselves (one task per player) belong
+    on a separate pool — see nba_data.get_players_games.
+    """
+    if getattr(_worker, "in_pool", False):
+        futures = None
+    else:
+        futures = {key: _pool.submit(fn, *args) for key, (fn, args) in tasks.items()}
+    results = {}
+    for key, (fn, args) in tasks.items():
+        try:
+            results[key] = futures[key].result() if futures else fn(*args)
+        except Exception:
+            results[key] = None
+    return results
@@ -0,0 +1,252 @@
+"""Vectorized hit-rate kernels.
+
+Game logs are stacked into a dense (player, game, stat) array — newest game
+first, NaN-padded past each player's last game — so hit rates, streaks and
+trend arrows for every player × stat × line come out of a few NumPy
+broadcasts instead of per-player DataFrame slicing.
+"""
+import numpy as np
+import pandas as pd
+
+# Derived columns: name → components summed
+COMBO_STATS = {
+    "Pts+Ast": ("PTS", "AST"),
+    "Pts+Reb": ("PTS", "REB"),
+    "Ast+Reb": ("AST", "REB"),
+    "Stl+Blk": ("STL", "BLK"),
+    "PRA":     ("PTS", "REB", "AST"),
+}
+
+
+def add_derived_stats(df: pd.DataFrame) -> pd.DataFrame:
+    """Adds the combo columns plus 2PM/2PA (FG minus 3PT) in place."""
+    for col, parts in COMBO_STATS.items():
+        if all(p in df.columns for p in parts):
+            df[col] = df[list(parts)].sum(axis=1)
+    if "FGM" in df.columns and "FG3M" in df.columns:
+        df["2PM"] = df["FGM"] - df["FG3M"]
+    if "FGA" in df.columns and "FG3A" in df.columns:
+        df["2PA"] = df["FGA"] - df["FG3A"]
+    return df
+
+
+def stack_logs(frame: pd.DataFrame, stats: list, key: str = "PLAYER_ID", depth: int = None):
+    """Stacks a long multi-player game-log frame into a dense array.
+
+    Returns (keys, values, n_games): values has shape (players, games, stats),
+    newest game first; rows past a player's n_games are NaN.
+    """
+    frame = frame.sort_values([key, "GAME_DATE_DT"], ascending=[True, False])
+    codes, keys = pd.factorize(frame[key])
+    pos = frame.groupby(key, sort=False).cumcount().to_numpy()
+    n_games = np.bincount(codes, minlength=len(keys))
+    if depth is None:
+        depth = int(n_games.max()) if len(n_games) else 0
+    n_games = np.minimum(n_games, depth)
+
+    values = np.full((len(keys), depth, len(stats)), np.nan)
+    keep = pos < depth
+    values[codes[keep], pos[keep]] = frame[stats].to_numpy(dtype=float)[keep]
+    return list(keys), values, n_games
+
+
+def over_mask(values: np.ndarray, lines) -> np.ndarray:
+    """Boolean (players, games, stats, lines) array of stat > line.
+
+    lines is either one grid shared by every stat, shape (lines,), or one
+    grid per stat, shape (stats, lines). Padding rows compare False.
+    """
+    return values[..., None] > np.asarray(lines, dtype=float)
+
+
+def hit_rates(over: np.ndarray, n_games: np.ndarray, windows=(5, 10)) -> np.ndarray:
+    """Over-% for each trailing window → (players, stats, lines, windows).
+
+    A window the player hasn't played enough games for is NaN, like the pin
+    handler dropping windows longer than the log.
+    """
+    rates = np.empty(over.shape[:1] + over.shape[2:] + (len(windows),))
+    for j, w in enumerate(windows):
+        rates[..., j] = over[:, :w].mean(axis=1) * 100
+        rates[n_games < w, ..., j] = np.nan
+    return rates
+
+
+def avg_over(rates: np.ndarray) -> np.ndarray:
+    """Mean over-% across the available windows (NaN if none are)."""
+    valid = ~np.isnan(rates)
+    count = valid.sum(axis=-1)
+    total = np.where(valid, rates, 0).sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / count, np.nan)
+
+
+def current_streak(over: np.ndarray, n_games: np.ndarray):
+    """Current over/under run → (is_over, count), each (players, stats, lines)."""
+    depth = over.shape[1]
+    valid = np.arange(depth)[None, :] < n_games[:, None]
+    first = over[:, 0]
+    broken = (over != first[:, None]) | ~valid[:, :, None, None]
+    count = np.where(broken.any(axis=1), broken.argmax(axis=1), depth)
+    return first, count
+
+
+def trend(values: np.ndarray, n_games: np.ndarray, lines) -> np.ndarray:
+    """L5 vs L10 average → -1 (cold), 0, +1 (hot) per (players, stats, lines).
+
+    Needs 6+ games; with fewer than 10 the comparison is against games 6..n,
+    and the threshold is 8% of the line (at least 0.5) — same as the pin handler.
+    """
+    v = np.nan_to_num(values[:, :10])
+    n = n_games[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        l5 = v[:, :5].sum(axis=1) / np.minimum(n, 5)
+        l10 = np.where(n >= 10, v.sum(axis=1) / 10, v[:, 5:].sum(axis=1) / (n - 5))
+    diff = (l5 - l10)[..., None]
+    threshold = np.maximum(np.asarray(lines, dtype=float) * 0.08, 0.5)
+    out = np.where(diff > threshold, 1, np.where(diff < -threshold, -1, 0))
+    out[n_games < 6] = 0
+    return out
+
+
+def minutes_trend(minutes: np.ndarray, n_games: np.ndarray, window: int = 10):
+    """Average and least-squares slope of each player's last `window` minutes.
+
+    minutes is (players, games), newest first — the same orientation as the
+    np.polyfit over df.head(10) it replaces. Slope is NaN below 3 games.
+    """
+    m = np.minimum(n_games, window)[:, None]
+    x = np.arange(window)[None, :]
+    mask = x < m
+    recent = np.zeros((len(minutes), window))
+    recent[:, :min(window, minutes.shape[1])] = np.nan_to_num(minutes[:, :window])
+    y = np.where(mask, recent, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg = y.sum(axis=1, keepdims=True) / m
+        x_mean = np.where(mask, x, 0).sum(axis=1, keepdims=True) / m
+        dx = np.where(mask, x - x_mean, 0.0)
+        slope = (dx * (y - avg)).sum(axis=1) / (dx ** 2).sum(axis=1)
+    slope[m[:, 0] < 3] = np.nan
+    return avg[:, 0], slope
+
+
+def summarize(df: pd.DataFrame, stats: list, lines, windows=(5, 10)) -> dict:
+    """Hit-rate summary for one player's log (newest game first), one line per stat.
+
+    Returns arrays indexed by stat: rates (stats × windows, NaN where the log is
+    shorter than the window), avg_o, streak_over, streak_count and trend; plus
+    the scalar L10 minutes average and slope (min_avg, min_slope).
+    """
+    values = df[list(stats)].to_numpy(dtype=float)[None]
+    n_games = np.array([len(df)])
+    grid = np.asarray(lines, dtype=float)[:, None]  # one line per stat
+    over = over_mask(values, grid)
+    rates = hit_rates(over, n_games, windows)[0, :, 0]
+    is_over, count = current_streak(over, n_games)
+    min_avg, min_slope = minutes_trend(df["MIN"].to_numpy(dtype=float)[None], n_games)
+    return {
+        "rates": rates,
+        "avg_o": avg_over(rates),
+        "streak_over": is_over[0, :, 0],
+        "streak_count": count[0, :, 0],
+        "trend": trend(values, n_games, grid)[0, :, 0],
+        "min_avg": float(min_avg[0]),
+        "min_slope": float(min_slope[0]),
+    }
+
+
+def score_props(frame: pd.DataFrame, props: list, windows=(5, 10), key: str = "PLAYER_ID") -> dict:
+    """summarize() for many (key, stat, line) props at once, e.g. a whole pinned board.
+
+    frame is a stacked multi-player log; each prop becomes one row of the
+    kernels, so any mix of players, stats and lines costs a single pass.
+    Returns the same fields as summarize, each indexed by prop; props whose
+    player or stat is missing from frame come back NaN.
+    """
+    stats = sorted({s for _, s, _ in props if s in frame.columns})
+    keys, values, n_games = stack_logs(frame, stats + ["MIN"], key=key)
+    key_pos = {k: i for i, k in enumerate(keys)}
+    stat_pos = {s: i for i, s in enumerate(stats)}
+    found = np.array([k in key_pos and s in stat_pos for k, s, _ in props], dtype=bool)
+    p_idx = np.array([key_pos.get(k, 0) for k, _, _ in props], dtype=int)
+    s_idx = np.array([stat_pos.get(s, 0) for _, s, _ in props], dtype=int)
+    lines = np.array([line for _, _, line in props], dtype=float)
+
+    if not found.any():
+        nan = np.full(len(props), np.nan)
+        return {"rates": np.full((len(props), len(windows)), np.nan), "avg_o": nan,
+                "streak_over": np.zeros(len(props), dtype=bool), "streak_count": np.zeros(len(props), dtype=int),
+                "trend": np.zeros(len(props), dtype=int), "min_avg": nan, "min_slope": nan}
+    # One kernel row per prop: (props, games, 1 stat) against its own line
+    v = values[p_idx, :, s_idx][:, :, None]
+    n = np.where(found, n_games[p_idx], 0)
+    over = over_mask(v, lines[:, None, None, None])
+    rates = hit_rates(over, n, windows)[:, 0, 0]
+    is_over, count = current_streak(over, n)
+    min_avg, min_slope = minutes_trend(values[:, :, -1], n_games)
+    return {
+        "rates": rates,
+        "avg_o": avg_over(rates),
+        "streak_over": is_over[:, 0, 0],
+        "streak_count": count[:, 0, 0],
+        "trend": trend(v, n, lines[:, None, None])[:, 0, 0],
+        "min_avg": np.where(found, min_avg[p_idx], np.nan),
+        "min_slope": np.where(found, min_slope[p_idx], np.nan),
+    }
+
+
+def scan(frame: pd.DataFrame, stats: list, lines, windows=(5, 10), key: str = "PLAYER_ID",
+         min_hit: float = None) -> pd.DataFrame:
+    """Scores every player × stat × line in a stacked log frame.
+
+    Returns one long DataFrame (key, STAT, LINE, L{w}, AVG_O, STREAK, TREND).
+    With min_hit, only rows whose average over- or under-% reaches it are kept.
+    """
+    keys, values, n_games = stack_logs(frame, stats, key=key)
+    lines = np.asarray(lines, dtype=float)
+    over = over_mask(values, lines)
+    rates = hit_rates(over, n_games, windows)
+    avg = avg_over(rates)
+    is_over, count = current_streak(over, n_games)
+    arrows = trend(values, n_games, lines)
+
+    flat = avg.ravel()
+    keep = ~np.isnan(flat)
+    if min_hit is not None:
+        keep &= np.maximum(flat, 100 - flat) >= min_hit
+    sel = np.flatnonzero(keep)
+    p_idx, s_idx, l_idx = np.unravel_index(sel, avg.shape)
+    # Categoricals built from codes avoid materializing ~10^5 Python strings
+    out = {
+        key: pd.Categorical.from_codes(p_idx, keys),
+        "STAT": pd.Categorical.from_codes(s_idx, stats),
+        "LINE": lines[l_idx],
+    }
+    for j, w in enumerate(windows):
+        out[f"L{w}"] = rates[..., j].ravel()[sel]
+    out["AVG_O"] = flat[sel]
+    depth = values.shape[1]
+    streak_labels = [f"U{c}" for c in range(depth + 1)] + [f"O{c}" for c in range(depth + 1)]
+    out["STREAK"] = pd.Categorical.from_codes(
+        is_over.ravel()[sel] * (depth + 1) + count.ravel()[sel], streak_labels
+    )
+    out["TREND"] = pd.Categorical.from_codes(arrows.ravel()[sel] + 1, ["↓", "→", "↑"])
+    return pd.DataFrame(out)
+
+
+def best_lines(table: pd.DataFrame, min_hit: float, key: str = "PLAYER_ID") -> pd.DataFrame:
+    """Keeps the toughest qualifying line per player × stat × side.
+
+    Over: the highest line still hit at least min_hit % of the time; under: the
+    lowest. Window columns and HIT are expressed for the chosen side.
+    """
+    windows = [c for c in table.columns if c.startswith("L") and c[1:].isdigit()]
+    over = table[table["AVG_O"] >= min_hit]
+    under = table[100 - table["AVG_O"] >= min_hit]
+    over = over.loc[over.groupby([key, "STAT"], observed=True)["LINE"].idxmax()].assign(SIDE="O")
+    under = under.loc[under.groupby([key, "STAT"], observed=True)["LINE"].idxmin()].assign(SIDE="U")
+    under[windows] = 100 - under[windows]
+    out = pd.concat([over, under], ignore_index=True)
+    out["HIT"] = np.where(out["SIDE"] == "O", out["AVG_O"], 100 - out["AVG_O"])
+    return out.drop(columns="AVG_O")
+
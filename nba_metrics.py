@@ -0,0 +1,218 @@
+"""Process-wide instrumentation: page-section timings, nba_api calls, cache hits.
+
+nba_wrk starts a Run at the top of every script run and lap()s it at each
+section; finish() files it with the recent runs. A section lapped more than
+once in a run (e.g. once per selected stat) accumulates. While tracemalloc is
+tracing (nba_bench turns it on), sections also report allocations: net
+(retained at the end of the section) and peak above the section's start.
+
+Alongside the runs, labelled counters and latency histograms are fed by
+nba_fetch (upstream requests, bytes, throttling), nba_cache and the
+st.cache_data wrappers (hits / misses), nba_store (partition syncs) and
+nba_data (per-player game-log footprint).
+snapshot() returns them as JSON, prometheus() in the Prometheus text format.
+With NBA_METRICS_FILE set, every finished run rewrites that file — JSON when
+it ends in .json, Prometheus text otherwise; "{pid}" in the path is replaced
+by the process id so replicas don't overwrite each other.
+"""
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+HISTORY = int(os.environ.get("NBA_METRICS_HISTORY", "200"))
+METRICS_FILE = os.environ.get("NBA_METRICS_FILE", "")
+# Histogram bounds (+Inf is implicit): latency in seconds, sizes in bytes
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (8e3, 16e3, 32e3, 64e3, 128e3, 256e3, 512e3, 1e6, 2e6, 4e6)
+
+_runs = deque(maxlen=HISTORY)
+_runs_lock = threading.Lock()
+_seq = 0
+
+_counters = {}     # (name, labels) → float
+_histograms = {}   # (name, labels) → (bounds, [bucket counts..., +Inf count, sum])
+_metrics_lock = threading.Lock()
+
+
+# ── Counters and histograms ─────────────────────────────────────────────────────
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, amount: float = 1, **labels):
+    key = (name, _labels(labels))
+    with _metrics_lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name: str, value: float, buckets: tuple = BUCKETS, **labels):
+    key = (name, _labels(labels))
+    with _metrics_lock:
+        entry = _histograms.get(key)
+        if entry is None:
+            entry = _histograms[key] = (buckets, [0] * (len(buckets) + 1) + [0.0])
+        bounds, hist = entry
+        for i, bound in enumerate(bounds):
+            if value <= bound:
+                hist[i] += 1
+        hist[len(bounds)] += 1
+        hist[-1] += value
+
+
+def counted_cache(cache_decorator, name: str = None):
+    """Applies cache_decorator (e.g. st.cache_data(ttl=300)) and counts each call
+    as a hit or miss in nba_cache_requests_total{cache="st", fn=...}."""
+    miss = threading.local()
+
+    def decorator(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def on_miss(*args, **kwargs):
+            miss.flag = True
+            return fn(*args, **kwargs)
+        cached = cache_decorator(on_miss)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            miss.flag = False
+            result = cached(*args, **kwargs)
+            inc("nba_cache_requests_total", cache="st", fn=label, result="miss" if miss.flag else "hit")
+            return result
+        wrapper.clear = getattr(cached, "clear", None)
+        return wrapper
+    return decorator
+
+
+def quantile(bounds: tuple, hist: list, q: float) -> float:
+    """Upper bucket bound holding the q-th observation (NaN if empty)."""
+    total = hist[len(bounds)]
+    if not total:
+        return float("nan")
+    for i, bound in enumerate(bounds):
+        if hist[i] >= q * total:
+            return bound
+    return float("inf")
+
+
+class Run:
+    def __init__(self, name: str = "page"):
+        self.name = name
+        self.started = time.time()
+        self.sections = {}   # name → {"wall_ms", "calls"[, "alloc_net_kb", "alloc_peak_kb"]}
+        self._open = None
+        self._t0 = time.perf_counter()
+
+    def lap(self, section: str):
+        """Ends the current section (if any) and starts `section`."""
+        self._close()
+        mem = None
+        if tracemalloc.is_tracing():
+            mem = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._open = (section, time.perf_counter(), mem)
+
+    def _close(self):
+        if self._open is None:
+            return
+        section, t0, mem = self._open
+        self._open = None
+        stats = self.sections.setdefault(section, {"wall_ms": 0.0, "calls": 0})
+        stats["wall_ms"] += (time.perf_counter() - t0) * 1000
+        stats["calls"] += 1
+        if mem is not None and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            stats["alloc_net_kb"] = stats.get("alloc_net_kb", 0.0) + (current - mem) / 1024
+            stats["alloc_peak_kb"] = max(stats.get("alloc_peak_kb", 0.0), (peak - mem) / 1024)
+
+    def finish(self) -> dict:
+        """Closes the last section and records the run. Call before st.stop()."""
+        global _seq
+        self._close()
+        with _runs_lock:
+            _seq += 1
+            record = {
+                "seq": _seq,
+                "name": self.name,
+                "started": self.started,
+                "total_ms": (time.perf_counter() - self._t0) * 1000,
+                "sections": self.sections,
+            }
+            _runs.append(record)
+        observe("nba_run_seconds", record["total_ms"] / 1000, run=self.name)
+        for section, stats in self.sections.items():
+            observe("nba_section_seconds", stats["wall_ms"] / 1000, section=section)
+        if METRICS_FILE:
+            write(METRICS_FILE.replace("{pid}", str(os.getpid())))
+        return record
+
+
+def last_seq() -> int:
+    with _runs_lock:
+        return _seq
+
+
+def recent_runs(since: int = 0) -> list:
+    """Finished runs (oldest first), optionally only those after sequence number `since`."""
+    with _runs_lock:
+        return [r for r in _runs if r["seq"] > since]
+
+
+# ── Export ──────────────────────────────────────────────────────────────────────
+def snapshot() -> dict:
+    """Counters, histograms (with p50/p95 bucket bounds) and the last run, JSON-ready."""
+    with _metrics_lock:
+        counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(_counters.items())]
+        histograms = [
+            {"name": n, "labels": dict(l), "count": h[len(b)], "sum": h[-1],
+             "p50": quantile(b, h, 0.5), "p95": quantile(b, h, 0.95),
+             "buckets": dict(zip([f"{x:g}" for x in b] + ["+Inf"], h[:len(b) + 1]))}
+            for (n, l), (b, h) in sorted(_histograms.items())
+        ]
+    runs = recent_runs()
+    return {"pid": os.getpid(), "time": time.time(), "counters": counters,
+            "histograms": histograms, "last_run": runs[-1] if runs else None}
+
+
+def _prom_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+def prometheus() -> str:
+    """Prometheus text exposition of every counter and histogram."""
+    out = []
+    with _metrics_lock:
+        typed = set()
+        for (name, labels), value in sorted(_counters.items()):
+            if name not in typed:
+                out.append(f"# TYPE {name} counter")
+                typed.add(name)
+            out.append(f"{name}{_prom_labels(labels)} {value:g}")
+        for (name, labels), (bounds, hist) in sorted(_histograms.items()):
+            if name not in typed:
+                out.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            for bound, count in zip([f"{b:g}" for b in bounds] + ["+Inf"], hist[:len(bounds) + 1]):
+                out.append(f"{name}_bucket{_prom_labels(labels, [('le', bound)])} {count}")
+            out.append(f"{name}_sum{_prom_labels(labels)} {hist[-1]:.6f}")
+            out.append(f"{name}_count{_prom_labels(labels)} {hist[len(bounds)]}")
+    return "\n".join(out) + "\n"
+
+
+def write(path: str):
+    """Atomically rewrites path with the current metrics (JSON for *.json, else Prometheus text)."""
+    body = json.dumps(snapshot()) if path.endswith(".json") else prometheus()
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w") as f:
+            f.write(body)
+        os.replace(tmp, path)
+    except OSError:
+        pass
@@ -0,0 +1,176 @@
+"""Parlay builder over the pinned board.
+
+Every pinned prop is a leg with a decimal price (odds converted once into an
+array) and a hit / miss record over its player's last `window` games, kept as
+Python-int bitsets over the union of those GAME_IDs, so intersecting the games
+two legs share is an AND and a popcount.
+
+Joint hit probability of a parlay: legs whose records share at least
+MIN_SHARED games (same player, teammates) are grouped. A group's probability
+is the rate at which all of its legs hit together in the games they share,
+shrunk toward the product of their marginals by PRIOR_GAMES pseudo-games;
+groups are treated as independent of each other.
+
+Search is a beam over leg counts: every kept k-leg parlay is extended by each
+remaining leg, and only the `beam` most likely (k+1)-leg parlays above
+min_prob survive, so a 40-prop board stays in the low thousands of
+evaluations per leg count instead of C(40, 6) ≈ 3.8M.
+
+    python nba_parlay.py     # timing on a synthetic 40-prop board
+"""
+import heapq
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+import nba_board
+
+WINDOW = 20        # games per player the records cover
+MIN_SHARED = 5     # shared games before two legs count as correlated
+PRIOR_GAMES = 4    # pseudo-games pulling a group's joint rate toward independence
+BEAM = 300
+
+
+class Legs:
+    """Board props as arrays: decimal price, marginal hit rate and game bitsets."""
+
+    def __init__(self, board, frame: pd.DataFrame, window: int = WINDOW, key: str = "PLAYER_ID"):
+        entries = [e for e in board if e.get("player_id")]
+        recent = frame.sort_values([key, "GAME_DATE_DT"], ascending=[True, False])
+        recent = recent[recent.groupby(key, sort=False).cumcount() < window]
+        game_codes, game_ids = pd.factorize(recent["GAME_ID"].astype(str))
+        rows_by_player = recent.groupby(recent[key].astype(str), sort=False).indices
+
+        def bits(codes) -> int:
+            mask = np.zeros(len(game_ids), bool)
+            mask[codes] = True
+            return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+        self.entries, prices, self.played, self.hit = [], [], [], []
+        for e in entries:
+            rows = rows_by_player.get(str(e["player_id"]))
+            price = nba_board.odds_multiplier(e.get("odds"))
+            if rows is None or price is None or e["stat"] not in recent.columns:
+                continue
+            values = recent[e["stat"]].to_numpy(dtype=float)[rows]
+            ok = ~np.isnan(values)
+            if not ok.any():
+                continue
+            self.entries.append(e)
+            prices.append(price)
+            self.played.append(bits(game_codes[rows][ok]))
+            self.hit.append(bits(game_codes[rows][ok & (values > float(e["line"]))]))
+
+        self.price = np.array(prices, dtype=float)
+        n_played = np.array([p.bit_count() for p in self.played], dtype=float)
+        self.prob = np.array([h.bit_count() for h in self.hit], dtype=float) / np.maximum(n_played, 1)
+        # (player, stat) of each leg — two lines of one stat are never combined
+        self._prop = [(str(e["player_id"]), e["stat"]) for e in self.entries]
+        n = len(self.entries)
+        self.linked = np.zeros((n, n), bool)
+        for i, j in combinations(range(n), 2):
+            self.linked[i, j] = self.linked[j, i] = (self.played[i] & self.played[j]).bit_count() >= MIN_SHARED
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _groups(self, combo) -> list:
+        """Legs of combo split into groups connected through shared games."""
+        groups = []
+        for i in combo:
+            joined = [g for g in groups if any(self.linked[i, j] for j in g)]
+            merged = [i] + [j for g in joined for j in g]
+            groups = [g for g in groups if g not in joined] + [merged]
+        return groups
+
+    def joint(self, combo) -> tuple:
+        """(joint probability, correlated) of the legs in combo."""
+        prob, correlated = 1.0, False
+        for group in self._groups(combo):
+            indep = float(np.prod(self.prob[group]))
+            if len(group) == 1:
+                prob *= indep
+                continue
+            correlated = True
+            played = hit = -1   # all bits set
+            for i in group:
+                played &= self.played[i]
+                hit &= self.hit[i]
+            n = played.bit_count()
+            prob *= ((hit & played).bit_count() + PRIOR_GAMES * indep) / (n + PRIOR_GAMES)
+        return prob, correlated
+
+    def compatible(self, combo, j) -> bool:
+        return j not in combo and all(self._prop[i] != self._prop[j] for i in combo)
+
+
+def build_parlays(board, frame: pd.DataFrame, min_legs: int = 2, max_legs: int = 4, min_leg_prob: float = 0.5,
+                  min_prob: float = 0.05, window: int = WINDOW, beam: int = BEAM, top: int = 50) -> pd.DataFrame:
+    """Most likely parlays of min_legs..max_legs legs from board, given the players'
+    game logs (frame: stacked logs with PLAYER_ID, as for nba_hitrate.scan).
+
+    Columns: LEGS (list of board entries), N, PROB, INDEP (product of the legs'
+    rates), PAYOUT (decimal), EV (per unit staked), CORRELATED; sorted by PROB.
+    """
+    columns = ["LEGS", "N", "PROB", "INDEP", "PAYOUT", "EV", "CORRELATED"]
+    if frame.empty:
+        return pd.DataFrame(columns=columns)
+    legs = Legs(board, frame, window)
+    eligible = [i for i in np.argsort(-legs.prob) if legs.prob[i] >= min_leg_prob]
+
+    level = {(i,): float(legs.prob[i]) for i in eligible}
+    scored = {}
+    for size in range(2, max_legs + 1):
+        candidates = {}
+        for combo in heapq.nlargest(beam, level, key=level.get):
+            for j in eligible:
+                if not legs.compatible(combo, j):
+                    continue
+                grown = tuple(sorted(combo + (j,)))
+                if grown in candidates:
+                    continue
+                prob, correlated = legs.joint(grown)
+                if prob >= min_prob:
+                    candidates[grown] = prob
+                    if size >= min_legs:
+                        scored[grown] = (prob, correlated)
+        if not candidates:
+            break
+        level = candidates
+
+    best = heapq.nlargest(top, scored.items(), key=lambda kv: kv[1][0])
+    rows = []
+    for combo, (prob, correlated) in best:
+        payout = float(np.prod(legs.price[list(combo)]))
+        rows.append({
+            "LEGS": [legs.entries[i] for i in combo],
+            "N": len(combo),
+            "PROB": prob,
+            "INDEP": float(np.prod(legs.prob[list(combo)])),
+            "PAYOUT": payout,
+            "EV": prob * payout - 1,
+            "CORRELATED": correlated,
+        })
+    return pd.DataFrame(rows, columns=columns)
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    n_players, n_games = 20, 40
+    frame = pd.DataFrame({
+        "PLAYER_ID": np.repeat([str(p) for p in range(n_players)], n_games),
+        # players 2k and 2k+1 are teammates: same GAME_IDs
+        "GAME_ID": [f"g{p // 2}-{g}" for p in range(n_players) for g in range(n_games)],
+        "GAME_DATE_DT": np.tile(pd.date_range("2025-10-21", periods=n_games).values, n_players),
+        "PTS": rng.poisson(18, n_players * n_games),
+        "REB": rng.poisson(6, n_players * n_games),
+    })
+    board = [{"player_id": str(p), "stat": stat, "line": line, "odds": "-120"}
+             for p in range(n_players) for stat, line in [("PTS", 14.5), ("REB", 4.5)]]
+    started = time.perf_counter()
+    result = build_parlays(board, frame, max_legs=6)
+    print(f"{len(board)} props → {len(result)} parlays in {time.perf_counter() - started:.2f} s")
+    print(result.drop(columns="LEGS").head(10).round(3).to_string())
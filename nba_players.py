@@ -0,0 +1,71 @@
+"""Immutable player-name index, built once per process.
+
+Replaces linear scans of players.get_players() with O(1) name/id lookups.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
+
+from nba_api.stats.static import players
+
+
+class PlayerIndex(NamedTuple):
+    id_by_name: Mapping   # lower-cased full name → id
+    name_by_id: Mapping   # id (str) → full name
+
+
+@lru_cache(maxsize=1)
+def get_index() -> PlayerIndex:
+    id_by_name, name_by_id = {}, {}
+    for p in players.get_players():
+        pid = str(p["id"])
+        id_by_name.setdefault(p["full_name"].lower(), pid)
+        name_by_id[pid] = p["full_name"]
+    return PlayerIndex(MappingProxyType(id_by_name), MappingProxyType(name_by_id))
+
+
+def get_player_id(name: str):
+    """Exact (case-insensitive) full-name → id as str, or None."""
+    return get_index().id_by_name.get(name.lower()) if name else None
+
+
+SUFFIXES = ("jr", "sr", "ii", "iii", "iv")
+
+
+def _fold(name: str, suffix: bool = True) -> str:
+    """"Luka Dončić" → "luka doncic": accent-, case- and punctuation-free; Jr./III dropped unless suffix."""
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    tokens = re.sub(r"[^a-z ]", "", ascii_name.replace("-", " ")).split()
+    return " ".join(t for t in tokens if suffix or t not in SUFFIXES)
+
+
+@lru_cache(maxsize=1)
+def _folded_ids() -> tuple:
+    """(folded name → id, suffix-less folded name → ids)."""
+    folded, bare = {}, {}
+    for name, pid in get_index().id_by_name.items():
+        folded.setdefault(_fold(name), pid)
+        bare.setdefault(_fold(name, suffix=False), []).append(pid)
+    return folded, bare
+
+
+def match_player_id(name: str, pool=None):
+    """get_player_id, falling back to matches that ignore accents and punctuation,
+    then Jr./III suffixes — the spellings odds feeds use. A suffix-less name shared
+    by several players resolves only if exactly one is in pool (e.g. rostered ids)."""
+    if not name:
+        return None
+    folded, bare = _folded_ids()
+    pid = get_player_id(name) or folded.get(_fold(name))
+    if pid:
+        return pid
+    candidates = bare.get(_fold(name, suffix=False), [])
+    if pool is not None and len(candidates) > 1:
+        candidates = [p for p in candidates if p in pool]
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def get_player_name(pid) -> str:
+    return get_index().name_by_id.get(str(pid))
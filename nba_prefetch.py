@@ -0,0 +1,183 @@
+"""Background warm-up of today's slate.
+
+Reads the slate, finds every rostered player on the teams playing and pulls
+their game logs, the opponent defensive rankings and the slate's defense
+matrix (nba_defense) into the shared cache before users arrive. Game logs
+come in bulk first: one LeagueGameLog request per season type and history
+season (nba_data.sync_league_logs; past seasons only once), after which the
+per-player loads read the store without further requests. Refreshes
+every NBA_PREFETCH_INTERVAL seconds, tightening to NBA_PREFETCH_NEAR_INTERVAL
+from two hours before the first tip-off until the last one.
+
+    python nba_prefetch.py            # standalone worker (loop)
+    python nba_prefetch.py --once     # single pass, e.g. from cron
+
+A standalone worker only helps other processes with a shared cache backend
+(NBA_CACHE_BACKEND=sqlite or redis). NBA_PREFETCH=inprocess makes the
+dashboard run the same loop in a daemon thread instead.
+
+Progress is kept in get_status() and mirrored to NBA_PREFETCH_STATUS (JSON).
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+
+import nba_data
+import nba_defense
+
+INTERVAL = float(os.environ.get("NBA_PREFETCH_INTERVAL", "900"))
+NEAR_INTERVAL = float(os.environ.get("NBA_PREFETCH_NEAR_INTERVAL", "300"))
+WORKERS = int(os.environ.get("NBA_PREFETCH_WORKERS", "2"))
+STATUS_PATH = os.environ.get(
+    "NBA_PREFETCH_STATUS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".nba_prefetch.json"),
+)
+
+_status = {
+    "state": "idle",          # idle | warming | warm | error
+    "slate_date": None,
+    "games": 0,
+    "players_total": 0,
+    "players_warm": 0,
+    "players_failed": 0,
+    "defense_warm": False,
+    "league_seasons": [],
+    "last_started": None,
+    "last_finished": None,
+    "last_duration_s": None,
+    "next_run": None,
+}
+_status_lock = threading.Lock()
+
+
+def _update(**fields):
+    with _status_lock:
+        _status.update(fields)
+        snapshot = dict(_status)
+    try:
+        tmp = f"{STATUS_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, STATUS_PATH)
+    except OSError:
+        pass
+
+
+def get_status() -> dict:
+    """This process's prefetch progress."""
+    with _status_lock:
+        return dict(_status)
+
+
+def read_status() -> dict:
+    """Last progress written by any prefetcher on this host (e.g. a separate worker)."""
+    try:
+        with open(STATUS_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def warm_slate(game_date: str = None) -> dict:
+    """One full pass: refresh slate, roster, defense and every playing player's log."""
+    game_date = game_date or date.today().strftime("%Y-%m-%d")
+    started = time.time()
+    _update(state="warming", slate_date=game_date, last_started=datetime.now().isoformat(timespec="seconds"),
+            players_warm=0, players_failed=0, defense_warm=False, league_seasons=[])
+    try:
+        games, num_games = nba_data.get_todays_games.refresh(game_date)
+        team_map = nba_data.get_active_players_with_teams()
+    except Exception:
+        _update(state="error")
+        return get_status()
+
+    teams = {t for g in games for t in (g["away"], g["home"])}
+    pids = sorted(p for p, t in team_map.items() if t in teams)
+    _update(games=num_games, players_total=len(pids))
+
+    try:
+        nba_data.get_opp_def_rankings.refresh(nba_data.CURRENT_SEASON)
+        nba_defense.get_matrix(nba_data.CURRENT_SEASON, game_date)
+        nba_defense.get_player_positions(nba_data.CURRENT_SEASON)
+        _update(defense_warm=True)
+    except Exception:
+        pass
+
+    # Bulk logs first so the per-player loads below are store reads
+    league_seasons = []
+    for season in nba_data.history_seasons():
+        if all(n is not None for n in nba_data.sync_league_logs(season).values()):
+            league_seasons.append(season)
+    _update(league_seasons=league_seasons)
+
+    warm = failed = 0
+    # Separate small pool: each log load already fans out on nba_fetch's pool
+    with ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="prefetch") as pool:
+        futures = [pool.submit(nba_data.get_player_games.refresh, p) for p in pids]
+        for fut in as_completed(futures):
+            try:
+                fut.result()
+                warm += 1
+            except Exception:
+                failed += 1
+            _update(players_warm=warm, players_failed=failed)
+
+    _update(state="warm", last_finished=datetime.now().isoformat(timespec="seconds"),
+            last_duration_s=round(time.time() - started, 1))
+    return get_status()
+
+
+def next_delay(games: list, now: datetime = None) -> float:
+    """Seconds until the next pass: NEAR_INTERVAL from 2h before the first tip
+    until 3h after the last, otherwise INTERVAL."""
+    now = now or datetime.now(timezone.utc)
+    tips = []
+    for g in games:
+        try:
+            tips.append(datetime.fromisoformat(g.get("start_utc", "").replace("Z", "+00:00")))
+        except ValueError:
+            continue
+    if tips and min(tips) - timedelta(hours=2) <= now <= max(tips) + timedelta(hours=3):
+        return NEAR_INTERVAL
+    return INTERVAL
+
+
+def run_forever(stop: threading.Event = None):
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        warm_slate()
+        try:
+            games, _ = nba_data.get_todays_games(date.today().strftime("%Y-%m-%d"))
+        except Exception:
+            games = []
+        delay = next_delay(games)
+        _update(next_run=(datetime.now() + timedelta(seconds=delay)).isoformat(timespec="seconds"))
+        stop.wait(delay)
+
+
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def start_background():
+    """Starts the loop in a daemon thread, once per process."""
+    global _thread
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=run_forever, name="nba-prefetch", daemon=True)
+            _thread.start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warm the cache for today's slate")
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    parser.add_argument("--date", help="slate date YYYY-MM-DD (default today)")
+    args = parser.parse_args()
+    if args.once:
+        print(json.dumps(warm_slate(args.date), indent=2))
+    else:
+        run_forever()
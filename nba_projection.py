@@ -0,0 +1,174 @@
+"""Per-player stat distributions → P(over) and fair odds for every line.
+
+Each stat is a count with a minutes-adjusted, recency-weighted mean and a
+quasi-Poisson dispersion, fitted over the last WINDOW games with weights
+halving every HALF_LIFE games:
+
+    rate     λ = Σ w·x / Σ w·MIN                  per minute
+    minutes  m = Σ w·MIN / Σ w                    projected minutes
+    mean     μ = λ·m
+    φ          = Σ w·(x − λ·MIN)² / Σ w·λ·MIN     dispersion vs. Poisson
+
+X ~ NegBinomial(mean μ, variance φ·μ), Poisson when φ ≤ 1. Games under
+MIN_MINUTES (early exits) are left out. The CDF up to the highest line comes
+from the pmf recurrence — one cumprod for every player × stat — so a whole
+slate is a handful of array ops.
+
+Fitted parameters are kept per player, tagged with the newest GAME_ID they
+include: project() only refits players whose log gained a game.
+
+    python -m pytest tests/test_projection.py     # correctness + timings
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+import nba_hitrate
+
+STATS = ["PTS", "FG3M", "AST", "REB", "Ast+Reb", "STL", "BLK", "TOV", "FGM", "FGA",
+         "FG3A", "2PM", "2PA", "Pts+Reb", "Pts+Ast", "Stl+Blk", "PRA"]
+WINDOW = 30
+HALF_LIFE = 8.0
+MIN_GAMES = 3        # fewer usable games → no projection (NaN)
+MIN_MINUTES = 5.0
+MAX_SIZE = 1e6       # negative binomial size standing in for Poisson
+
+
+class Projection:
+    """Fitted mean μ and size r per (player, stat), plus projected minutes per player."""
+
+    def __init__(self, keys, stats, mu: np.ndarray, size: np.ndarray, minutes: np.ndarray, games: np.ndarray):
+        self.keys = list(keys)
+        self.stats = list(stats)
+        self.mu = mu
+        self.size = size
+        self.minutes = minutes
+        self.games = games
+        self._key_ix = {k: i for i, k in enumerate(self.keys)}
+        self._stat_ix = {s: j for j, s in enumerate(self.stats)}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._key_ix
+
+    def p_over(self, lines) -> np.ndarray:
+        """P(stat > line) for every player × stat × line → (players, stats, lines)."""
+        lines = np.asarray(lines, dtype=float)
+        cdf = cdf_table(self.mu, self.size, int(np.floor(lines.max())) if len(lines) else 0)
+        return 1 - cdf[..., np.floor(lines).astype(int)]
+
+    def p_over_at(self, keys, stats, lines) -> np.ndarray:
+        """P(stat > line) for parallel sequences of (key, stat, line), e.g. the rows of
+        an odds sheet → (rows,); NaN where the player or stat isn't projected."""
+        i = np.array([self._key_ix.get(k, -1) for k in keys], dtype=int)
+        j = np.array([self._stat_ix.get(s, -1) for s in stats], dtype=int)
+        lines = np.maximum(np.asarray(lines, dtype=float), 0)
+        found = (i >= 0) & (j >= 0)
+        if not found.any():
+            return np.full(len(lines), np.nan)
+        mu = np.where(found, self.mu[i, j], np.nan)
+        size = np.where(found, self.size[i, j], MAX_SIZE)
+        cdf = cdf_table(mu, size, int(np.floor(lines.max())))
+        return 1 - cdf[np.arange(len(lines)), np.floor(lines).astype(int)]
+
+    def mean(self, key, stat) -> float:
+        i, j = self._key_ix.get(key), self._stat_ix.get(stat)
+        return float("nan") if i is None or j is None else float(self.mu[i, j])
+
+    def ladder(self, key, stat: str, lines) -> pd.DataFrame:
+        """LINE, P_OVER, FAIR_OVER, FAIR_UNDER for one player's stat (empty if not projected)."""
+        i, j = self._key_ix.get(key), self._stat_ix.get(stat)
+        lines = np.asarray(lines, dtype=float)
+        if i is None or j is None or np.isnan(self.mu[i, j]):
+            return pd.DataFrame(columns=["LINE", "P_OVER", "FAIR_OVER", "FAIR_UNDER"])
+        single = Projection([key], [stat], self.mu[i:i + 1, j:j + 1], self.size[i:i + 1, j:j + 1],
+                            self.minutes[i:i + 1], self.games[i:i + 1])
+        p = single.p_over(lines)[0, 0]
+        return pd.DataFrame({"LINE": lines, "P_OVER": p, "FAIR_OVER": fair_odds(p), "FAIR_UNDER": fair_odds(1 - p)})
+
+
+def cdf_table(mu: np.ndarray, size: np.ndarray, k_max: int) -> np.ndarray:
+    """P(X ≤ k) for k = 0..k_max of NegBinomial(mean mu, size) → mu.shape + (k_max + 1,)."""
+    mu = np.asarray(mu, dtype=float)[..., None]
+    size = np.asarray(size, dtype=float)[..., None]
+    q = mu / (size + mu)                                 # 1 - success probability
+    k = np.arange(k_max)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p0 = np.exp(size * np.log1p(-q))
+        ratios = (k + size) / (k + 1) * q                 # pmf(k + 1) / pmf(k)
+    pmf = np.concatenate([np.ones(mu.shape), np.cumprod(ratios, axis=-1)], axis=-1) * p0
+    return np.minimum(np.cumsum(pmf, axis=-1), 1.0)
+
+
+def fair_odds(p) -> np.ndarray:
+    """No-vig American odds for probability p: 0.6 → -150, 0.4 → +150 (NaN at 0 / 1)."""
+    p = np.asarray(p, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        odds = np.where(p >= 0.5, -100 * p / (1 - p), 100 * (1 - p) / p)
+    return np.where((p > 0) & (p < 1), odds, np.nan)
+
+
+def format_odds(odds) -> str:
+    """-150.3 → "-150", 150 → "+150", NaN → "—" (the odds dropdown's spelling)."""
+    return "—" if odds is None or np.isnan(odds) else f"{odds:+.0f}"
+
+
+def fit(frame: pd.DataFrame, stats: list = None, key: str = "PLAYER_ID") -> Projection:
+    """Fits every player × stat of a stacked log frame (newest-first logs with MIN) in one pass."""
+    stats = [s for s in (stats or STATS) if s in frame.columns]
+    keys, values, _ = nba_hitrate.stack_logs(frame, stats + ["MIN"], key=key, depth=WINDOW)
+    x = np.nan_to_num(values[..., :-1])
+    minutes = values[..., -1]
+    played = ~np.isnan(minutes) & (minutes >= MIN_MINUTES)
+    m = np.where(played, minutes, 0.0)
+    w = np.where(played, 0.5 ** (np.arange(values.shape[1]) / HALF_LIFE), 0.0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        w_sum = w.sum(axis=1)
+        wm_sum = (w * m).sum(axis=1)
+        proj_min = wm_sum / w_sum
+        rate = np.einsum("pg,pgs->ps", w, x) / wm_sum[:, None]
+        expected = rate[:, None, :] * m[..., None]
+        phi = np.einsum("pg,pgs->ps", w, (x - expected) ** 2) / np.einsum("pg,pgs->ps", w, expected)
+        mu = rate * proj_min[:, None]
+        size = np.where(phi > 1, mu / (phi - 1), MAX_SIZE)
+    size = np.clip(np.nan_to_num(size, nan=MAX_SIZE), 1e-3, MAX_SIZE)
+    games = played.sum(axis=1)
+    mu[games < MIN_GAMES] = np.nan
+    return Projection(keys, stats, mu, size, proj_min, games)
+
+
+# ── Per-player parameter cache ──────────────────────────────────────────────────
+_params = {}   # key → (newest GAME_ID, stats, mu[S], size[S], minutes, games)
+_params_lock = threading.Lock()
+
+
+def project(frame: pd.DataFrame, stats: list = None, key: str = "PLAYER_ID") -> Projection:
+    """fit() for a stacked log frame, reusing the cached parameters of every player
+    whose newest GAME_ID is unchanged since their last fit."""
+    stats = tuple(s for s in (stats or STATS) if s in frame.columns)
+    if frame.empty:
+        return Projection([], stats, np.empty((0, len(stats))), np.empty((0, len(stats))), np.empty(0), np.empty(0))
+    newest = frame.loc[frame.groupby(key, sort=False)["GAME_DATE_DT"].idxmax(), [key, "GAME_ID"]]
+    tags = dict(zip(newest[key], newest["GAME_ID"].astype(str)))
+    with _params_lock:
+        stale = [k for k, tag in tags.items() if _params.get(k, (None, None))[:2] != (tag, stats)]
+    if stale:
+        fitted = fit(frame[frame[key].isin(stale)], list(stats), key)
+        with _params_lock:
+            for i, k in enumerate(fitted.keys):
+                _params[k] = (tags[k], stats, fitted.mu[i], fitted.size[i], fitted.minutes[i], fitted.games[i])
+
+    keys = list(tags)
+    with _params_lock:
+        rows = [_params[k] for k in keys]
+    return Projection(
+        keys, stats,
+        np.array([r[2] for r in rows]).reshape(len(keys), len(stats)),
+        np.array([r[3] for r in rows]).reshape(len(keys), len(stats)),
+        np.array([r[4] for r in rows], dtype=float),
+        np.array([r[5] for r in rows]),
+    )
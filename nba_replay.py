@@ -0,0 +1,179 @@
+"""Record / replay transport for nba_api.
+
+NBA_API_MODE selects what NBAStatsHTTP.send_api_request does:
+    live    talk to stats.nba.com (default; this module stays out of the way)
+    record  talk to stats.nba.com and keep every good response in the archive
+    replay  never touch the network — answer from the archive
+
+The archive (NBA_REPLAY_ARCHIVE, default .nba_replay.zip) is a deflated zip
+with one entry per request, named endpoint/<loose key>/<exact key>.json. The
+exact key covers every parameter; the loose key leaves out the date parameters
+so a replay on another day (a later DateFrom, today's GameDate) still gets the
+newest recording of the same request. A request with neither raises ReplayMiss.
+
+In replay mode every request can be slowed down and failed on purpose:
+    NBA_REPLAY_LATENCY     seconds, "0.3" or a uniform range "0.1-0.6"
+    NBA_REPLAY_ERROR_RATE  share of requests that raise InjectedError (0-1)
+    NBA_REPLAY_SEED        the n-th call for a given request always draws the
+                           same latency and error, whatever the thread order
+
+    python nba_replay.py                # summary of the archive
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import zipfile
+from collections import Counter
+
+from nba_api.stats.library.http import NBAStatsHTTP
+
+MODE = os.environ.get("NBA_API_MODE", "live")
+ARCHIVE = os.environ.get(
+    "NBA_REPLAY_ARCHIVE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".nba_replay.zip"),
+)
+LATENCY = os.environ.get("NBA_REPLAY_LATENCY", "0")
+ERROR_RATE = float(os.environ.get("NBA_REPLAY_ERROR_RATE", "0"))
+SEED = os.environ.get("NBA_REPLAY_SEED", "0")
+
+# Parameters that move with the calendar rather than identify the data
+DATE_PARAMS = {"DateFrom", "DateTo", "GameDate"}
+
+
+class ReplayMiss(LookupError):
+    """The archive has no recording for a request made in replay mode."""
+
+
+class InjectedError(ConnectionError):
+    """Failure injected by NBA_REPLAY_ERROR_RATE."""
+
+
+def _digest(endpoint: str, params) -> str:
+    text = endpoint.lower() + "?" + "&".join(f"{k}={'' if v is None else v}" for k, v in sorted(params))
+    return hashlib.sha1(text.encode()).hexdigest()[:20]
+
+
+def request_keys(endpoint: str, parameters: dict):
+    """(exact, loose) keys of one request."""
+    items = list(parameters.items())
+    return _digest(endpoint, items), _digest(endpoint, [kv for kv in items if kv[0] not in DATE_PARAMS])
+
+
+class Archive:
+    """Zip of recorded responses; the index is read once, bodies on demand."""
+
+    def __init__(self, path: str = ARCHIVE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._exact = {}   # exact key → entry name
+        self._loose = {}   # loose key → newest entry name
+        self._reader = None
+        if os.path.exists(path):
+            with zipfile.ZipFile(path) as zf:
+                for info in sorted(zf.infolist(), key=lambda i: i.date_time):
+                    self._index(info.filename)
+
+    def _index(self, name: str):
+        _, loose, exact = name[:-len(".json")].split("/")
+        self._exact[exact] = name
+        self._loose[loose] = name
+
+    def __len__(self):
+        return len(self._exact)
+
+    def get(self, endpoint: str, parameters: dict):
+        """Recorded response body (str), or None."""
+        exact, loose = request_keys(endpoint, parameters)
+        name = self._exact.get(exact) or self._loose.get(loose)
+        if name is None:
+            return None
+        with self._lock:
+            if self._reader is None:
+                self._reader = zipfile.ZipFile(self.path)
+            return json.loads(self._reader.read(name))["body"]
+
+    def put(self, endpoint: str, parameters: dict, body: str):
+        """Stores one response; a request recorded before keeps its first recording."""
+        exact, loose = request_keys(endpoint, parameters)
+        name = f"{endpoint.lower()}/{loose}/{exact}.json"
+        record = {"endpoint": endpoint, "params": parameters, "recorded_at": time.time(), "body": body}
+        with self._lock:
+            if exact in self._exact:
+                return
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+            with zipfile.ZipFile(self.path, "a", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+                zf.writestr(name, json.dumps(record, separators=(",", ":")))
+            self._index(name)
+
+
+# ── Transport ───────────────────────────────────────────────────────────────────
+_original_send = NBAStatsHTTP.send_api_request
+_archive = None
+_calls = Counter()
+_calls_lock = threading.Lock()
+
+
+def _latency_bounds():
+    low, _, high = LATENCY.partition("-")
+    return float(low), float(high or low)
+
+
+def _inject(endpoint: str, parameters: dict):
+    """Sleeps and maybe fails, drawing from an RNG keyed by (seed, request, call number)."""
+    exact, _ = request_keys(endpoint, parameters)
+    with _calls_lock:
+        _calls[exact] += 1
+        n = _calls[exact]
+    rng = random.Random(f"{SEED}:{exact}:{n}")
+    low, high = _latency_bounds()
+    delay = rng.uniform(low, high)
+    fail = rng.random() < ERROR_RATE
+    if delay > 0:
+        time.sleep(delay)
+    if fail:
+        raise InjectedError(f"injected failure: {endpoint} (call {n})")
+
+
+def _send_api_request(self, endpoint, parameters, *args, **kwargs):
+    if MODE == "replay":
+        _inject(endpoint, parameters)
+        body = _archive.get(endpoint, parameters)
+        if body is None:
+            raise ReplayMiss(f"no recording for {endpoint} {sorted(parameters.items())}")
+        return self.nba_response(response=body, status_code=200, url=f"replay://{endpoint}")
+
+    response = _original_send(self, endpoint, parameters, *args, **kwargs)
+    if response._status_code == 200 and response.valid_json():
+        _archive.put(endpoint, dict(parameters), response.get_response())
+    return response
+
+
+def install(mode: str = None, archive: str = None):
+    """Routes nba_api through the archive (record or replay); mode "live" undoes it."""
+    global MODE, _archive
+    MODE = mode or MODE
+    if MODE == "live":
+        NBAStatsHTTP.send_api_request = _original_send
+        return
+    if MODE not in ("record", "replay"):
+        raise ValueError(f"NBA_API_MODE must be live, record or replay, not {MODE!r}")
+    _archive = Archive(archive or ARCHIVE)
+    NBAStatsHTTP.send_api_request = _send_api_request
+
+
+if __name__ == "__main__":
+    if not os.path.exists(ARCHIVE):
+        raise SystemExit(f"No archive at {ARCHIVE} — run the app with NBA_API_MODE=record first")
+    with zipfile.ZipFile(ARCHIVE) as zf:
+        infos = zf.infolist()
+    by_endpoint = Counter(i.filename.split("/", 1)[0] for i in infos)
+    raw = sum(i.file_size for i in infos)
+    packed = sum(i.compress_size for i in infos)
+    print(f"{ARCHIVE}: {len(infos)} responses, {raw / 1e6:.1f} MB raw → {packed / 1e6:.1f} MB deflated")
+    for endpoint, n in by_endpoint.most_common():
+        print(f"  {endpoint:<28} {n}")
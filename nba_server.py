@@ -0,0 +1,285 @@
+"""Headless JSON API over the dashboard's data layer.
+
+    python nba_server.py [--host 127.0.0.1] [--port 8080]
+
+    GET /slate?date=YYYY-MM-DD                               today's games
+    GET /players/{pid}/logs?limit=N                          newest-first game log
+    GET /players/{pid}/hitrates?stat=PTS&line=24.5           hit rates (stat/line repeat, windows=5,10)
+    GET /players/{pid}/projection?stat=PTS[&line=24.5]       model P(over) + fair odds (default: every line)
+    GET /defense?season=YYYY-YY&per_mode=PerGame&last_n=0    all opponent defensive ranks
+    GET /defense/{team}?stat=PRA&position=G                  rank badges for one team (season, L10, L5)
+    GET /metrics[?format=json]                               nba_metrics counters (Prometheus text)
+
+Upstream data goes through the same shared nba_cache as the dashboard, with a
+small in-process TTL layer on top where concurrent misses for one key share a
+single load. Player ids must be numeric: anything else is a 404 before it can
+reach the store or nba_api. Encoded responses are cached per data version and
+carry ETag / Last-Modified, so pollers that send If-None-Match or
+If-Modified-Since get a bodyless 304.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import date
+from email.utils import formatdate, parsedate_to_datetime
+
+import numpy as np
+from aiohttp import web
+
+import nba_data
+import nba_defense
+import nba_hitrate
+import nba_metrics
+import nba_projection
+
+# Same freshness as the st.cache_data TTLs in nba_wrk
+TTL_GAMES = 300
+TTL_LOGS = 300
+TTL_DEFENSE = 3600
+RESPONSE_CACHE_SIZE = 4096
+SOURCE_CACHE_SIZE = 1024     # loaded logs / slates / matrices kept in memory
+
+
+class _SourceCache:
+    """Async TTL cache with an LRU bound; concurrent misses for one key await the same fetch."""
+
+    def __init__(self, max_entries: int = SOURCE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key → (value, fetched_at), least recently used first
+        self._inflight = {}   # key → asyncio.Task
+
+    async def get(self, key, ttl, fn, *args):
+        entry = self._entries.get(key)
+        if entry is not None and time.time() - entry[1] < ttl:
+            self._entries.move_to_end(key)
+            return entry
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, fn, args))
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key, fn, args):
+        try:
+            value = await asyncio.to_thread(fn, *args)
+            entry = (value, time.time())
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+        finally:
+            self._inflight.pop(key, None)
+
+
+_sources = _SourceCache()
+_responses = OrderedDict()   # (path + query, data version) → (body, etag, last_modified)
+
+
+def _num(x, digits=1):
+    """float for JSON — NaN becomes null."""
+    x = float(x)
+    return None if np.isnan(x) else round(x, digits)
+
+
+def _json_response(request, stamp: float, build):
+    """Serves build() as JSON, reusing the encoded body while the data version is unchanged."""
+    key = (request.path_qs, stamp)
+    cached = _responses.get(key)
+    if cached is None:
+        body = json.dumps(build(), separators=(",", ":")).encode()
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        cached = (body, etag, formatdate(stamp, usegmt=True))
+        _responses[key] = cached
+        if len(_responses) > RESPONSE_CACHE_SIZE:
+            _responses.popitem(last=False)
+    else:
+        _responses.move_to_end(key)
+    body, etag, last_modified = cached
+    headers = {"ETag": etag, "Last-Modified": last_modified, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        if "*" in tags or etag in tags:
+            return web.Response(status=304, headers=headers)
+    elif request.headers.get("If-Modified-Since"):
+        try:
+            since = parsedate_to_datetime(request.headers["If-Modified-Since"]).timestamp()
+            if int(stamp) <= since:
+                return web.Response(status=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+    return web.Response(body=body, content_type="application/json", headers=headers)
+
+
+async def _player_log(pid: str):
+    df, stamp = await _sources.get(("logs", pid), TTL_LOGS, nba_data.get_player_games, pid)
+    if df.empty:
+        raise web.HTTPNotFound(text=f"No games for player {pid}")
+    return df, stamp
+
+
+# ── Handlers ────────────────────────────────────────────────────────────────────
+async def slate(request):
+    game_date = request.query.get("date", date.today().strftime("%Y-%m-%d"))
+    (games, count), stamp = await _sources.get(("slate", game_date), TTL_GAMES, nba_data.get_todays_games, game_date)
+    return _json_response(request, stamp, lambda: {"date": game_date, "count": count, "games": games})
+
+
+async def player_logs(request):
+    pid = request.match_info["pid"]
+    try:
+        limit = int(request.query["limit"]) if "limit" in request.query else None
+    except ValueError:
+        raise web.HTTPBadRequest(text="limit must be an integer")
+    df, stamp = await _player_log(pid)
+    limit = len(df) if limit is None else min(max(limit, 0), len(df))
+
+    def build():
+        games = nba_data.with_display_dates(df.head(limit))
+        return {"player_id": pid, "games": json.loads(games.to_json(orient="records", date_format="iso"))}
+    return _json_response(request, stamp, build)
+
+
+async def player_hitrates(request):
+    pid = request.match_info["pid"]
+    stats = request.query.getall("stat", [])
+    try:
+        lines = [float(x) for x in request.query.getall("line", [])]
+        windows = tuple(int(w) for w in request.query.get("windows", "5,10").split(","))
+    except ValueError:
+        raise web.HTTPBadRequest(text="line must be numeric and windows a comma list of ints")
+    if any(w <= 0 for w in windows):
+        raise web.HTTPBadRequest(text="windows must be positive game counts")
+    if not stats or len(stats) != len(lines):
+        raise web.HTTPBadRequest(text="Pass one line per stat: ?stat=PTS&line=24.5")
+
+    df, stamp = await _player_log(pid)
+
+    def build():
+        log = df
+        unknown = [s for s in stats if s not in log.columns]
+        if unknown:
+            raise web.HTTPBadRequest(text=f"Unknown stat(s): {', '.join(unknown)}")
+        summary = nba_hitrate.summarize(log, stats, lines, windows=windows)
+        props = []
+        for i, (stat, line) in enumerate(zip(stats, lines)):
+            props.append({
+                "stat": stat,
+                "line": line,
+                "rates": {f"L{w}": _num(summary["rates"][i, j]) for j, w in enumerate(windows)},
+                "avg_o": _num(summary["avg_o"][i]),
+                "streak": f"{'O' if summary['streak_over'][i] else 'U'}{int(summary['streak_count'][i])}",
+                "trend": int(summary["trend"][i]),
+            })
+        return {
+            "player_id": pid,
+            "games": len(log),
+            "newest_game_id": str(log["GAME_ID"].iloc[0]) if "GAME_ID" in log.columns else None,
+            "min_avg": _num(summary["min_avg"]),
+            "min_slope": _num(summary["min_slope"], 2),
+            "props": props,
+        }
+    return _json_response(request, stamp, build)
+
+
+async def player_projection(request):
+    pid = request.match_info["pid"]
+    stats = request.query.getall("stat", [])
+    try:
+        lines = [float(x) for x in request.query.getall("line", [])] or list(np.arange(0.5, 60.6, 1.0))
+    except ValueError:
+        raise web.HTTPBadRequest(text="line must be numeric")
+    unknown = [s for s in stats if s not in nba_projection.STATS]
+    if not stats or unknown:
+        raise web.HTTPBadRequest(text=f"Pass ?stat= one of {', '.join(nba_projection.STATS)}")
+
+    df, stamp = await _player_log(pid)
+
+    def build():
+        projection = nba_projection.project(df.assign(PLAYER_ID=pid))
+        props = []
+        for stat in stats:
+            ladder = projection.ladder(pid, stat, lines)
+            props.append({
+                "stat": stat,
+                "mean": _num(projection.mean(pid, stat), 2),
+                "lines": [{"line": float(r.LINE), "p_over": _num(r.P_OVER, 3),
+                           "fair_over": _num(r.FAIR_OVER, 0), "fair_under": _num(r.FAIR_UNDER, 0)}
+                          for r in ladder.itertuples()],
+            })
+        return {
+            "player_id": pid,
+            "games": int(projection.games[0]) if len(projection) else 0,
+            "minutes": _num(projection.minutes[0]) if len(projection) else None,
+            "props": props,
+        }
+    return _json_response(request, stamp, build)
+
+
+async def defense(request):
+    season = request.query.get("season", nba_data.CURRENT_SEASON)
+    per_mode = request.query.get("per_mode", "PerGame")
+    try:
+        last_n = int(request.query.get("last_n", "0"))
+    except ValueError:
+        raise web.HTTPBadRequest(text="last_n must be an integer")
+    rankings, stamp = await _sources.get(
+        ("defense", season, per_mode, last_n), TTL_DEFENSE, nba_data.get_opp_def_rankings, season, per_mode, last_n,
+    )
+    return _json_response(request, stamp, lambda: {"season": season, "per_mode": per_mode, "last_n": last_n,
+                                                   "rankings": rankings.to_dict()})
+
+
+async def defense_team(request):
+    season = request.query.get("season", nba_data.CURRENT_SEASON)
+    position = request.query.get("position", "").upper()
+    if position not in nba_defense.POSITIONS:
+        raise web.HTTPBadRequest(text="position must be G, F or C")
+    matrix, stamp = await _sources.get(("defense_matrix", season), TTL_DEFENSE, nba_defense.get_matrix, season)
+    team = request.match_info["team"].upper()
+    if team not in matrix:
+        raise web.HTTPNotFound(text=f"No defensive rankings for {team}")
+    stats = request.query.getall("stat", nba_defense.STATS)
+    return _json_response(request, stamp, lambda: {
+        "season": season,
+        "team": team,
+        "badges": {s: nba_defense.rank_info(matrix, team, s, position) for s in stats},
+    })
+
+
+async def health(request):
+    return web.json_response({"ok": True})
+
+
+async def metrics(request):
+    if request.query.get("format") == "json":
+        return web.json_response(nba_metrics.snapshot())
+    return web.Response(text=nba_metrics.prometheus(), content_type="text/plain")
+
+
+def make_app() -> web.Application:
+    app = web.Application()
+    app.add_routes([
+        web.get("/health", health),
+        web.get("/metrics", metrics),
+        web.get("/slate", slate),
+        web.get(r"/players/{pid:\d+}/logs", player_logs),
+        web.get(r"/players/{pid:\d+}/hitrates", player_hitrates),
+        web.get(r"/players/{pid:\d+}/projection", player_projection),
+        web.get("/defense", defense),
+        web.get("/defense/{team}", defense_team),
+    ])
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless NBA hit-rate API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    web.run_app(make_app(), host=args.host, port=args.port)
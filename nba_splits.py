@@ -0,0 +1,73 @@
+"""Per-opponent splits of one player's game log.
+
+Cached logs carry the opponent code parsed from MATCHUP (OPP, see
+nba_data.opponent_codes), so a single groupby yields games, averages and
+shooting splits against every opponent. Each opponent also keeps its games' stat values sorted per column,
+so a hit rate for any stat / line is a binary search. Switching the game
+filter or the stat is a dict lookup instead of a regex scan of the log.
+"""
+import numpy as np
+import pandas as pd
+
+import nba_data
+import nba_hitrate
+
+AVG_COLS = ["MIN", "PTS", "REB", "AST"]
+# Made / attempted pairs for the shooting splits; 2P comes from FG minus 3P
+SHOOTING = {"2P%": ("2PM", "2PA"), "3P%": ("FG3M", "FG3A"), "FT%": ("FTM", "FTA")}
+HIT_STATS = ["PTS", "REB", "AST", "STL", "BLK", "TOV", "FGM", "FGA", "FG3M", "FG3A", "2PM", "2PA",
+             *nba_hitrate.COMBO_STATS]
+
+
+class OpponentSplits:
+    def __init__(self, frame: pd.DataFrame, season_year: str = None):
+        """frame: newest-first cached game log (nba_data.compact_game_log schema).
+        season_year ("2025") keeps only games whose SEASON_ID ends with it."""
+        if season_year and "SEASON_ID" in frame.columns:
+            frame = frame[frame["SEASON_ID"].astype(str).str.endswith(season_year)]
+        if "OPP" not in frame.columns:
+            frame = frame.assign(OPP=nba_data.opponent_codes(frame["MATCHUP"]))
+        frame = frame.reset_index(drop=True)
+        self.frame = frame
+        self.stats = [c for c in HIT_STATS if c in frame.columns]
+
+        grouped = frame.groupby("OPP", observed=True, sort=False)
+        self._rows = grouped.indices   # opp → positions in frame, newest first
+        avgs = grouped[[c for c in AVG_COLS if c in frame.columns]].mean()
+        pair_cols = [c for pair in SHOOTING.values() for c in pair if c in frame.columns]
+        totals = grouped[pair_cols].sum()
+        summary = avgs.assign(G=grouped.size())
+        for name, (made, att) in SHOOTING.items():
+            if made in totals and att in totals:
+                summary[name] = (totals[made] / totals[att].where(totals[att] > 0) * 100)
+        self._summary = summary.to_dict("index")
+
+        values = frame[self.stats].to_numpy(dtype=float)
+        self._stat_ix = {s: j for j, s in enumerate(self.stats)}
+        self._sorted = {opp: np.sort(values[rows], axis=0) for opp, rows in self._rows.items()}
+
+    def __contains__(self, opp):
+        return opp in self._rows
+
+    def opponents(self) -> list:
+        return list(self._rows)
+
+    def summary(self, opp: str) -> dict:
+        """{"G", "MIN", "PTS", "REB", "AST", "2P%", "3P%", "FT%"} vs opp (NaN where no attempts), or None."""
+        return self._summary.get(opp)
+
+    def games(self, opp: str) -> pd.DataFrame:
+        """Games vs opp, newest first."""
+        rows = self._rows.get(opp)
+        return self.frame.iloc[rows] if rows is not None else self.frame.iloc[:0]
+
+    def hit_rate(self, opp: str, stat: str, line: float) -> float:
+        """% of games vs opp with stat over line (NaN if none)."""
+        j = self._stat_ix.get(stat)
+        col = self._sorted[opp][:, j] if opp in self._sorted and j is not None else None
+        if col is None:
+            return float("nan")
+        col = col[~np.isnan(col)]
+        if not len(col):
+            return float("nan")
+        return (len(col) - np.searchsorted(col, line, side="right")) / len(col) * 100
@@ -0,0 +1,233 @@
+"""On-disk Parquet store for player game logs.
+
+One file per (player, season, season type). Finished games never change, so a
+partition is written once and afterwards only games dated after its newest
+GAME_DATE_DT are requested from nba_api.
+
+Partitions are filled either per player (PlayerGameLog, sync_partition) or
+for a whole season type at once (LeagueGameLog, sync_league): one response
+split into every player's partition. A league sync leaves a stamp next to the
+partitions; while it is fresh (always, for past seasons) it vouches for every
+player of that season type — a missing partition then just means no games,
+and sync_partition answers without a request.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import nba_metrics
+
+STORE_DIR = os.environ.get(
+    "NBA_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".nba_store"),
+)
+# How long a current-season partition counts as fresh before we ask for new games
+REFRESH_SECS = int(os.environ.get("NBA_STORE_REFRESH_SECS", "300"))
+# GAME_DATE spellings seen from nba_api, most common first
+DATE_FORMATS = ("%b %d, %Y", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d", "%m/%d/%Y")
+
+
+# LeagueGameLog columns the per-player PlayerGameLog partitions don't carry
+LEAGUE_ONLY_COLUMNS = ["PLAYER_NAME", "TEAM_ID", "TEAM_ABBREVIATION", "TEAM_NAME", "FANTASY_PTS"]
+
+
+def _partition_path(pid_str: str, season: str, stype_label: str) -> str:
+    return os.path.join(STORE_DIR, season, stype_label, f"{pid_str}.parquet")
+
+
+def _league_stamp_path(season: str, stype_label: str) -> str:
+    return os.path.join(STORE_DIR, season, stype_label, "_league.json")
+
+
+def _detect_date_format(sample: str):
+    for fmt in DATE_FORMATS:
+        try:
+            datetime.strptime(sample, fmt)
+            return fmt
+        except ValueError:
+            pass
+    return None
+
+
+def _parse_game_dates(df: pd.DataFrame) -> pd.DataFrame:
+    """Adds GAME_DATE_DT (datetime64) parsed from the raw nba_api GAME_DATE.
+
+    The format is detected once from the first value and the column parsed in
+    one pass; only rows that do not match it go through the slow "mixed" parser.
+    """
+    raw = df["GAME_DATE"]
+    fmt = _detect_date_format(str(raw.iloc[0]).strip()) if len(raw) else None
+    if fmt is None:
+        df["GAME_DATE_DT"] = pd.to_datetime(raw, format="mixed", errors="coerce")
+        return df
+    parsed = pd.to_datetime(raw, format=fmt, errors="coerce")
+    failed = parsed.isna() & raw.notna()
+    if failed.any():
+        parsed[failed] = pd.to_datetime(raw[failed], format="mixed", errors="coerce")
+    df["GAME_DATE_DT"] = parsed
+    return df
+
+
+def _normalize(df: pd.DataFrame, stype_label: str) -> pd.DataFrame:
+    # PlayerGameLog spells these Game_ID / Player_ID; the rest of the app uses GAME_ID
+    df = df.rename(columns={"Game_ID": "GAME_ID", "Player_ID": "PLAYER_ID"})
+    df["GAME_TYPE"] = stype_label
+    return _parse_game_dates(df)
+
+
+def read_partition(pid_str: str, season: str, stype_label: str):
+    """Returns the stored frame, or None if this partition was never fetched."""
+    path = _partition_path(pid_str, season, stype_label)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception:
+        return None
+
+
+def read_season(season: str, stype_labels=None) -> pd.DataFrame:
+    """Every stored partition of a season stacked into one frame (PLAYER_ID from
+    the file name), optionally only the given season types."""
+    frames = []
+    base = os.path.join(STORE_DIR, season)
+    for stype_label in sorted(os.listdir(base)) if os.path.isdir(base) else []:
+        if stype_labels is not None and stype_label not in stype_labels:
+            continue
+        for name in sorted(os.listdir(os.path.join(base, stype_label))):
+            if not name.endswith(".parquet"):
+                continue
+            df = read_partition(name[:-len(".parquet")], season, stype_label)
+            if df is not None and not df.empty:
+                frames.append(df.assign(PLAYER_ID=name[:-len(".parquet")]))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def write_partition(df: pd.DataFrame, pid_str: str, season: str, stype_label: str):
+    """Atomically replaces a partition (write to temp file, then rename)."""
+    path = _partition_path(pid_str, season, stype_label)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    df.reset_index(drop=True).to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def _is_fresh(pid_str: str, season: str, stype_label: str, current_season: str) -> bool:
+    path = _partition_path(pid_str, season, stype_label)
+    if not os.path.exists(path):
+        return False
+    # Past seasons are complete — once stored they never need another request
+    if season != current_season:
+        return True
+    return time.time() - os.path.getmtime(path) < REFRESH_SECS
+
+
+def _league_covers(season: str, stype_label: str, current_season: str) -> bool:
+    """True if a league sync of this season type is recent enough to vouch for every player."""
+    path = _league_stamp_path(season, stype_label)
+    if not os.path.exists(path):
+        return False
+    return season != current_season or time.time() - os.path.getmtime(path) < REFRESH_SECS
+
+
+def _merge(stored, new_rows: pd.DataFrame) -> pd.DataFrame:
+    """Normalized new rows appended to a stored partition, newest first, one row per GAME_ID."""
+    merged = new_rows if stored is None or stored.empty else pd.concat([stored, new_rows], ignore_index=True)
+    if "GAME_ID" in merged.columns:
+        merged = merged.drop_duplicates(subset=["GAME_ID"], keep="last")
+    return merged.sort_values("GAME_DATE_DT", ascending=False)
+
+
+def sync_partition(pid_str: str, season: str, stype_api: str, stype_label: str,
+                   current_season: str, fetch_log) -> pd.DataFrame:
+    """Returns the stored log for one partition, fetching only games newer than what is on disk.
+
+    fetch_log(pid_str, season, stype_api, date_from) must return the raw nba_api
+    PlayerGameLog frame; date_from is "" for a full fetch or an MM/DD/YYYY string.
+    """
+    stored = read_partition(pid_str, season, stype_label)
+    if stored is not None and _is_fresh(pid_str, season, stype_label, current_season):
+        nba_metrics.inc("nba_store_syncs_total", outcome="fresh")
+        return stored
+    if _league_covers(season, stype_label, current_season):
+        nba_metrics.inc("nba_store_syncs_total", outcome="league")
+        return stored if stored is not None else pd.DataFrame()
+
+    date_from = ""
+    if stored is not None and not stored.empty:
+        newest = stored["GAME_DATE_DT"].max()
+        if pd.notna(newest):
+            date_from = (newest + timedelta(days=1)).strftime("%m/%d/%Y")
+
+    try:
+        new_rows = fetch_log(pid_str, season, stype_api, date_from)
+    except Exception:
+        # Upstream failed — serve what we have rather than nothing
+        nba_metrics.inc("nba_store_syncs_total", outcome="error")
+        return stored if stored is not None else pd.DataFrame()
+
+    if new_rows is None or new_rows.empty:
+        if stored is not None:
+            # Nothing new — just mark the partition as freshly checked
+            os.utime(_partition_path(pid_str, season, stype_label))
+            nba_metrics.inc("nba_store_syncs_total", outcome="unchanged")
+            return stored
+        merged = pd.DataFrame()
+    else:
+        merged = _merge(stored, _normalize(new_rows, stype_label))
+
+    write_partition(merged, pid_str, season, stype_label)
+    nba_metrics.inc("nba_store_syncs_total", outcome="fetched")
+    return merged
+
+
+def sync_league(season: str, stype_api: str, stype_label: str, current_season: str, fetch_league_log) -> int:
+    """Brings every player's partition of one season type up to date from a single
+    league-wide request; returns the number of partitions written.
+
+    fetch_league_log(season, stype_api, date_from) must return the raw nba_api
+    LeagueGameLog (player rows) frame; date_from is "" the first time, then the
+    day after the newest game the last league sync saw. Upstream errors propagate.
+    """
+    stamp_path = _league_stamp_path(season, stype_label)
+    if _league_covers(season, stype_label, current_season):
+        nba_metrics.inc("nba_store_syncs_total", outcome="league_fresh")
+        return 0
+    newest = None
+    try:
+        with open(stamp_path) as f:
+            newest = json.load(f).get("newest")
+    except (OSError, ValueError):
+        pass
+    newest = pd.Timestamp(newest) if newest else None
+    date_from = (newest + timedelta(days=1)).strftime("%m/%d/%Y") if newest is not None else ""
+
+    try:
+        rows = fetch_league_log(season, stype_api, date_from)
+    except Exception:
+        nba_metrics.inc("nba_store_syncs_total", outcome="league_error")
+        raise
+
+    written = 0
+    if rows is not None and not rows.empty:
+        rows = _normalize(rows.drop(columns=[c for c in LEAGUE_ONLY_COLUMNS if c in rows.columns]), stype_label)
+        for pid, new_rows in rows.groupby(rows["PLAYER_ID"].astype(str), sort=False):
+            write_partition(_merge(read_partition(pid, season, stype_label), new_rows), pid, season, stype_label)
+            written += 1
+        top = rows["GAME_DATE_DT"].max()
+        if pd.notna(top) and (newest is None or top > newest):
+            newest = top
+
+    # The stamp goes last: it vouches for partitions that are all on disk by now
+    os.makedirs(os.path.dirname(stamp_path), exist_ok=True)
+    tmp = f"{stamp_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"newest": newest.strftime("%Y-%m-%d") if newest is not None else None,
+                   "synced": time.time()}, f)
+    os.replace(tmp, stamp_path)
+    nba_metrics.inc("nba_store_syncs_total", outcome="league_fetched" if written else "league_unchanged")
+    return written
@@ -1,15 +1,26 @@
 import streamlit as st
+import io
+import os
 import json
-import base64
-from nba_api.stats.static import players
-from nba_api.stats.static import teams as static_teams
-from nba_api.stats.endpoints import leaguedashplayerstats, leaguedashteamstats, PlayerGameLog, scoreboardv3
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 from datetime import datetime, date
 from PIL import Image 
 
+import nba_backtest
+import nba_board
+import nba_data
+import nba_defense
+import nba_edges
+import nba_hitrate
+import nba_metrics
+import nba_parlay
+import nba_players
+import nba_prefetch
+import nba_projection
+import nba_splits
+
 # ====================== FAVICON & PAGE CONFIG ======================
 st.set_page_config(
     page_title="NBA Hit Tracker",
@@ -18,52 +29,44 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# ── Season helpers ──────────────────────────────────────────────────────────────
-def get_current_season():
-    today = datetime.today()
-    return f"{today.year}-{str(today.year + 1)[-2:]}" if today.month >= 10 else f"{today.year-1}-{str(today.year)[-2:]}"
+# Section timings for this run (see nba_metrics / nba_bench)
+perf = nba_metrics.Run()
+perf.lap("setup")
 
-CURRENT_SEASON = get_current_season()
-current_year = int(CURRENT_SEASON.split('-')[0])
-PREVIOUS_SEASON = f"{current_year - 1}-{str(current_year)[-2:]}"
+# Optional in-process slate warm-up (see nba_prefetch for the standalone worker)
+if os.environ.get("NBA_PREFETCH") == "inprocess":
+    nba_prefetch.start_background()
 
-# ── Board persistence helpers ────────────────────────────────────────────────────
-def _board_to_qp(board: list) -> str:
-    """Serialize board → base64 string safe for a query param."""
-    data = []
-    for entry in board:
-        item = entry.copy()
-        if isinstance(item.get('timestamp'), datetime):
-            item['timestamp'] = item['timestamp'].isoformat()
-        data.append(item)
-    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+# ── Season helpers ──────────────────────────────────────────────────────────────
+CURRENT_SEASON = nba_data.CURRENT_SEASON
+PREVIOUS_SEASON = nba_data.PREVIOUS_SEASON
 
-def _qp_to_board(qp_val: str) -> list:
-    """Deserialize base64 query param → board list."""
-    try:
-        data = json.loads(base64.urlsafe_b64decode(qp_val.encode()).decode())
-        for entry in data:
-            if isinstance(entry.get('timestamp'), str):
-                try:
-                    entry['timestamp'] = datetime.fromisoformat(entry['timestamp'])
-                except Exception:
-                    pass
-        return data
-    except Exception:
-        return []
+# ── Board persistence helpers ────────────────────────────────────────────────────
+# ?board=<compact encoding> by default; ?b=<short id> with NBA_BOARD_STORE=cache
+def _qp_to_board() -> list:
+    """Board from the query params (either format, legacy base64-JSON included)."""
+    if st.query_params.get('b'):
+        return nba_board.Board(nba_board.load(st.query_params['b']))
+    qp_board = st.query_params.get('board', '')
+    return nba_board.Board(nba_board.decode(qp_board) if qp_board else [])
 
 def _save_board():
     """Write current board into query params (called after every mutation)."""
-    if st.session_state.my_board:
-        st.query_params['board'] = _board_to_qp(st.session_state.my_board)
-    else:
+    board = st.session_state.my_board
+    if not board:
         st.query_params.pop('board', None)
+        st.query_params.pop('b', None)
+    elif nba_board.STORE == "cache":
+        st.query_params['b'] = nba_board.save(board)
+        st.query_params.pop('board', None)
+    else:
+        st.query_params['board'] = nba_board.encode(board)
+        st.query_params.pop('b', None)
 
 # ── Session state ───────────────────────────────────────────────────────────────
 if 'my_board' not in st.session_state:
     # Restore from query params on first load
-    qp_board = st.query_params.get('board', '')
-    st.session_state.my_board = _qp_to_board(qp_board) if qp_board else []
+    st.session_state.my_board = _qp_to_board()
 if 'filter_teams' not in st.session_state:
     st.session_state.filter_teams = None
 if 'pending_load' not in st.session_state:
@@ -72,134 +75,46 @@ if 'board_order' not in st.session_state:
     st.session_state.board_order = []  # list of (player, stat, line) tuples defining sort order
 
 # ── Team abbreviation lookup ────────────────────────────────────────────────────
-@st.cache_data(ttl=86400)
+@nba_metrics.counted_cache(st.cache_data(ttl=86400))
 def get_team_abbr_map():
-    all_teams = static_teams.get_teams()
-    return {str(t['id']): t['abbreviation'] for t in all_teams}
+    return nba_data.get_team_abbr_map()
 
 team_abbr_map = get_team_abbr_map()
 
 # ── Opponent Defensive Rankings ─────────────────────────────────────────────────
-# Maps stat category → NBA API column → label
-DEF_STAT_MAP = {
-    'PTS':     ('OPP_PTS',   'PTS allowed'),
-    'REB':     ('OPP_REB',   'REB allowed'),
-    'AST':     ('OPP_AST',   'AST allowed'),
-    'STL':     ('OPP_STL',   'STL allowed'),
-    'BLK':     ('OPP_BLK',   'BLK allowed'),
-    'TOV':     ('OPP_TOV',   'TOV forced'),
-    'FG3M':    ('OPP_FG3M',  '3PM allowed'),
-    'Pts+Reb': ('OPP_PTS',   'PTS allowed'),   # fallback to PTS
-    'Pts+Ast': ('OPP_PTS',   'PTS allowed'),
-    'PRA':     ('OPP_PTS',   'PTS allowed'),
-    'Ast+Reb': ('OPP_AST',   'AST allowed'),
-    'Stl+Blk': ('OPP_STL',   'STL allowed'),
-}
+def get_defense_matrix(season: str):
+    """Returns nba_defense.DefenseMatrix for today's slate (built once, then read from disk)."""
+    return nba_defense.get_matrix(season, date.today().strftime("%Y-%m-%d"))
 
-@st.cache_data(ttl=3600)
-def get_opp_def_rankings(season: str):
-    """Returns dict: team_abbr → {col: (rank, per_game_avg, total_teams)}"""
+def get_player_positions(season: str) -> dict:
+    """Returns {player_id: "G" | "F" | "C"}; empty if PlayerIndex is unavailable."""
     try:
-        df_opp = leaguedashteamstats.LeagueDashTeamStats(
-            season=season,
-            measure_type_detailed_defense="Opponent",
-            per_mode_simple="PerGame",
-        ).get_data_frames()[0]
-        if df_opp.empty:
-            return {}
-        result = {}
-        opp_cols = [c for c in df_opp.columns if c.startswith('OPP_')]
-        for col in opp_cols:
-            if col not in df_opp.columns:
-                continue
-            # Lower is better defensively for most stats (fewer allowed)
-            # Exception: OPP_TOV — more TOV forced = better defense
-            ascending = col != 'OPP_TOV'
-            ranked = df_opp[['TEAM_ABBREVIATION', col]].copy()
-            ranked['rank'] = ranked[col].rank(method='min', ascending=ascending).astype(int)
-            for _, row in ranked.iterrows():
-                abbr = row['TEAM_ABBREVIATION']
-                if abbr not in result:
-                    result[abbr] = {}
-                result[abbr][col] = (int(row['rank']), round(float(row[col]), 1), len(ranked))
-        return result
+        return nba_defense.get_player_positions(season)
     except Exception:
         return {}
 
-def get_def_rank_badge(opp_team: str, stat: str, rankings: dict) -> str:
-    """Returns an HTML badge string for defensive rank of opp_team vs stat."""
-    if not opp_team or not rankings or opp_team not in rankings:
-        return ""
-    api_col, label = DEF_STAT_MAP.get(stat, (None, None))
-    if not api_col:
+def get_def_rank_badge(opp_team: str, stat: str, matrix, position: str = "") -> str:
+    """Returns an HTML badge string for defensive rank of opp_team vs stat (vs position when known)."""
+    info = nba_defense.rank_info(matrix, opp_team, stat, position)
+    if not info:
         return ""
-    team_data = rankings.get(opp_team, {})
-    if api_col not in team_data:
-        return ""
-    rank, avg, total = team_data[api_col]
     # Color: top 10 = green (easy), bottom 10 = red (tough), else yellow
-    if rank <= 10:
-        color = '#00ff88'
-        difficulty = 'Easy'
-    elif rank >= total - 9:
-        color = '#ff5555'
-        difficulty = 'Tough'
-    else:
-        color = '#ffcc00'
-        difficulty = 'Mid'
+    color = {'Easy': '#00ff88', 'Tough': '#ff5555'}.get(info['difficulty'], '#ffcc00')
+    vs = f" vs {info['position']}" if info['position'] else ""
+    recent = "".join(f" · {w} #{r}" for w, r in info['recent'].items())
     return (
         f"<span style='background:{color};color:#000;padding:1px 6px;"
         f"border-radius:4px;font-size:0.78em;font-weight:700;'>"
-        f"DEF #{rank}/{total} {difficulty} ({avg} {label}/g)</span>"
+        f"DEF{vs} #{info['rank']}/{info['total']} {info['difficulty']} ({info['avg']} {info['label']}/g{recent})</span>"
     )
 
 # ── Today's NBA Games ───────────────────────────────────────────────────────────
+perf.lap("slate")
 today_str = date.today().strftime("%Y-%m-%d")
 
-@st.cache_data(ttl=300)
 def get_todays_games(game_date: str):
     try:
-        sb = scoreboardv3.ScoreboardV3(game_date=game_date, league_id="00")
-        header_df    = sb.game_header.get_data_frame()
-        line_score_df = sb.line_score.get_data_frame()
-
-        if header_df.empty:
-            return [], 0
-
-        # line_score has 2 rows per game (away first, home second) with teamTricode
-        # Build a lookup: gameId -> [away_tricode, home_tricode]
-        team_by_game = {}
-        for _, row in line_score_df.iterrows():
-            gid = str(row['gameId'])
-            team_by_game.setdefault(gid, []).append(row['teamTricode'])
-
-        games = []
-        seen_ids = set()
-        for _, row in header_df.iterrows():
-            game_id_str = str(row['gameId'])
-            if game_id_str in seen_ids:
-                continue
-            seen_ids.add(game_id_str)
-
-            tricodes = team_by_game.get(game_id_str, ['???', '???'])
-            away_abbr = tricodes[0] if len(tricodes) > 0 else '???'
-            home_abbr = tricodes[1] if len(tricodes) > 1 else '???'
-            status    = row.get('gameStatusText', '')
-
-            if game_id_str[3:5] == '04':
-                game_type = ' 🏆'
-            elif game_id_str[3:5] == '05':
-                game_type = ' 🎟️'
-            else:
-                game_type = ''
-
-            games.append({
-                'away': away_abbr,
-                'home': home_abbr,
-                'status': status,
-                'game_type': game_type,
-            })
-        return games, len(games)
+        return nba_data.get_todays_games(game_date)
     except Exception as e:
         st.warning(f"Could not load today's games: {str(e)}")
         return [], 0
@@ -214,15 +129,61 @@ for g in games_today:
     matchup_lookup[g['home']] = label
 
 # ── Helper Functions ────────────────────────────────────────────────────────────
+# nba_hitrate.trend value → (arrow, color)
+TREND_STYLE = {1: ("↑", "#00ff88"), 0: ("→", "#ffcc00"), -1: ("↓", "#ff5555")}
+
+def _num_or_none(x):
+    return None if x is None or np.isnan(x) else round(float(x), 1)
+
+def prop_snapshots(frame, props: list) -> list:
+    """Numeric hit-rate fields stored on board entries, one dict per (pid, stat, line)
+    prop, from a single batch over a stacked PLAYER_ID log frame. HTML is built at
+    render time; computed_game is the newest GAME_ID the numbers include."""
+    res = nba_hitrate.score_props(frame, props)
+    newest = frame.groupby("PLAYER_ID")["GAME_ID"].first().astype(str)
+    return [
+        {
+            "rates": [_num_or_none(x) for x in res["rates"][i]],
+            "avg_o": _num_or_none(res["avg_o"][i]),
+            "min_avg": _num_or_none(res["min_avg"][i]),
+            "streak": f"{'O' if res['streak_over'][i] else 'U'}{int(res['streak_count'][i])}",
+            "trend": int(res["trend"][i]),
+            "computed_game": newest.get(pid),
+        }
+        for i, (pid, _, _) in enumerate(props)
+    ]
+
+def hitrate_html(entry: dict) -> str:
+    """L5 | L10 | Avg O/U | Avg MIN | streak line of a pinned prop."""
+    if nba_board.needs_stats(entry):
+        return entry.get('hitrate_str', '—')
+    parts = []
+    for pct in entry['rates']:
+        if pct is None:
+            continue
+        color = '#00ff88' if pct > 73 else '#ffcc00' if pct >= 60 else '#ff5555'
+        parts.append(f"<span style='color:{color}'>{pct:.0f}%</span>")
+    avg_o = entry['avg_o']
+    if avg_o is None:
+        return " | ".join(parts) or '—'
+    avg_u = 100 - avg_o
+    avg_color_o = '#00ff88' if avg_o > 75 else '#ffcc00' if avg_o >= 61 else '#ff5555'
+    avg_color_u = '#00ff88' if avg_u > 75 else '#ffcc00' if avg_u >= 61 else '#ff5555'
+    min_avg = f"{entry['min_avg']:.1f}" if entry.get('min_avg') is not None else "—"
+    return " | ".join(parts) + (
+        f" | Avg: <span style='color:{avg_color_o}'>O {avg_o:.0f}%</span> / "
+        f"<span style='color:{avg_color_u}'>U {avg_u:.0f}%</span> | "
+        f"<span style='color:#fff;'> Avg MIN: {min_avg} | {entry.get('streak', '')}</span>"
+    )
+
+def trend_style(entry: dict):
+    if nba_board.needs_stats(entry):
+        return entry.get('trend_arrow', '→'), entry.get('trend_color', '#ffcc00')
+    return TREND_STYLE[entry.get('trend', 0)]
+
 def dropdown_values():
     return [None] + [round(x, 1) for x in np.arange(0.5, 60.6, 1.0)]
 
-def get_player_id(name):
-    for p in players.get_players():
-        if p['full_name'].lower() == name.lower():
-            return p['id']
-    return None
-
 def get_opponent_from_game(selected_game_label, player_team):
     """Returns the opponent abbreviation for the selected game."""
     if not selected_game_label or selected_game_label == "— All Players —":
@@ -246,6 +207,7 @@ if st.session_state.pending_load is not None:
             _matched_game = label
             break
     st.session_state['game_filter_select'] = _matched_game
+    st.session_state['view_mode'] = "Player"
     # Player: find matching display string (name • team)
     _player_name = _pl.get('player')
     _player_team = _pl.get('team')
@@ -265,7 +227,16 @@ if st.session_state.pending_load is not None:
             pass
 
 # ── Sidebar: Game Filter + Player ───────────────────────────────────────────────
+perf.lap("sidebar")
+view_mode = st.sidebar.radio(
+    "Mode", ["Player", "Scanner", "Parlays", "Backtest", "Edges"], horizontal=True,
+    key="view_mode", label_visibility="collapsed"
+)
 st.sidebar.markdown("### Today's Games & Player")
+_warm = nba_prefetch.read_status()
+if _warm.get("slate_date") == today_str and _warm.get("players_total"):
+    _warm_icon = "🔥" if _warm.get("state") == "warm" else "⏳"
+    st.sidebar.caption(f"{_warm_icon} Slate cache: {_warm['players_warm']}/{_warm['players_total']} players warm")
 
 top_filters = st.sidebar.columns([2.2, 2.8])
 
@@ -289,48 +260,50 @@ with top_filters[0]:
         st.session_state.filter_teams = game_labels_to_teams[selected_game_label]
 
 with top_filters[1]:
-    @st.cache_data(ttl=7200)
     def get_active_players_with_teams():
-        season_types = ["Playoffs", "PlayIn", "Regular Season"]
-        for season in [CURRENT_SEASON, PREVIOUS_SEASON]:
-            combined = {}
-            for stype in season_types:
-                try:
-                    df = leaguedashplayerstats.LeagueDashPlayerStats(
-                        season=season, season_type_all_star=stype
-                    ).get_data_frames()[0]
-                    if not df.empty:
-                        df = df[df['TEAM_ABBREVIATION'].notna() & (df['TEAM_ABBREVIATION'] != '')]
-                        combined.update(dict(zip(df['PLAYER_ID'].astype(str), df['TEAM_ABBREVIATION'])))
-                except:
-                    continue
-            if len(combined) > 80:
-                return combined
-        return {}
+        return nba_data.get_active_players_with_teams()
 
     player_team_map = get_active_players_with_teams()
 
-    player_options = []
-    for p in players.get_players():
-        pid_str = str(p["id"])
-        if pid_str not in player_team_map:
-            continue
-        team = player_team_map[pid_str]
-        if st.session_state.filter_teams is not None:
-            if team not in st.session_state.filter_teams:
-                continue
-        player_options.append((f"{p['full_name']} • {team}", p['full_name']))
-
-    player_options.sort(key=lambda x: x[1].lower())
-    player_list_display = [opt[0] for opt in player_options]
+    @nba_metrics.counted_cache(st.cache_resource(ttl=7200))
+    def get_roster_options():
+        """Player dropdown entries, built once per roster refresh.
+
+        Returns all (display, name, pid) options sorted by name, the same split
+        per team, and display → (name, pid) for O(1) selection lookup.
+        """
+        name_by_id = nba_players.get_index().name_by_id
+        all_opts = sorted(
+            ((f"{name_by_id[p]} • {team}", name_by_id[p], p)
+             for p, team in get_active_players_with_teams().items() if p in name_by_id),
+            key=lambda x: x[1].lower()
+        )
+        by_team = {}
+        for opt in all_opts:
+            by_team.setdefault(opt[0].rsplit(" • ", 1)[1], []).append(opt)
+        return {
+            "all": tuple(all_opts),
+            "all_display": tuple(opt[0] for opt in all_opts),
+            "by_team": {t: tuple(v) for t, v in by_team.items()},
+            "by_display": {opt[0]: (opt[1], opt[2]) for opt in all_opts},
+        }
+
+    roster = get_roster_options()
+    if st.session_state.filter_teams is not None:
+        player_options = sorted(
+            (opt for t in st.session_state.filter_teams for opt in roster["by_team"].get(t, ())),
+            key=lambda x: x[1].lower()
+        )
+        player_list_display = [opt[0] for opt in player_options]
+    else:
+        player_list_display = list(roster["all_display"])
 
     selected_display = st.selectbox(
         "Player", ["— Choose player —"] + player_list_display,
         key="player_select", label_visibility="collapsed"
     )
 
-selected_player = next((clean for disp, clean in player_options if disp == selected_display), None)
-pid = get_player_id(selected_player) if selected_player else None
+selected_player, pid = roster["by_display"].get(selected_display, (None, None))
 player_team = player_team_map.get(str(pid), "???") if pid else "???"
 
 # ── Stat • Line • Odds ─────────────────────────────────────────────────────────
@@ -370,54 +343,75 @@ if selected_player:
     with col_odds:
         odds_key = f"odds_{selected_player}_{selected_stat if selected_stat else 'none'}"
         st.selectbox("Odds", odds_options, key=odds_key, label_visibility="collapsed")
+    # Prices for this prop from an imported odds sheet (Edges mode)
+    imported = st.session_state.get("imported_odds")
+    if imported is not None and selected_stat in lines:
+        quotes = imported[(imported["PLAYER_ID"] == str(pid)) & (imported["STAT"] == selected_stat)
+                          & (imported["LINE"] == lines[selected_stat])]
+        if not quotes.empty:
+            st.sidebar.caption("Imported: " + " · ".join(
+                f"{q.SIDE} {q.PRICE} {q.BOOK}".strip() for q in quotes.itertuples()))
 else:
     st.sidebar.info("Select a player to load options")
 
 # ── Load Player Game Log ────────────────────────────────────────────────────────
+perf.lap("player_log")
+def get_player_games_cached(pid_str):
+    return nba_data.get_player_games(pid_str)
+
+@nba_metrics.counted_cache(st.cache_data(ttl=300))
+def get_slate_logs(pid_strs: tuple):
+    """One stacked game-log frame (with PLAYER_ID) for every player in pid_strs,
+    loaded in parallel (nba_data.get_players_games)."""
+    logs = nba_data.get_players_games(pid_strs)
+    frames = [d.assign(PLAYER_ID=p) for p, d in logs.items() if d is not None and not d.empty]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
 df = None
 if pid:
-    @st.cache_data(ttl=300)
-    def get_player_games_cached(pid_str):
-        season_types = [
-            ("Playoffs", "Playoffs"),
-            ("PlayIn", "Play-In"),
-            ("Regular Season", "Regular"),
-        ]
-        all_frames = []
-        for season in [CURRENT_SEASON, PREVIOUS_SEASON]:
-            for stype_api, stype_label in season_types:
-                try:
-                    df_log = PlayerGameLog(
-                        player_id=pid_str,
-                        season=season,
-                        season_type_all_star=stype_api
-                    ).get_data_frames()[0]
-                    if not df_log.empty:
-                        df_log["GAME_TYPE"] = stype_label
-                        all_frames.append(df_log)
-                except:
-                    continue
-            if all_frames:
-                break  # found data for current season, stop
-
-        if not all_frames:
-            return pd.DataFrame()
-
-        combined = pd.concat(all_frames, ignore_index=True)
-        combined["GAME_DATE_DT"] = pd.to_datetime(combined["GAME_DATE"], format="%b %d, %Y", errors="coerce").fillna(
-            pd.to_datetime(combined["GAME_DATE"], format="mixed", errors="coerce")
-        )
-        combined["GAME_DATE"] = combined["GAME_DATE_DT"].dt.strftime("%m/%d")
-        combined = combined.drop_duplicates(subset=["GAME_ID"]) if "GAME_ID" in combined.columns else combined
-        return combined.sort_values("GAME_DATE_DT", ascending=False).reset_index(drop=True)
-
     df = get_player_games_cached(str(pid))
-    if not df.empty:
-        df["Pts+Ast"] = df["PTS"] + df["AST"]
-        df["Pts+Reb"] = df["PTS"] + df["REB"]
-        df["Ast+Reb"] = df["AST"] + df["REB"]
-        df["Stl+Blk"] = df["STL"] + df["BLK"]
-        df["PRA"]     = df["PTS"] + df["REB"] + df["AST"]
+
+@nba_metrics.counted_cache(st.cache_resource(ttl=300, max_entries=64))
+def get_opponent_splits(pid_str: str, newest_game: str, all_seasons: bool, _log: pd.DataFrame):
+    """nba_splits.OpponentSplits for a player — current season, or every season of a
+    history log — built once per log (keyed by its newest game)."""
+    return nba_splits.OpponentSplits(_log, None if all_seasons else CURRENT_SEASON.split('-')[0])
+
+@nba_metrics.counted_cache(st.cache_resource(ttl=300, max_entries=256))
+def get_recent_chart(pid_str: str, stat: str, line: float, newest_game: str, _log: pd.DataFrame):
+    """Bar chart of stat over the last 10 games vs line, built once per log (keyed by its
+    newest game). The spec is assembled as plain dicts — the line is a layout shape,
+    not add_hline — and validated into a Figure a single time; st.plotly_chart then
+    only serializes it."""
+    recent = nba_data.with_display_dates(_log.head(10))
+    values = recent[stat]
+    spec = {
+        "data": [{
+            "type": "bar",
+            "x": recent["GAME_DATE"].tolist(),
+            "y": values.tolist(),
+            "marker": {"color": ["#00ff88" if v > line else "#ff4444" for v in values]},
+            "text": values.round(1).tolist(),
+            "textposition": "inside",
+            "textfont": {"color": ["#000" if v > 10 else "#fff" for v in values], "size": 11},
+        }],
+        "layout": {
+            "height": 220,
+            "margin": {"t": 25, "b": 30, "l": 30, "r": 15},
+            "plot_bgcolor": "rgba(0,0,0,0)", "paper_bgcolor": "rgba(0,0,0,0)",
+            "font": {"color": "#00e0ff"},
+            "xaxis": {"title": None, "tickfont": {"size": 10}},
+            "yaxis": {"title": {"text": stat, "font": {"size": 11}}, "tickfont": {"size": 10}},
+            "shapes": [{"type": "line", "xref": "x domain", "x0": 0, "x1": 1, "yref": "y", "y0": line, "y1": line,
+                        "line": {"dash": "dash", "color": "#00ffff"}}],
+            "annotations": [{"text": f"line = {line}", "xref": "x domain", "x": 1, "xanchor": "right",
+                             "yref": "y", "y": line, "yanchor": "bottom", "showarrow": False,
+                             "font": {"size": 11}}],
+        },
+    }
+    return go.Figure(spec)
 
 # ── Pin Button ──────────────────────────────────────────────────────────────────
 if (selected_player and selected_stat and selected_stat != "— Select stat —" and 
@@ -425,123 +419,132 @@ if (selected_player and selected_stat and selected_stat != "— Select stat —"
     st.sidebar.button("📌 Pin to Board", use_container_width=True)):
 
     line = lines[selected_stat]
-    pdata = df.sort_values("GAME_DATE_DT", ascending=False).copy()
-
-    windows = [5, 10]
-    windows = [w for w in windows if len(pdata) >= w]
-
-    over_list = []
-    for w in windows:
-        recent_w = pdata.head(w)
-        hit_pct = (recent_w[selected_stat] > line).mean() * 100
-        over_list.append(hit_pct)
-
-    parts = []
-    for pct in over_list:
-        color = '#00ff88' if pct > 73 else '#ffcc00' if pct >= 60 else '#ff5555'
-        parts.append(f"<span style='color:{color}'>{pct:.0f}%</span>")
-    
-    hit_str = " | ".join(parts)
-    recent_avg_min_val = pdata.head(10)["MIN"].mean()
-
-    # Current streak
-    results = (pdata[selected_stat] > line).tolist()
-    streak_type = "O" if results[0] else "U"
-    streak_count = 0
-    for r in results:
-        if (r and streak_type == "O") or (not r and streak_type == "U"):
-            streak_count += 1
-        else:
-            break
-
-    avg_o = np.mean(over_list)
-    avg_u = 100 - avg_o
-    avg_color_o = '#00ff88' if avg_o > 75 else '#ffcc00' if avg_o >= 61 else '#ff5555'
-    avg_color_u = '#00ff88' if avg_u > 75 else '#ffcc00' if avg_u >= 61 else '#ff5555'
-
-    # Trend arrow: compare L5 avg vs L6-10 avg to detect hot/cold
-    trend_arrow = "→"
-    trend_color = "#ffcc00"
-    if len(pdata) >= 6:
-        l5_avg  = pdata.head(5)[selected_stat].mean()
-        l10_avg = pdata.head(10)[selected_stat].mean() if len(pdata) >= 10 else pdata[5:][selected_stat].mean()
-        diff = l5_avg - l10_avg
-        threshold = max(line * 0.08, 0.5)   # 8% of line or at least 0.5
-        if diff > threshold:
-            trend_arrow = "↑"
-            trend_color = "#00ff88"
-        elif diff < -threshold:
-            trend_arrow = "↓"
-            trend_color = "#ff5555"
-    
-    avg_text = (
-        f" | Avg: <span style='color:{avg_color_o}'>O {avg_o:.0f}%</span> / "
-        f"<span style='color:{avg_color_u}'>U {avg_u:.0f}%</span> | "
-        f"<span style='color:#fff;'> Avg MIN: {recent_avg_min_val:.1f} | {streak_type}{streak_count}</span>"
-    )
-    hitrate_str = hit_str + avg_text
-
     player_matchup = matchup_lookup.get(player_team, "Other/Unknown")
     
     entry = {
         "player": selected_player,
+        "player_id": str(pid),
         "team": player_team,
         "matchup": player_matchup,
         "stat": selected_stat,
         "line": f"{line:.1f}",
         "odds": st.session_state.get(odds_key, ""),
-        "hitrate_str": hitrate_str,
         "timestamp": datetime.now(),
-        "trend_arrow": trend_arrow,
-        "trend_color": trend_color,
-        "sort_order": len(st.session_state.my_board),
+        **prop_snapshots(df.assign(PLAYER_ID=str(pid)), [(str(pid), selected_stat, line)])[0],
     }
 
-    if not any(
-        e['player'] == entry['player'] and 
-        e['stat'] == entry['stat'] and 
-        e['line'] == entry['line']
-        for e in st.session_state.my_board
-    ):
-        st.session_state.my_board.append(entry)
+    if st.session_state.my_board.add(entry):
         _save_board()
         st.toast(f"Pinned → {selected_player} • {selected_stat} {line}", icon="📌")
         st.rerun()
 
 # ── My Dashboard ────────────────────────────────────────────────────────────────
-if st.session_state.my_board:
-    dash_df = pd.DataFrame(st.session_state.my_board)
-    # Ensure sort_order exists for older pinned entries
-    if 'sort_order' not in dash_df.columns:
-        dash_df['sort_order'] = range(len(dash_df))
-        for i, entry in enumerate(st.session_state.my_board):
-            entry.setdefault('sort_order', i)
-    dash_df['match_key'] = dash_df['matchup']
-
-    def _move_prop(player, stat, line, direction):
-        """Swap sort_order of the target prop with its neighbour within the same matchup."""
-        board = st.session_state.my_board
-        matchup = next((e['matchup'] for e in board if e['player']==player and e['stat']==stat and e['line']==line), None)
-        if matchup is None:
-            return
-        group = sorted([e for e in board if e['matchup']==matchup], key=lambda x: x.get('sort_order', 0))
-        idx = next((i for i, e in enumerate(group) if e['player']==player and e['stat']==stat and e['line']==line), None)
-        if idx is None:
-            return
-        swap_idx = idx + direction
-        if swap_idx < 0 or swap_idx >= len(group):
-            return
-        # Swap sort_order values
-        a_key = (group[idx]['player'],  group[idx]['stat'],  group[idx]['line'])
-        b_key = (group[swap_idx]['player'], group[swap_idx]['stat'], group[swap_idx]['line'])
-        a_order = group[idx].get('sort_order', idx)
-        b_order = group[swap_idx].get('sort_order', swap_idx)
-        for e in board:
-            if (e['player'], e['stat'], e['line']) == a_key:
-                e['sort_order'] = b_order
-            elif (e['player'], e['stat'], e['line']) == b_key:
-                e['sort_order'] = a_order
+perf.lap("board")
+def refresh_board(board) -> bool:
+    """Recomputes, in one batch, every pinned prop whose player has played since
+    its snapshot (or that has none yet — restored or legacy entries). True if any changed."""
+    for e in board:
+        if not e.get('player_id'):
+            e['player_id'] = nba_players.get_player_id(e.get('player'))
+    pids = tuple(sorted({e['player_id'] for e in board if e['player_id']}))
+    frame = get_slate_logs(pids) if pids else pd.DataFrame()
+    if frame.empty:
+        return False
+    newest = frame.groupby("PLAYER_ID")["GAME_ID"].first().astype(str)
+    stale = [e for e in board
+             if e['player_id'] in newest.index and e.get('computed_game') != newest[e['player_id']]]
+    if not stale:
+        return False
+    props = [(e['player_id'], e['stat'], float(e['line'])) for e in stale]
+    for e, snap in zip(stale, prop_snapshots(frame, props)):
+        e.update(snap)
+    return True
+
+if refresh_board(st.session_state.my_board):
+    _save_board()
+
+def _prop_widget_id(entry) -> str:
+    return f"{entry['player']}_{entry['stat']}_{entry['line']}"
+
+# Button callbacks: they run before the rerun, which Streamlit scopes to the
+# fragment that owns the button.
+def _board_move(key, direction):
+    st.session_state.my_board.move(key, direction)
+    _save_board()
+
+def _board_remove(key):
+    st.session_state.my_board.remove(key)
+    _save_board()
+
+def _board_remove_group(match):
+    st.session_state.my_board.remove_group(match)
+    _save_board()
+
+@st.fragment
+def _render_matchup(match):
+    """One matchup group. Reorders and deletes inside it rerun only this fragment."""
+    board = st.session_state.my_board
+    group = board.group(match)
+    if not group:
+        # Last prop (or the whole group) just went — the layout around it changes
+        st.rerun()
 
+    col_left, col_middle, col_right = st.columns([0.09, 0.79, 0.12])
+
+    with col_left:
+        st.checkbox("", key=f"check_{match}", label_visibility="collapsed")
+
+    with col_middle:
+        with st.expander(
+            f"🏀 {match}  💰{board.payout(match):.2f}x  ({len(group)})",
+            expanded=True
+        ):
+            for i, entry in enumerate(list(group)):
+                is_first = (i == 0)
+                is_last  = (i == len(group) - 1)
+                key = nba_board.prop_key(entry)
+                wid = _prop_widget_id(entry)
+
+                t_arrow, t_color = trend_style(entry)
+                odds_d  = f" <span style='color:#aaa'>@ {entry['odds']}</span>" if entry.get('odds') else ""
+
+                # Compact single-block prop card
+                st.markdown(
+                    f"<div class='prop-row' style='border-left:2px solid {t_color};padding-left:5px;margin-bottom:3px'>"
+                    f"<span style='color:{t_color};font-weight:700'>{t_arrow}</span> "
+                    f"<strong style='font-size:0.85em'>{entry['player']} <span style='color:#88aaff'>•</span> {entry['team']}</strong>"
+                    f"<span style='font-size:0.82em'> &gt; {entry['stat']} {entry['line']}{odds_d}</span><br>"
+                    f"<span style='font-size:0.72em;color:#aaa'>{hitrate_html(entry)}</span>"
+                    f"</div>",
+                    unsafe_allow_html=True
+                )
+
+                # Action row: ↑ ↓ 🔍 🗑 all inline, minimal height
+                btn_cols = st.columns([0.18, 0.18, 0.32, 0.32])
+                with btn_cols[0]:
+                    if not is_first:
+                        st.button("↑", key=f"up_{wid}", help="Move up", on_click=_board_move, args=(key, -1))
+                with btn_cols[1]:
+                    if not is_last:
+                        st.button("↓", key=f"dn_{wid}", help="Move down", on_click=_board_move, args=(key, +1))
+                with btn_cols[2]:
+                    if st.button("🔍 Load", key=f"load_{wid}", help="Load this prop", use_container_width=True):
+                        st.session_state.pending_load = {
+                            'player': entry['player'],
+                            'team':   entry['team'],
+                            'stat':   entry['stat'],
+                            'line':   entry['line'],
+                        }
+                        st.rerun()
+                with btn_cols[3]:
+                    st.button("🗑 Del", key=f"del_{wid}", help="Remove prop", use_container_width=True,
+                              on_click=_board_remove, args=(key,))
+
+    with col_right:
+        st.button("✕", key=f"del_group_{match}", help="Delete entire group",
+                  on_click=_board_remove_group, args=(match,))
+
+if st.session_state.my_board:
     # Compact CSS injected once
     st.sidebar.markdown("""
 <style>
@@ -556,94 +559,9 @@ div[data-testid="stHorizontalBlock"] button[kind="secondary"] {
 .prop-row { margin: 0; padding: 2px 0; line-height: 1.3; }
 </style>""", unsafe_allow_html=True)
 
-    for match, group in dash_df.groupby('match_key'):
-        total_payout = 1.0
-        try:
-            multiplier = 1.0
-            for _, row in group.iterrows():
-                o = row['odds']
-                if not o or o.strip() == "": continue
-                val = float(str(o).replace('+', ''))
-                multiplier *= (val / 100 + 1) if val > 0 else (100 / abs(val) + 1)
-            total_payout = multiplier
-        except:
-            total_payout = 1.0
-
-        prop_count = len(group)
-        col_left, col_middle, col_right = st.sidebar.columns([0.09, 0.79, 0.12])
-
-        with col_left:
-            st.checkbox("", key=f"check_{match}", label_visibility="collapsed")
-
-        with col_middle:
-            with st.expander(
-                f"🏀 {match}  💰{total_payout:.2f}x  ({prop_count})",
-                expanded=True
-            ):
-                group_sorted = group.sort_values(by='sort_order', ascending=True)
-                group_list   = list(group_sorted.iterrows())
-
-                for i, (_, entry) in enumerate(group_list):
-                    is_first = (i == 0)
-                    is_last  = (i == len(group_list) - 1)
-
-                    t_arrow = entry.get('trend_arrow', '→')
-                    t_color = entry.get('trend_color', '#ffcc00')
-                    odds_d  = f" <span style='color:#aaa'>@ {entry['odds']}</span>" if entry.get('odds') else ""
-
-                    # Compact single-block prop card
-                    st.markdown(
-                        f"<div class='prop-row' style='border-left:2px solid {t_color};padding-left:5px;margin-bottom:3px'>"
-                        f"<span style='color:{t_color};font-weight:700'>{t_arrow}</span> "
-                        f"<strong style='font-size:0.85em'>{entry['player']} <span style='color:#88aaff'>•</span> {entry['team']}</strong>"
-                        f"<span style='font-size:0.82em'> &gt; {entry['stat']} {entry['line']}{odds_d}</span><br>"
-                        f"<span style='font-size:0.72em;color:#aaa'>{entry.get('hitrate_str','—')}</span>"
-                        f"</div>",
-                        unsafe_allow_html=True
-                    )
-
-                    # Action row: ↑ ↓ 🔍 🗑 all inline, minimal height
-                    btn_cols = st.columns([0.18, 0.18, 0.32, 0.32])
-                    with btn_cols[0]:
-                        if not is_first:
-                            if st.button("↑", key=f"up_{entry['player']}_{entry['stat']}_{entry['line']}_{i}", help="Move up"):
-                                _move_prop(entry['player'], entry['stat'], entry['line'], -1)
-                                _save_board()
-                                st.rerun()
-                    with btn_cols[1]:
-                        if not is_last:
-                            if st.button("↓", key=f"dn_{entry['player']}_{entry['stat']}_{entry['line']}_{i}", help="Move down"):
-                                _move_prop(entry['player'], entry['stat'], entry['line'], +1)
-                                _save_board()
-                                st.rerun()
-                    with btn_cols[2]:
-                        if st.button("🔍 Load", key=f"load_{entry['player']}_{entry['stat']}_{str(entry.get('timestamp',''))}", help="Load this prop", use_container_width=True):
-                            st.session_state.pending_load = {
-                                'player': entry['player'],
-                                'team':   entry['team'],
-                                'stat':   entry['stat'],
-                                'line':   entry['line'],
-                            }
-                            st.rerun()
-                    with btn_cols[3]:
-                        if st.button("🗑 Del", key=f"del_{entry['player']}_{entry['stat']}_{str(entry.get('timestamp',''))}", help="Remove prop", use_container_width=True):
-                            st.session_state.my_board = [
-                                d for d in st.session_state.my_board
-                                if not (d['player'] == entry['player'] and
-                                        d['stat']   == entry['stat']   and
-                                        d['line']   == entry['line'])
-                            ]
-                            _save_board()
-                            st.rerun()
-
-        with col_right:
-            if st.button("✕", key=f"del_group_{match}", help="Delete entire group"):
-                st.session_state.my_board = [
-                    d for d in st.session_state.my_board
-                    if d['matchup'] != match
-                ]
-                _save_board()
-                st.rerun()
+    with st.sidebar:
+        for match in st.session_state.my_board.matchups():
+            _render_matchup(match)
 else:
     st.sidebar.caption("No props saved. Pin some above!")
 
@@ -661,7 +579,7 @@ dynamic_filename = f"board_{datetime.now().strftime('%Y%m%d_%H%M')}.json"
 
 st.sidebar.download_button(
     label="Download Board", 
-    data=get_board_json(), 
+    data=get_board_json, 
     file_name=dynamic_filename, 
     mime="application/json"
 )
@@ -673,20 +591,289 @@ if uploaded_file is not None:
         for entry in data:
             if isinstance(entry.get('timestamp'), str):
                 entry['timestamp'] = datetime.fromisoformat(entry['timestamp'])
-        st.session_state.my_board = data
+        st.session_state.my_board = nba_board.Board(data)
         _save_board()
         st.sidebar.success("Board restored successfully!")
         st.rerun()
     except Exception as e:
         st.sidebar.error(f"Error loading file: {e}")
 
+# ── Debug metrics (NBA_DEBUG=1 or ?debug=1) ─────────────────────────────────────
+def render_debug_panel():
+    snap = nba_metrics.snapshot()
+    api, caches = {}, {}
+    for c in snap["counters"]:
+        labels = c["labels"]
+        if c["name"].startswith("nba_api_"):
+            row = api.setdefault(labels["endpoint"], {"ok": 0, "errors": 0, "KB": 0.0, "throttled s": 0.0})
+            if c["name"] == "nba_api_requests_total":
+                row["ok" if labels["outcome"] == "ok" else "errors"] += int(c["value"])
+            elif c["name"] == "nba_api_response_bytes_total":
+                row["KB"] += c["value"] / 1024
+            elif c["name"] == "nba_api_throttle_seconds_total":
+                row["throttled s"] += c["value"]
+        elif c["name"] == "nba_cache_requests_total":
+            caches.setdefault(f"{labels['cache']}:{labels['fn']}", {})[labels["result"]] = int(c["value"])
+    logs = None
+    for h in snap["histograms"]:
+        if h["name"] == "nba_api_request_seconds" and h["labels"]["endpoint"] in api:
+            api[h["labels"]["endpoint"]].update({"p50 s": h["p50"], "p95 s": h["p95"]})
+        elif h["name"] == "nba_game_log_bytes":
+            logs = h
+
+    with st.sidebar.expander("⏱ Debug metrics", expanded=False):
+        last = snap["last_run"]
+        if last:
+            st.caption(f"Previous run: {last['total_ms']:.0f} ms")
+            st.dataframe(
+                pd.DataFrame([{"section": k, "ms": round(v["wall_ms"], 1)} for k, v in last["sections"].items()])
+                .sort_values("ms", ascending=False),
+                hide_index=True, use_container_width=True,
+            )
+        if api:
+            st.caption("Upstream nba_api calls")
+            st.dataframe(pd.DataFrame.from_dict(api, orient="index").round(2), use_container_width=True)
+        if caches:
+            st.caption("Cache hits / misses")
+            st.dataframe(pd.DataFrame.from_dict(caches, orient="index").fillna(0).astype(int), use_container_width=True)
+        if logs and logs["count"]:
+            st.caption(f"Game logs built: {logs['count']} · avg {logs['sum'] / logs['count'] / 1024:.1f} KB in memory")
+        st.download_button("Metrics JSON", data=lambda: json.dumps(nba_metrics.snapshot(), indent=2),
+                           file_name="nba_metrics.json", mime="application/json")
+
+if os.environ.get("NBA_DEBUG") or st.query_params.get("debug") == "1":
+    render_debug_panel()
+
+# ── Scanner ─────────────────────────────────────────────────────────────────────
+if view_mode == "Scanner":
+    perf.lap("scanner")
+    st.markdown("#### 🔎 Scanner — today's slate")
+    slate_teams = set(st.session_state.filter_teams or
+                      [t for g in games_today for t in (g['away'], g['home'])])
+    slate_pids = tuple(sorted(p for p, t in player_team_map.items() if t in slate_teams))
+    if not slate_pids:
+        st.info("No games on today's slate to scan.")
+        perf.finish()
+        st.stop()
+
+    sc_stats, sc_hit, sc_side = st.columns([5, 2, 2])
+    with sc_stats:
+        scan_stats = st.multiselect("Stats", available_stats, default=available_stats, key="scan_stats")
+    with sc_hit:
+        min_hit = st.slider("Min hit %", 50, 100, 80, step=5, key="scan_min_hit")
+    with sc_side:
+        scan_side = st.radio("Side", ["Both", "Over", "Under"], horizontal=True, key="scan_side")
+
+    with st.spinner(f"Loading logs for {len(slate_pids)} players…"):
+        slate_df = get_slate_logs(slate_pids)
+    if slate_df.empty or not scan_stats:
+        st.info("Nothing to scan yet.")
+        perf.finish()
+        st.stop()
+
+    scan_df = nba_hitrate.best_lines(
+        nba_hitrate.scan(slate_df, scan_stats, dropdown_values()[1:], min_hit=min_hit), min_hit
+    )
+    if scan_side != "Both":
+        scan_df = scan_df[scan_df["SIDE"] == scan_side[0]]
+
+    name_by_id = nba_players.get_index().name_by_id
+    pid_col = scan_df["PLAYER_ID"].astype(str)
+    scan_df.insert(0, "Player", pid_col.map(name_by_id))
+    scan_df.insert(1, "Team", pid_col.map(player_team_map))
+    scan_df = scan_df.drop(columns="PLAYER_ID").sort_values(["HIT", "L10"], ascending=False)
+
+    st.caption(f"{len(scan_df)} props across {len(slate_pids)} players — click a header to sort.")
+    st.dataframe(
+        scan_df[["Player", "Team", "STAT", "SIDE", "LINE", "L5", "L10", "HIT", "STREAK", "TREND"]],
+        use_container_width=True, hide_index=True, height=640,
+        column_config={
+            "LINE": st.column_config.NumberColumn(format="%.1f"),
+            "L5":   st.column_config.NumberColumn(format="%.0f%%"),
+            "L10":  st.column_config.NumberColumn(format="%.0f%%"),
+            "HIT":  st.column_config.NumberColumn("Hit %", format="%.0f%%"),
+        },
+    )
+    perf.finish()
+    st.stop()
+
+# ── Parlays ─────────────────────────────────────────────────────────────────────
+if view_mode == "Parlays":
+    perf.lap("parlays")
+    st.markdown("#### 🎯 Parlay builder — pinned props")
+    board = st.session_state.my_board
+    board_pids = tuple(sorted({e['player_id'] for e in board if e.get('player_id')}))
+    if len(board) < 2 or not board_pids:
+        st.info("Pin at least two props to build parlays.")
+        perf.finish()
+        st.stop()
+
+    pc_legs, pc_hit, pc_games = st.columns([5, 3, 2])
+    with pc_legs:
+        leg_range = st.slider("Legs", 2, 6, (2, 4), key="parlay_legs")
+    with pc_hit:
+        min_leg_hit = st.slider("Min leg hit %", 30, 90, 50, step=5, key="parlay_min_leg")
+    with pc_games:
+        parlay_window = st.selectbox("Games", [10, 20, 30], index=1, key="parlay_window")
+
+    parlays = nba_parlay.build_parlays(
+        board, get_slate_logs(board_pids), leg_range[0], leg_range[1], min_leg_hit / 100, window=parlay_window,
+    )
+    if parlays.empty:
+        st.info("No parlay clears the thresholds — lower the minimum leg hit rate.")
+        perf.finish()
+        st.stop()
+
+    st.caption(f"{len(parlays)} parlays from {len(board)} pinned props, most likely first. Same-game legs are "
+               f"priced from their joint history over the last {parlay_window} games.")
+    st.dataframe(
+        pd.DataFrame({
+            "Legs": parlays["LEGS"].map(lambda legs: " + ".join(f"{e['player']} {e['stat']} {e['line']}" for e in legs)),
+            "N": parlays["N"],
+            "Hit %": parlays["PROB"] * 100,
+            "Indep. %": parlays["INDEP"] * 100,
+            "Payout": parlays["PAYOUT"],
+            "EV %": parlays["EV"] * 100,
+            "Same game": parlays["CORRELATED"],
+        }),
+        use_container_width=True, hide_index=True, height=640,
+        column_config={
+            "Hit %":    st.column_config.NumberColumn(format="%.0f%%"),
+            "Indep. %": st.column_config.NumberColumn(format="%.0f%%"),
+            "Payout":   st.column_config.NumberColumn(format="%.2fx"),
+            "EV %":     st.column_config.NumberColumn(format="%+.0f%%"),
+        },
+    )
+    perf.finish()
+    st.stop()
+
+# ── Backtest ────────────────────────────────────────────────────────────────────
+@nba_metrics.counted_cache(st.cache_data(ttl=300))
+def get_backtest(pid_strs: tuple, stats: tuple, by_stat: bool):
+    """Signal calibration over the players' logs (see nba_backtest)."""
+    return nba_backtest.backtest(get_slate_logs(pid_strs), list(stats), dropdown_values()[1:], by_stat=by_stat)
+
+if view_mode == "Backtest":
+    perf.lap("backtest")
+    st.markdown("#### 🧪 Backtest — pin signals vs. results")
+    slate_teams = set(st.session_state.filter_teams or
+                      [t for g in games_today for t in (g['away'], g['home'])])
+    slate_pids = tuple(sorted(p for p, t in player_team_map.items() if t in slate_teams))
+    if not slate_pids:
+        st.info("No games on today's slate to backtest.")
+        perf.finish()
+        st.stop()
+
+    bt_stats, bt_signal, bt_split = st.columns([5, 2, 2])
+    with bt_stats:
+        backtest_stats = st.multiselect("Stats", available_stats, default=["PTS", "REB", "AST", "PRA"],
+                                        key="backtest_stats")
+    with bt_signal:
+        backtest_signal = st.selectbox("Signal", nba_backtest.SIGNALS, index=3, key="backtest_signal")
+    with bt_split:
+        backtest_by_stat = st.toggle("Per stat", key="backtest_by_stat")
+    if not backtest_stats:
+        st.info("Pick at least one stat.")
+        perf.finish()
+        st.stop()
+
+    with st.spinner(f"Replaying {len(slate_pids)} players' logs…"):
+        bt_table = get_backtest(slate_pids, tuple(backtest_stats), backtest_by_stat)
+    if bt_table.empty:
+        st.info("Not enough games logged yet to backtest.")
+        perf.finish()
+        st.stop()
+
+    shown = bt_table[bt_table["SIGNAL"] == backtest_signal].drop(columns="SIGNAL")
+    if shown["PRED"].isna().all():   # STREAK / TREND carry no rate of their own
+        shown = shown.drop(columns="PRED")
+    errors = nba_backtest.calibration_error(bt_table)
+    scored = int(bt_table.loc[bt_table["SIGNAL"] == "L5", "N"].sum())
+    caption = (f"{scored:,} props scored from {len(slate_pids)} players' current-season logs, each using only "
+               f"the games before it. HIT is the share that went over")
+    caption += " (for PICK: landed on the picked side)." if backtest_signal == "PICK" else "."
+    if backtest_signal in errors.index.get_level_values(-1) and not backtest_by_stat:
+        caption += f" Mean calibration gap: {errors[backtest_signal]:.1f} pp."
+    st.caption(caption)
+    st.dataframe(
+        shown, use_container_width=True, hide_index=True, height=640,
+        column_config={
+            "N":    st.column_config.NumberColumn(format="%d"),
+            "PRED": st.column_config.NumberColumn("Signal %", format="%.0f%%"),
+            "HIT":  st.column_config.NumberColumn("Hit %", format="%.1f%%"),
+        },
+    )
+    perf.finish()
+    st.stop()
+
+# ── Edges ───────────────────────────────────────────────────────────────────────
+@st.cache_data(ttl=3600, max_entries=8)
+def read_odds_sheet(data: bytes, name: str, _pool) -> pd.DataFrame:
+    """Normalized odds sheet from an uploaded file (see nba_edges.read_odds)."""
+    return nba_edges.read_odds(io.BytesIO(data), name, _pool)
+
+if view_mode == "Edges":
+    perf.lap("edges")
+    st.markdown("#### 💰 Edge finder — imported odds")
+    odds_file = st.file_uploader("Odds sheet (CSV, JSON or XLSX: player, stat, line, price[, side, book])",
+                                 type=["csv", "json", "xlsx"], key="odds_sheet")
+    if odds_file is not None:
+        try:
+            st.session_state.imported_odds = read_odds_sheet(odds_file.getvalue(), odds_file.name,
+                                                             frozenset(player_team_map))
+        except Exception as e:
+            st.error(f"Could not read the odds sheet: {e}")
+    odds_sheet = st.session_state.get("imported_odds")
+    if odds_sheet is None or odds_sheet.empty:
+        st.info("Upload an odds sheet to rank its props by edge.")
+        perf.finish()
+        st.stop()
+
+    ec_ev, ec_unpriced = st.columns([5, 2])
+    with ec_ev:
+        min_ev = st.slider("Min model EV %", -20, 50, 0, step=1, key="edges_min_ev")
+    with ec_unpriced:
+        show_unpriced = st.toggle("Show unpriced rows", key="edges_unpriced")
+
+    sheet_pids = tuple(sorted(odds_sheet["PLAYER_ID"].dropna().unique()))
+    with st.spinner(f"Loading logs for {len(sheet_pids)} players…"):
+        edges_frame = get_slate_logs(sheet_pids) if sheet_pids else pd.DataFrame()
+    edges = nba_edges.score(odds_sheet, edges_frame)
+    priced = edges["NOTE"] == ""
+    shown = edges[(priced & (edges["EV"] * 100 >= min_ev)) | (~priced & show_unpriced)]
+
+    st.caption(f"{int(priced.sum())} of {len(edges)} rows priced against {len(sheet_pids)} players' logs; "
+               f"{len(shown)} shown, best model EV first. No-vig uses both sides of a line when the sheet has them.")
+    st.dataframe(
+        pd.DataFrame({
+            "Player": shown["PLAYER"], "Stat": shown["STAT"], "Line": shown["LINE"], "Side": shown["SIDE"],
+            "Price": shown["PRICE"].astype(str), "Book": shown["BOOK"],
+            "No-vig %": shown["NO_VIG"] * 100, "Hit %": shown["P_HIT"] * 100, "Model %": shown["P_MODEL"] * 100,
+            "Edge": shown["EDGE"] * 100, "EV %": shown["EV"] * 100, "Note": shown["NOTE"],
+        }),
+        use_container_width=True, hide_index=True, height=640,
+        column_config={
+            "Line":     st.column_config.NumberColumn(format="%.1f"),
+            "No-vig %": st.column_config.NumberColumn(format="%.0f%%"),
+            "Hit %":    st.column_config.NumberColumn(format="%.0f%%"),
+            "Model %":  st.column_config.NumberColumn(format="%.0f%%"),
+            "Edge":     st.column_config.NumberColumn("Edge pp", format="%+.1f"),
+            "EV %":     st.column_config.NumberColumn(format="%+.0f%%"),
+        },
+    )
+    perf.finish()
+    st.stop()
+
 # ── Main Content ────────────────────────────────────────────────────────────────
 if not selected_player or df is None or df.empty:
     st.info("Select a player from the sidebar to get started.")
+    perf.finish()
     st.stop()
 
-# Load defensive rankings (cached, non-blocking)
-def_rankings = get_opp_def_rankings(CURRENT_SEASON)
+perf.lap("defense")
+# Defense matrix for today's slate (disk-cached) and the player's position group
+def_matrix = get_defense_matrix(CURRENT_SEASON)
+player_position = get_player_positions(CURRENT_SEASON).get(str(pid), "") if pid else ""
 opponent = get_opponent_from_game(selected_game_label, player_team)
 
 st.markdown("---")
@@ -698,17 +885,17 @@ with col_left:
     st.markdown("#### 📈 Hit Rate & Recent Games")
 
     if lines:
-        pdata = df.sort_values("GAME_DATE_DT", ascending=False).copy()
-
-        for stat, line in lines.items():
-            windows = [5, 10]
-            windows = [w for w in windows if len(pdata) >= w]
-
-            over_list = []
-            for w in windows:
-                recent_w = pdata.head(w)
-                hit_pct = (recent_w[stat] > line).mean() * 100
-                over_list.append(hit_pct)
+        perf.lap("hit_rates")
+        pdata = df  # loader already returns newest game first
+        # One vectorized pass for every selected stat/line
+        summary = nba_hitrate.summarize(df, list(lines), list(lines.values()))
+        projection = nba_projection.project(df.assign(PLAYER_ID=str(pid)))
+        slope_min = summary["min_slope"]
+        recent_avg_min = summary["min_avg"]
+
+        for i, (stat, line) in enumerate(lines.items()):
+            perf.lap("hit_rates")
+            over_list = [pct for pct in summary["rates"][i] if not np.isnan(pct)]
 
             parts = []
             for pct in over_list:
@@ -716,7 +903,7 @@ with col_left:
                 parts.append(f"<span style='color:{color}'>{pct:.0f}%</span>")
 
             hit_str = " | ".join(parts)
-            avg_o = np.mean(over_list)
+            avg_o = summary["avg_o"][i]
             avg_u = 100 - avg_o
             avg_color_o = '#00ff88' if avg_o > 75 else '#ffcc00' if avg_o >= 61 else '#ff5555'
             avg_color_u = '#00ff88' if avg_u > 75 else '#ffcc00' if avg_u >= 61 else '#ff5555'
@@ -725,7 +912,7 @@ with col_left:
 
             badge_html = ""
             if opponent:
-                badge_html = get_def_rank_badge(opponent, stat, def_rankings)
+                badge_html = get_def_rank_badge(opponent, stat, def_matrix, player_position)
                 if badge_html:
                     badge_html = f" &nbsp;{badge_html}"
 
@@ -736,12 +923,8 @@ with col_left:
             )
 
             # Minutes Projection — right below the hit rate pill
-            recent_min_data = df.head(10)
-            if len(recent_min_data) >= 3:
-                x_min = np.arange(len(recent_min_data))
-                y_min = recent_min_data["MIN"].values
-                slope_min, _ = np.polyfit(x_min, y_min, 1)
-                recent_avg_min = recent_min_data["MIN"].mean()
+            perf.lap("minutes")
+            if not np.isnan(slope_min):
                 projected_min = recent_avg_min + slope_min
                 min_color = '#00ff88' if projected_min >= 32 else '#ffcc00' if projected_min >= 28 else '#ff5555'
                 concern_min = "🟢 Solid" if projected_min >= 32 else "🟡 Some concern" if projected_min >= 28 else "🔴 High risk"
@@ -756,62 +939,86 @@ with col_left:
                     unsafe_allow_html=True
                 )
 
-            if len(pdata) > 0:
-                n = min(10, len(pdata))
-                recent_data = pdata.head(n)
-                fig = go.Figure()
-                colors = ["#00ff88" if v > line else "#ff4444" for v in recent_data[stat]]
-                text_colors = ["#000" if val > 10 else "#fff" for val in recent_data[stat]]
-
-                fig.add_trace(go.Bar(
-                    x=recent_data["GAME_DATE"],
-                    y=recent_data[stat],
-                    marker_color=colors,
-                    text=recent_data[stat].round(1),
-                    textposition="inside",
-                    textfont={"color": text_colors, "size": 11}
-                ))
-                fig.add_hline(y=line, line_dash="dash", line_color="#00ffff",
-                              annotation_text=f"line = {line}", annotation_position="top right",
-                              annotation_font_size=11)
-
-                fig.update_layout(
-                    height=220,
-                    margin=dict(t=25, b=30, l=30, r=15),
-                    plot_bgcolor="rgba(0,0,0,0)", paper_bgcolor="rgba(0,0,0,0)",
-                    font_color="#00e0ff",
-                    xaxis=dict(title=None, tickfont=dict(size=10)),
-                    yaxis=dict(title=stat, tickfont=dict(size=10), title_font=dict(size=11)),
+            # Model projection — P(over) and fair odds vs. the selected price
+            perf.lap("projection")
+            at_line = projection.ladder(str(pid), stat, [line])
+            if not at_line.empty:
+                at_line = at_line.iloc[0]
+                p_over = at_line["P_OVER"]
+                p_color = '#00ff88' if p_over > 0.6 else '#ffcc00' if p_over >= 0.4 else '#ff5555'
+                model_html = (
+                    f"<b>Model:</b> μ {projection.mean(str(pid), stat):.1f}"
+                    f" &nbsp;|&nbsp; <b>P(O {line})</b> <span style='color:{p_color};font-weight:700'>{p_over * 100:.0f}%</span>"
+                    f" &nbsp;|&nbsp; <b>Fair:</b> O {nba_projection.format_odds(at_line['FAIR_OVER'])}"
+                    f" / U {nba_projection.format_odds(at_line['FAIR_UNDER'])}"
+                )
+                picked_odds = st.session_state.get(odds_key, "") if stat == selected_stat else ""
+                price = nba_board.odds_multiplier(picked_odds) if picked_odds else None
+                if price:
+                    ev = p_over * price - 1
+                    ev_color = '#00ff88' if ev > 0.03 else '#ffcc00' if ev > -0.03 else '#ff5555'
+                    model_html += (f" &nbsp;|&nbsp; <b>Your {picked_odds}:</b> "
+                                   f"<span style='color:{ev_color};font-weight:700'>EV {ev * 100:+.0f}%</span> (over)")
+                st.markdown(
+                    f"<div style='background:#1e1e2e;padding:8px 10px;border-radius:8px;margin:-4px 0 8px 0;font-size:0.88em;'>"
+                    f"{model_html}</div>",
+                    unsafe_allow_html=True
                 )
+                ladder_box = st.expander(f"📐 {stat} line ladder — model", key=f"ladder_open_{stat}",
+                                         on_change="rerun")
+                if ladder_box.open:   # built only while expanded
+                    with ladder_box:
+                        ladder = projection.ladder(str(pid), stat, dropdown_values()[1:])
+                        shown = ladder[(ladder["P_OVER"] > 0.05) & (ladder["P_OVER"] < 0.95)]
+                        st.dataframe(
+                            pd.DataFrame({
+                                "Line": shown["LINE"],
+                                "Over %": shown["P_OVER"] * 100,
+                                "Fair over": shown["FAIR_OVER"].map(nba_projection.format_odds),
+                                "Fair under": shown["FAIR_UNDER"].map(nba_projection.format_odds),
+                            }),
+                            use_container_width=True, hide_index=True,
+                            column_config={
+                                "Line":   st.column_config.NumberColumn(format="%.1f"),
+                                "Over %": st.column_config.NumberColumn(format="%.0f%%"),
+                            },
+                        )
+                        st.caption(f"Minutes-adjusted, recency-weighted fit over the last {int(projection.games[0])} games "
+                                   f"(≈ {projection.minutes[0]:.1f} MIN projected).")
+
+            perf.lap("charts")
+            if len(pdata) > 0:
+                fig = get_recent_chart(str(pid), stat, float(line), str(pdata["GAME_ID"].iloc[0]), pdata)
                 st.plotly_chart(fig, use_container_width=True)
 
+perf.lap("vs_opponent")
 with col_right:
     if opponent and df is not None and not df.empty:
         def_badge = ""
         if selected_stat and selected_stat != "— Select stat —":
-            def_badge = get_def_rank_badge(opponent, selected_stat, def_rankings)
-
-        st.markdown(f"#### 📊 vs {opponent} — {CURRENT_SEASON}")
+            def_badge = get_def_rank_badge(opponent, selected_stat, def_matrix, player_position)
+
+        vs_all = st.session_state.get("vs_all_seasons", False)
+        vs_log = nba_data.get_player_history(str(pid)) if vs_all else df
+        if vs_log.empty:
+            vs_all, vs_log = False, df
+        vs_scope = f"last {nba_data.HISTORY_SEASONS} seasons" if vs_all else CURRENT_SEASON
+        st.markdown(f"#### 📊 vs {opponent} — {vs_scope}")
+        st.toggle(f"Last {nba_data.HISTORY_SEASONS} seasons", key="vs_all_seasons")
         if def_badge:
             st.markdown(f"**{opponent} Defense** — {selected_stat}: {def_badge}", unsafe_allow_html=True)
 
-        current_season_games = df[df['SEASON_ID'].str.contains(CURRENT_SEASON.split('-')[0], na=False)].copy()
-        vs_opp = current_season_games[
-            current_season_games['MATCHUP'].str.contains(opponent, na=False)
-        ].copy()
+        splits = get_opponent_splits(str(pid), str(vs_log["GAME_ID"].iloc[0]), vs_all, vs_log)
+        vs = splits.summary(opponent)
 
-        if not vs_opp.empty:
-            games_vs = len(vs_opp)
-            avg_pts = vs_opp["PTS"].mean()
-            avg_reb = vs_opp["REB"].mean()
-            avg_ast = vs_opp["AST"].mean()
-            avg_min = vs_opp["MIN"].mean()
+        if vs:
+            games_vs = vs["G"]
 
             # Hit rate inline with averages
             hr_html = ""
             if selected_stat and selected_stat in lines:
                 _line = lines[selected_stat]
-                hit_rate_vs = (vs_opp[selected_stat] > _line).mean() * 100
+                hit_rate_vs = splits.hit_rate(opponent, selected_stat, _line)
                 hr_color = '#00ff88' if hit_rate_vs > 65 else '#ffcc00' if hit_rate_vs >= 50 else '#ff5555'
                 hr_html = (
                     f" &nbsp;|&nbsp; <b>Hit Rate</b> ({selected_stat} {_line}): "
@@ -820,8 +1027,8 @@ with col_right:
 
             st.markdown(
                 f"<div style='background:#1e1e2e;padding:8px 10px;border-radius:8px;margin:4px 0 8px 0;font-size:0.88em;'>"
-                f"<b>G:</b> {games_vs} &nbsp;|&nbsp; <b>MIN:</b> {avg_min:.1f} &nbsp;|&nbsp; "
-                f"<b>PTS:</b> {avg_pts:.1f} &nbsp;|&nbsp; <b>REB:</b> {avg_reb:.1f} &nbsp;|&nbsp; <b>AST:</b> {avg_ast:.1f}"
+                f"<b>G:</b> {games_vs} &nbsp;|&nbsp; <b>MIN:</b> {vs['MIN']:.1f} &nbsp;|&nbsp; "
+                f"<b>PTS:</b> {vs['PTS']:.1f} &nbsp;|&nbsp; <b>REB:</b> {vs['REB']:.1f} &nbsp;|&nbsp; <b>AST:</b> {vs['AST']:.1f}"
                 f"{hr_html}"
                 f"</div>",
                 unsafe_allow_html=True
@@ -829,27 +1036,11 @@ with col_right:
 
             # Shooting % — same pill style as the averages row
             shoot_items = []
-            if "FGM" in vs_opp.columns and "FGA" in vs_opp.columns and vs_opp["FGA"].sum() > 0:
-                fg3m_sum = vs_opp["FG3M"].sum() if "FG3M" in vs_opp.columns else 0
-                fg3a_sum = vs_opp["FG3A"].sum() if "FG3A" in vs_opp.columns else 0
-                fg2m = vs_opp["FGM"].sum() - fg3m_sum
-                fg2a = vs_opp["FGA"].sum() - fg3a_sum
-                if fg2a > 0:
-                    pct_2p = fg2m / fg2a * 100
-                    c2 = '#00ff88' if pct_2p >= 50 else '#ffcc00' if pct_2p >= 42 else '#ff5555'
-                    shoot_items.append(f"<b>2P%:</b> <span style='color:{c2};font-weight:700'>{pct_2p:.1f}%</span>")
-            if "FG3M" in vs_opp.columns and "FG3A" in vs_opp.columns and vs_opp["FG3A"].sum() > 0:
-                fg3m = vs_opp["FG3M"].sum()
-                fg3a = vs_opp["FG3A"].sum()
-                pct_3p = fg3m / fg3a * 100
-                c3 = '#00ff88' if pct_3p >= 37 else '#ffcc00' if pct_3p >= 32 else '#ff5555'
-                shoot_items.append(f"<b>3P%:</b> <span style='color:{c3};font-weight:700'>{pct_3p:.1f}%</span>")
-            if "FTM" in vs_opp.columns and "FTA" in vs_opp.columns and vs_opp["FTA"].sum() > 0:
-                ftm = vs_opp["FTM"].sum()
-                fta = vs_opp["FTA"].sum()
-                pct_ft = ftm / fta * 100
-                cft = '#00ff88' if pct_ft >= 80 else '#ffcc00' if pct_ft >= 70 else '#ff5555'
-                shoot_items.append(f"<b>FT%:</b> <span style='color:{cft};font-weight:700'>{pct_ft:.1f}%</span>")
+            for label, good, ok in [("2P%", 50, 42), ("3P%", 37, 32), ("FT%", 80, 70)]:
+                pct = vs.get(label, np.nan)
+                if pd.notna(pct):
+                    c = '#00ff88' if pct >= good else '#ffcc00' if pct >= ok else '#ff5555'
+                    shoot_items.append(f"<b>{label}:</b> <span style='color:{c};font-weight:700'>{pct:.1f}%</span>")
             if shoot_items:
                 st.markdown(
                     f"<div style='background:#1e1e2e;padding:8px 10px;border-radius:8px;margin:4px 0 8px 0;font-size:0.88em;'>"
@@ -858,14 +1049,7 @@ with col_right:
                     unsafe_allow_html=True
                 )
 
-            vs_opp_disp = vs_opp.copy()
-            for _col, a, b in [("Pts+Reb", "PTS", "REB"), ("Pts+Ast", "PTS", "AST"),
-                                ("Ast+Reb", "AST", "REB"), ("Stl+Blk", "STL", "BLK")]:
-                if a in vs_opp_disp.columns and b in vs_opp_disp.columns:
-                    vs_opp_disp[_col] = vs_opp_disp[a] + vs_opp_disp[b]
-            if all(c in vs_opp_disp.columns for c in ["PTS", "REB", "AST"]):
-                vs_opp_disp["PRA"] = vs_opp_disp["PTS"] + vs_opp_disp["REB"] + vs_opp_disp["AST"]
-
+            vs_opp_disp = nba_data.with_display_dates(splits.games(opponent), "%m/%d/%y" if vs_all else "%m/%d")
             display_cols_vs = ["GAME_DATE", "WL", "MIN", "PTS", "REB", "AST",
                                 "STL", "BLK", "TOV", "FG3M", "PRA", "+/-"]
             available_vs = [c for c in display_cols_vs if c in vs_opp_disp.columns]
@@ -878,37 +1062,35 @@ with col_right:
             st.dataframe(styled_vs, use_container_width=True, hide_index=True, height=320)
 
         else:
-            st.info(f"No games vs **{opponent}** in {CURRENT_SEASON} yet.")
+            st.info(f"No games vs **{opponent}** in the {vs_scope}." if vs_all
+                    else f"No games vs **{opponent}** in {CURRENT_SEASON} yet.")
     else:
         st.markdown("#### 📊 vs Opponent")
         st.caption("Select a game filter in the sidebar to see matchup history.")
 
 
 # ── Full Recent Game Log ────────────────────────────────────────────────────────
-with st.expander("📊 Full Recent Game Log (Last 15)", expanded=False):
-    df_disp = df.copy()
-    for col, a, b in [("Pts+Reb", "PTS", "REB"), ("Pts+Ast", "PTS", "AST"),
-                      ("Ast+Reb", "AST", "REB"), ("Stl+Blk", "STL", "BLK")]:
-        if a in df_disp.columns and b in df_disp.columns:
-            df_disp[col] = df_disp[a] + df_disp[b]
-    if all(c in df_disp.columns for c in ["PTS", "REB", "AST"]):
-        df_disp["PRA"] = df_disp["PTS"] + df_disp["REB"] + df_disp["AST"]
-
-    display_cols = ["GAME_DATE", "GAME_TYPE", "MATCHUP", "WL", "MIN",
-                    "PTS", "REB", "AST", "STL", "BLK", "TOV",
-                    "Pts+Reb", "Pts+Ast", "Ast+Reb", "Stl+Blk", "PRA",
-                    "FG3M", "FG3A", "+/-"]
-    available_cols = [c for c in display_cols if c in df_disp.columns]
-    
-    def highlight_minutes(val):
-        if pd.isna(val): return ''
-        color = '#00cc88' if val >= 32 else '#ffcc00' if val >= 28 else '#ff5555'
-        return f'background-color: {color}; color: black'
-    
-    styled_df = df_disp.head(15)[available_cols].style\
-        .format(precision=1)\
-        .map(highlight_minutes, subset=['MIN'] if 'MIN' in available_cols else [])
-    
-    st.dataframe(styled_df, use_container_width=True, hide_index=True)
+perf.lap("game_log")
+game_log = st.expander("📊 Full Recent Game Log (Last 15)", key="game_log_open", on_change="rerun")
+if game_log.open:   # built only while expanded
+    with game_log:
+        df_disp = nba_data.with_display_dates(df.head(15))  # combo columns come with the cached log
+        display_cols = ["GAME_DATE", "GAME_TYPE", "MATCHUP", "WL", "MIN",
+                        "PTS", "REB", "AST", "STL", "BLK", "TOV",
+                        "Pts+Reb", "Pts+Ast", "Ast+Reb", "Stl+Blk", "PRA",
+                        "FG3M", "FG3A", "+/-"]
+        available_cols = [c for c in display_cols if c in df_disp.columns]
+
+        def highlight_minutes(val):
+            if pd.isna(val): return ''
+            color = '#00cc88' if val >= 32 else '#ffcc00' if val >= 28 else '#ff5555'
+            return f'background-color: {color}; color: black'
+
+        styled_df = df_disp[available_cols].style\
+            .format(precision=1)\
+            .map(highlight_minutes, subset=['MIN'] if 'MIN' in available_cols else [])
+
+        st.dataframe(styled_df, use_container_width=True, hide_index=True)
 
 st.markdown("<p style='text-align:center; color:#88f0ff; padding-top:2rem;'>ICE PROP LAB • 2025-26</p>", unsafe_allow_html=True)
+perf.finish()
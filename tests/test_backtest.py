@@ -0,0 +1,99 @@
+"""nba_backtest signals: no look-ahead, parity with the pin handler on the prior
+games, and the calibration table against a per-game loop."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import nba_backtest
+import nba_hitrate
+
+LINES = [2.5, 9.5, 14.5, 17.5, 24.5]
+
+
+@pytest.fixture(scope="module")
+def series():
+    """(series, games) stat values, oldest first, the last series NaN-padded."""
+    rng = np.random.default_rng(0)
+    v = rng.poisson(15, (4, 30)).astype(float)
+    v[-1, 22:] = np.nan
+    return v
+
+
+def test_signals_only_use_earlier_games(series):
+    rng = np.random.default_rng(1)
+    base = nba_backtest.signals(series, LINES)
+    for t in range(series.shape[1]):
+        changed = series.copy()
+        changed[:, t:] = rng.poisson(15, changed[:, t:].shape)   # rewrite game t and everything after
+        sig = nba_backtest.signals(changed, LINES)
+        for name in ["rates", "avg_o", "streak_over", "streak_count", "trend", "avg10"]:
+            np.testing.assert_array_equal(sig[name][:, :t + 1], base[name][:, :t + 1], err_msg=f"{name} t={t}")
+
+
+@pytest.mark.parametrize("depth", [30, 8, 4])   # 8 and 4: shorter than the L10 / L5 windows
+def test_signals_match_pin_handler_on_prior_games(series, depth):
+    series = series[:, :depth]
+    sig = nba_backtest.signals(series, LINES)
+    for s, v in enumerate(series):
+        for t in range(1, int((~np.isnan(v)).sum())):
+            prior = pd.DataFrame({"X": v[:t][::-1], "MIN": 30.0})   # newest first, as the dashboard shows it
+            for l, line in enumerate(LINES):
+                want = nba_hitrate.summarize(prior, ["X"], [line])
+                msg = f"series {s} game {t} line {line}"
+                np.testing.assert_allclose(sig["rates"][s, t, l], want["rates"][0], rtol=1e-6, err_msg=msg)
+                np.testing.assert_allclose(sig["avg_o"][s, t, l], want["avg_o"][0], rtol=1e-6, err_msg=msg)
+                assert sig["streak_over"][s, t, l] == want["streak_over"][0], msg
+                assert sig["streak_count"][s, t, l] == want["streak_count"][0], msg
+                assert sig["trend"][s, t, l] == want["trend"][0], msg
+            assert sig["over"][s, t].tolist() == (v[t] > np.array(LINES)).tolist()
+
+
+@pytest.fixture(scope="module")
+def logs():
+    """Two players; player 1 has two seasons, so windows must restart."""
+    rng = np.random.default_rng(2)
+    frames = []
+    for pid, season, n, start in [("1", "22024", 18, "2024-10-22"), ("1", "22025", 14, "2025-10-21"),
+                                  ("2", "22025", 25, "2025-10-21")]:
+        frames.append(pd.DataFrame({
+            "PLAYER_ID": pid,
+            "SEASON_ID": season,
+            "GAME_DATE_DT": pd.date_range(start, periods=n, freq="2D")[::-1],
+            "PTS": rng.poisson(15, n),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def loop_l5(frame: pd.DataFrame, lines) -> dict:
+    """L5 bucket → (N, HIT %) by walking every player season oldest game first."""
+    counts = {}
+    for _, games in frame.groupby(["PLAYER_ID", "SEASON_ID"]):
+        pts = games.sort_values("GAME_DATE_DT")["PTS"].to_numpy(dtype=float)
+        for t in range(nba_backtest.MIN_GAMES, len(pts)):
+            prior = pts[:t]
+            avg10 = prior[-10:].mean()
+            for line in lines:
+                if abs(line - avg10) > max(avg10 * nba_backtest.BAND, nba_backtest.MIN_BAND):
+                    continue
+                bucket = int(np.floor((prior[-5:] > line).mean() * 100 / 10) * 10)
+                n, hits = counts.get(bucket, (0, 0))
+                counts[bucket] = (n + 1, hits + (pts[t] > line))
+    return {b: (n, hits / n * 100) for b, (n, hits) in counts.items()}
+
+
+def test_backtest_matches_loop(logs):
+    lines = np.arange(0.5, 40.6, 1.0)
+    table = nba_backtest.backtest(logs, ["PTS"], lines)
+    l5 = table[table["SIGNAL"] == "L5"]
+    want = loop_l5(logs, lines)
+    assert {int(b): (n, pytest.approx(h)) for b, n, h in zip(l5["BUCKET"], l5["N"], l5["HIT"])} == want
+    # Every signal is scored on the same observations
+    n_total = sum(n for n, _ in want.values())
+    for signal in ["AVG_O", "PICK", "STREAK", "TREND"]:
+        assert table.loc[table["SIGNAL"] == signal, "N"].sum() == n_total
+
+
+def test_backtest_without_enough_games():
+    frame = pd.DataFrame({"PLAYER_ID": "1", "SEASON_ID": "22025",
+                          "GAME_DATE_DT": pd.date_range("2025-10-21", periods=4), "PTS": [10, 12, 9, 15]})
+    assert nba_backtest.backtest(frame, ["PTS"], [9.5, 11.5]).empty
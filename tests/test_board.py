@@ -0,0 +1,111 @@
+"""nba_board wire format: v2 round trips, legacy base64-JSON links and bad payloads."""
+import base64
+import json
+import math
+import struct
+import zlib
+from datetime import datetime
+
+import pytest
+
+import nba_board
+
+
+def entry(**fields) -> dict:
+    e = {
+        "player": "LeBron James", "player_id": "2544", "team": "LAL", "matchup": "LAL @ BOS",
+        "stat": "PTS", "line": "24.5", "odds": "-115", "timestamp": datetime(2026, 1, 5, 19, 30, 12),
+        "sort_order": 0, "rates": [80.0, 60.0], "avg_o": 70.0, "min_avg": 35.4,
+        "streak": "O3", "trend": 1,
+    }
+    e.update(fields)
+    return e
+
+
+def legacy(board: list) -> str:
+    """The pre-v2 ?board= value: urlsafe base64 of the JSON entry list, padded."""
+    data = [dict(e, timestamp=e["timestamp"].isoformat()) if isinstance(e.get("timestamp"), datetime) else e
+            for e in board]
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+def test_round_trip():
+    board = [
+        entry(),
+        entry(player="Jayson Tatum", player_id="1628369", team="BOS", stat="PRA", line="41.5", odds="+120",
+              sort_order=1, rates=[40.0, 50.0], avg_o=45.0, min_avg=36.0, streak="U2", trend=-1),
+        # a name the index doesn't resolve from the id is carried in the string table
+        entry(player="Bronny James Jr.", player_id="0", stat="FG3M", line="0.5", odds="", sort_order=2,
+              streak="", trend=0),
+    ]
+    encoded = nba_board.encode(board)
+    assert "=" not in encoded and "+" not in encoded and "/" not in encoded   # query-param safe
+    got = nba_board.decode(encoded)
+    assert len(got) == len(board)
+    for want, have in zip(board, got):
+        assert have["player"] == want["player"]
+        assert have["player_id"] == (want["player_id"] if want["player_id"] != "0" else None)
+        for field in ["team", "matchup", "stat", "line", "odds", "timestamp", "sort_order", "rates",
+                      "avg_o", "min_avg", "streak", "trend"]:
+            assert have[field] == want[field], field
+        assert not nba_board.needs_stats(have)
+
+
+def test_round_trip_keeps_a_lines_tenths():
+    for line in ["0.5", "7.0", "12.5", "58.5"]:
+        assert nba_board.decode(nba_board.encode([entry(line=line)]))[0]["line"] == line
+
+
+def test_empty_board():
+    assert nba_board.decode(nba_board.encode([])) == []
+
+
+@pytest.mark.parametrize("missing", [None, math.nan])
+def test_missing_rates_and_minutes(missing):
+    got = nba_board.decode(nba_board.encode([entry(rates=[missing, 55.0], avg_o=missing, min_avg=missing)]))[0]
+    assert got["rates"] == [None, 55.0]
+    assert got["avg_o"] is None and got["min_avg"] is None
+
+
+def test_short_rates_and_no_timestamp():
+    got = nba_board.decode(nba_board.encode([entry(rates=[], timestamp=None)]))[0]
+    assert got["rates"] == [None, None] and got["timestamp"] is None
+
+
+def test_decodes_legacy_board():
+    board = [
+        {"player": "LeBron James", "team": "LAL", "matchup": "LAL @ BOS", "stat": "PTS", "line": "24.5",
+         "odds": "-115", "hitrate_str": "L5: 80% | L10: 60%", "timestamp": datetime(2025, 12, 1, 18, 0)},
+        {"player": "Jayson Tatum", "team": "BOS", "matchup": "LAL @ BOS", "stat": "REB", "line": "8.5",
+         "odds": "", "hitrate_str": "", "timestamp": "not a date"},
+    ]
+    got = nba_board.decode(legacy(board))
+    assert [e["player"] for e in got] == ["LeBron James", "Jayson Tatum"]
+    assert got[0]["timestamp"] == datetime(2025, 12, 1, 18, 0)
+    assert got[1]["timestamp"] == "not a date"   # left as-is when unparsable
+    assert all(nba_board.needs_stats(e) for e in got)
+    # ...and is rewritten in the compact format
+    assert nba_board.decode(nba_board.encode(got))[0]["line"] == "24.5"
+
+
+def v2(payload: bytes) -> str:
+    raw = bytes([nba_board.VERSION]) + zlib.compress(payload)
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def test_rejects_corrupt_or_truncated_payloads():
+    good = nba_board.encode([entry(), entry(stat="AST", line="7.5")])
+    raw = zlib.decompress(base64.urlsafe_b64decode(good + "=" * (-len(good) % 4))[1:])
+    table = struct.unpack_from("<HI", raw)[1]
+    bad = [
+        "", "!!!", "bm90IGpzb24",                   # nothing, not base64, base64 of non-JSON
+        good[:len(good) // 2],                     # cut mid-stream: zlib fails
+        v2(raw[:-nba_board._RECORD.size]),         # one record short of the count
+        v2(raw[:-5]),                              # a record cut in half
+        v2(raw + b"\0" * nba_board._RECORD.size),  # more records than the count
+        v2(raw[:3]),                               # header cut
+        v2(struct.pack("<HI", 1, table) + raw[6:6 + table]   # a string index past the table
+           + nba_board._RECORD.pack(2544, 99, 0, 0, 0, 0, 245, 80, 60, 70, 354, 3, 1, 0, 0)),
+    ]
+    for value in bad:
+        assert nba_board.decode(value) == [], value
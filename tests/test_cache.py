@@ -0,0 +1,145 @@
+"""nba_cache backends (round trip, TTL, locks) and get_or_compute coalescing.
+
+Redis cases run against NBA_TEST_REDIS_URL (default redis://localhost:6379/15)
+and are skipped when no server answers there.
+"""
+import os
+import threading
+import time
+import uuid
+
+import pandas as pd
+import pytest
+
+import nba_cache
+
+REDIS_URL = os.environ.get("NBA_TEST_REDIS_URL", "redis://localhost:6379/15")
+
+
+def redis_backend():
+    redis = pytest.importorskip("redis")
+    backend = nba_cache.RedisBackend(REDIS_URL)
+    try:
+        backend._r.ping()
+    except redis.exceptions.ConnectionError:
+        pytest.skip(f"no Redis server at {REDIS_URL}")
+    return backend
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return nba_cache.MemoryBackend()
+    if request.param == "sqlite":
+        return nba_cache.SQLiteBackend(str(tmp_path / "cache.sqlite"))
+    return redis_backend()
+
+
+@pytest.fixture
+def key():
+    """A key no earlier run (or other test against a shared Redis) has used."""
+    return f"nba:test:{uuid.uuid4().hex}"
+
+
+@pytest.fixture
+def installed(backend):
+    """backend as the process-wide nba_cache backend for the test."""
+    previous = nba_cache.get_backend()
+    nba_cache.set_backend(backend)
+    yield backend
+    nba_cache.set_backend(previous)
+
+
+def test_round_trip(backend, key):
+    assert backend.get(key) is None
+    frame = pd.DataFrame({"GAME_ID": ["0022500001", "0022500002"], "PTS": [31, 12]})
+    for value in [frame, {"games": [1, 2], "count": 2}, ("BOS", 3.5)]:
+        backend.set(key, nba_cache.dumps(value), ttl=30)
+        got = nba_cache.loads(backend.get(key))
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(got, value)
+        else:
+            assert got == value
+
+
+def test_ttl_expires(backend, key):
+    backend.set(key, b"Pshort", ttl=0.2)
+    backend.set(key + ":long", b"Plong", ttl=30)
+    assert backend.get(key) == b"Pshort"
+    time.sleep(0.35)
+    assert backend.get(key) is None
+    assert backend.get(key + ":long") == b"Plong"
+
+
+def test_set_overwrites_and_extends(backend, key):
+    backend.set(key, b"Pold", ttl=0.2)
+    backend.set(key, b"Pnew", ttl=30)
+    time.sleep(0.35)
+    assert backend.get(key) == b"Pnew"
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = nba_cache.MemoryBackend(max_entries=2)
+    backend.set("a", b"P1", 30)
+    backend.set("b", b"P2", 30)
+    backend.get("a")
+    backend.set("c", b"P3", 30)
+    assert backend.get("b") is None and backend.get("a") == b"P1"
+
+
+@pytest.mark.parametrize("make", ["sqlite", "redis"])
+def test_lock_is_exclusive_until_released_or_expired(make, tmp_path, key):
+    backend = nba_cache.SQLiteBackend(str(tmp_path / "cache.sqlite")) if make == "sqlite" else redis_backend()
+    assert backend.acquire(key, ttl=30)
+    assert not backend.acquire(key, ttl=30)
+    backend.release(key)
+    assert backend.acquire(key, ttl=0.2)
+    time.sleep(0.35)
+    assert backend.acquire(key, ttl=30)   # the holder's lock lapsed
+    backend.release(key)
+
+
+def test_concurrent_misses_compute_once(installed, key):
+    calls = []
+    start = threading.Barrier(20)
+
+    def fn(x):
+        calls.append(x)
+        time.sleep(0.2)
+        return pd.DataFrame({"x": [x]})
+
+    results = [None] * 20
+
+    def worker(i):
+        start.wait()
+        results[i] = nba_cache.get_or_compute(key, 30, fn, 7)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == [7]
+    assert all(r["x"].tolist() == [7] for r in results)
+    assert key not in nba_cache._key_locks   # per-key locks go once nobody waits on them
+
+
+def test_cached_refresh_and_errors(installed):
+    calls = []
+    tag = uuid.uuid4().hex
+
+    @nba_cache.cached(ttl=30)
+    def square(x, tag):
+        calls.append(x)
+        if x < 0:
+            raise ValueError("negative")
+        return x * x
+
+    assert square(3, tag) == 9 and square(3, tag) == 9
+    assert calls == [3]
+    assert square.refresh(3, tag) == 9
+    assert calls == [3, 3]
+    for _ in range(2):   # exceptions are not cached
+        with pytest.raises(ValueError):
+            square(-1, tag)
+    assert calls == [3, 3, -1, -1]
@@ -0,0 +1,135 @@
+"""nba_edges sheet normalization (column / stat aliases, prices) and the edge table
+(no-vig pairs, model and hit-rate probabilities, notes on unpriced rows)."""
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import nba_edges
+import nba_hitrate
+import nba_projection
+
+
+def sheet(text: str, filename: str = "odds.csv", **kw) -> pd.DataFrame:
+    return nba_edges.read_odds(io.StringIO(text), filename, **kw)
+
+
+@pytest.fixture(autouse=True)
+def fresh_params(monkeypatch):
+    # The synthetic logs reuse GAME_IDs, so parameters fitted in another test would look current
+    monkeypatch.setattr(nba_projection, "_params", {})
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return nba_edges.synthetic_sheet(n_rows=1, n_players=6)[1]
+
+
+# ── Import ──────────────────────────────────────────────────────────────────────
+def test_column_and_stat_aliases():
+    odds = sheet(
+        "Participant,Market,Point,American_Odds,Selection,Sportsbook\n"
+        "LeBron James,Points,24.5,-110,Over,A\n"
+        "Luka Doncic,3-Pointers  Made,3.5,+120,Under,B\n"
+        "Nikola Jokić,Pts + Reb + Ast,48.5,-105,under,A\n"
+        "Jayson Tatum,Blocks + Steals,1.5,+100,O,A\n"
+        "Nobody Atall,Fantasy Score,30.5,-110,Over,A\n")
+    assert list(odds.columns) == ["PLAYER", "PLAYER_ID", "STAT", "LINE", "SIDE", "PRICE", "DECIMAL", "BOOK"]
+    assert odds["PLAYER_ID"].tolist()[:4] == ["2544", "1629029", "203999", "1628369"]
+    assert pd.isna(odds["PLAYER_ID"][4])
+    assert odds["STAT"].tolist()[:4] == ["PTS", "FG3M", "PRA", "Stl+Blk"] and pd.isna(odds["STAT"][4])
+    assert odds["SIDE"].tolist() == ["O", "U", "U", "O", "O"]
+    assert odds["BOOK"].tolist() == ["A", "B", "A", "A", "A"]
+    assert odds["LINE"].tolist() == [24.5, 3.5, 48.5, 1.5, 30.5]
+
+
+def test_player_id_column_and_json_wrapper():
+    data = {"props": [{"nba_id": 2544.0, "prop": "Assists", "line": 7.5, "odds": -130},
+                      {"nba_id": 1629029, "prop": "rebounds", "line": 9.5, "odds": 110}]}
+    odds = sheet(json.dumps(data), "odds.json")
+    assert odds["PLAYER_ID"].tolist() == ["2544", "1629029"]
+    assert odds["PLAYER"].tolist() == ["LeBron James", "Luka Dončić"]
+    assert odds["STAT"].tolist() == ["AST", "REB"]
+    assert odds["SIDE"].tolist() == ["O", "O"] and odds["BOOK"].tolist() == ["", ""]
+
+
+def test_missing_columns_are_rejected():
+    with pytest.raises(ValueError, match="price"):
+        sheet("player,stat,line\nLeBron James,PTS,24.5\n")
+    with pytest.raises(ValueError, match="player"):
+        sheet("stat,line,odds\nPTS,24.5,-110\n")
+
+
+def test_lines_outside_the_sane_range_are_missing():
+    odds = sheet("pid,stat,line,odds\n2544,PTS,24.5,-110\n2544,PTS,1e9,-110\n2544,PTS,-2,-110\n"
+                 "2544,PTS,abc,-110\n2544,PTS,0,-110\n")
+    np.testing.assert_array_equal(odds["LINE"], [24.5, np.nan, np.nan, np.nan, 0.0])
+
+
+def test_american_prices():
+    got = nba_edges.to_decimal(pd.Series(["+150", "-110", 100, -100, "-250", " +105 ", "even", "", None]))
+    np.testing.assert_allclose(got, [2.5, 1 + 100 / 110, 2.0, 2.0, 1.4, 2.05] + [np.nan] * 3)
+
+
+def test_decimal_prices():
+    # Values between 1 and 100 read as decimal even without the flag; 1.0 or less pays nothing back
+    np.testing.assert_allclose(nba_edges.to_decimal(pd.Series(["1.91", 2.5, 1.0, 0.5])), [1.91, 2.5, np.nan, np.nan])
+    np.testing.assert_allclose(nba_edges.to_decimal(pd.Series([1.91, 150]), decimal=True), [1.91, 150])
+    odds = sheet("pid,stat,line,decimal_odds\n2544,PTS,24.5,1.87\n")
+    assert odds["DECIMAL"].tolist() == [1.87]
+
+
+# ── Scoring ─────────────────────────────────────────────────────────────────────
+def test_no_vig_on_paired_rows(frame):
+    odds = sheet("pid,stat,line,side,odds,book\n"
+                 "1,PTS,14.5,Over,-120,A\n1,PTS,14.5,Under,+100,A\n"   # both sides at A
+                 "1,PTS,14.5,Over,-110,B\n"                             # one side at B
+                 "1,PTS,15.5,Under,-110,A\n")                           # another line
+    table = nba_edges.score(odds, frame).set_index(["LINE", "SIDE", "BOOK"])
+    over, under = 120 / 220, 100 / 200
+    assert table.loc[(14.5, "O", "A"), "IMPLIED"] == pytest.approx(over)
+    assert table.loc[(14.5, "O", "A"), "NO_VIG"] == pytest.approx(over / (over + under))
+    assert table.loc[(14.5, "U", "A"), "NO_VIG"] == pytest.approx(under / (over + under))
+    for row in [(14.5, "O", "B"), (15.5, "U", "A")]:
+        assert table.loc[row, "NO_VIG"] == pytest.approx(table.loc[row, "IMPLIED"])
+
+
+def test_probabilities_and_ev(frame):
+    odds = sheet("pid,stat,line,side,odds\n2,PTS,14.5,Over,-110\n2,PTS,14.5,Under,-110\n3,PRA,24.5,Over,+130\n")
+    table = nba_edges.score(odds, frame)
+    assert (table["NOTE"] == "").all()
+    frame = frame.assign(PLAYER_ID=frame["PLAYER_ID"].astype(str))
+    projection = nba_projection.project(frame)
+    for row in table.itertuples(index=False):
+        p_over = projection.p_over_at([row.PLAYER_ID], [row.STAT], [row.LINE])[0]
+        hit = nba_hitrate.score_props(frame, [(row.PLAYER_ID, row.STAT, row.LINE)])["avg_o"][0] / 100
+        assert row.P_MODEL == pytest.approx(p_over if row.SIDE == "O" else 1 - p_over)
+        assert row.P_HIT == pytest.approx(hit if row.SIDE == "O" else 1 - hit)
+        decimal = 1 / row.IMPLIED
+        assert row.EV == pytest.approx(row.P_MODEL * decimal - 1)
+        assert row.EV_HIT == pytest.approx(row.P_HIT * decimal - 1)
+        assert row.EDGE == pytest.approx(row.P_MODEL - row.NO_VIG)
+        assert row.GAMES > 0
+    assert table["EV"].is_monotonic_decreasing
+
+
+def test_unpriced_rows_get_a_note(frame):
+    odds = sheet("pid,stat,line,odds\n"
+                 "1,PTS,14.5,-110\n"           # priced
+                 ",PTS,14.5,-110\n"            # no player
+                 "1,Fantasy,14.5,-110\n"       # unknown stat
+                 "1,PTS,,-110\n"               # no line
+                 "1,PTS,400,-110\n"            # line out of range
+                 "1,PTS,14.5,pick\n"           # unreadable price
+                 "999,PTS,14.5,-110\n")        # no logs for the player
+    table = nba_edges.score(odds, frame)
+    assert table["NOTE"].tolist() == ["", "unknown player", "unknown stat", "no line", "no line", "bad price",
+                                      "no games"]
+    assert table.loc[1:, ["P_MODEL", "P_HIT", "EV"]].isna().all().all()
+    assert (table.loc[1:, "GAMES"] == 0).all()
+
+
+def test_empty_sheet(frame):
+    assert list(nba_edges.score(sheet("pid,stat,line,odds\n"), frame).columns) == nba_edges.COLUMNS
@@ -0,0 +1,179 @@
+"""nba_fetch against a local stub of stats.nba.com: retry / backoff on 429 and
+5xx, the request timeout, RateLimiter pacing and fetch_all's fan-out."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from nba_api.stats.endpoints import playerindex
+from nba_api.stats.library.http import NBAStatsHTTP
+
+import nba_fetch
+
+BODY = json.dumps({
+    "resource": "playerindex",
+    "parameters": {},
+    "resultSets": [{"name": "PlayerIndex", "headers": ["PERSON_ID", "POSITION"], "rowSet": [[2544, "F"]]}],
+}).encode()
+
+
+class Stub:
+    """Scripted responses: each request pops the next (status, delay); once the
+    script runs out every request gets `default`. Records arrival times and
+    the most requests in flight at once."""
+
+    def __init__(self):
+        self.script = []
+        self.default = (200, 0.0)
+        self.arrivals = []
+        self.active = self.max_active = 0
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            self.arrivals.append(time.monotonic())
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            return self.script.pop(0) if self.script else self.default
+
+    def done(self):
+        with self._lock:
+            self.active -= 1
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    state = Stub()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, delay = state.next()
+            try:
+                time.sleep(delay)
+                body = BODY if status == 200 else b"<html>Access Denied</html>"
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except OSError:
+                pass   # client gave up (timeout test)
+            finally:
+                state.done()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    monkeypatch.setattr(NBAStatsHTTP, "base_url", f"http://127.0.0.1:{server.server_port}/stats/{{endpoint}}")
+    monkeypatch.setattr(nba_fetch, "_limiter", nba_fetch.RateLimiter(0))   # pacing is tested on its own
+    monkeypatch.setattr(nba_fetch, "BACKOFF", 0.05)
+    monkeypatch.setattr(nba_fetch, "RETRIES", 3)
+    monkeypatch.setattr(nba_fetch, "TIMEOUT", 2.0)
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def fetch_index():
+    return nba_fetch.call(playerindex.PlayerIndex, season="2025-26").get_data_frames()[0]
+
+
+def test_success_needs_one_request(stub):
+    df = fetch_index()
+    assert df["PERSON_ID"].tolist() == [2544]
+    assert len(stub.arrivals) == 1
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retries_with_exponential_backoff(stub, status):
+    stub.script = [(status, 0), (status, 0)]
+    assert fetch_index()["PERSON_ID"].tolist() == [2544]
+    assert len(stub.arrivals) == 3
+    gaps = [b - a for a, b in zip(stub.arrivals, stub.arrivals[1:])]
+    # BACKOFF·2^attempt plus up to BACKOFF of jitter
+    assert 0.05 <= gaps[0] < 0.05 * 2 + 0.1
+    assert 0.10 <= gaps[1] < 0.10 * 2 + 0.1
+
+
+def test_gives_up_after_retries(stub):
+    stub.default = (503, 0)
+    with pytest.raises(Exception):
+        fetch_index()
+    assert len(stub.arrivals) == nba_fetch.RETRIES + 1
+
+
+def test_timeout_is_retried(stub, monkeypatch):
+    monkeypatch.setattr(nba_fetch, "TIMEOUT", 0.2)
+    stub.script = [(200, 1.0)]
+    started = time.monotonic()
+    assert fetch_index()["PERSON_ID"].tolist() == [2544]
+    assert len(stub.arrivals) == 2
+    assert time.monotonic() - started < 1.0   # didn't wait out the slow response
+
+
+def test_timeout_raises_once_retries_run_out(stub, monkeypatch):
+    monkeypatch.setattr(nba_fetch, "TIMEOUT", 0.2)
+    monkeypatch.setattr(nba_fetch, "RETRIES", 1)
+    stub.default = (200, 1.0)
+    with pytest.raises(requests.exceptions.Timeout):
+        fetch_index()
+    assert len(stub.arrivals) == 2
+
+
+def test_rate_limiter_paces_calls():
+    limiter = nba_fetch.RateLimiter(rate=20, burst=1)
+    started = time.monotonic()
+    for _ in range(11):
+        limiter.acquire()
+    # the first token is free, the other 10 arrive every 1/20 s
+    assert 0.45 <= time.monotonic() - started < 0.8
+
+
+def test_rate_limiter_allows_a_burst():
+    limiter = nba_fetch.RateLimiter(rate=5, burst=4)
+    started = time.monotonic()
+    for _ in range(4):
+        limiter.acquire()
+    assert time.monotonic() - started < 0.05
+
+
+def test_concurrent_calls_share_the_limit(stub, monkeypatch):
+    monkeypatch.setattr(nba_fetch, "_limiter", nba_fetch.RateLimiter(rate=10, burst=1))
+    nba_fetch.fetch_all({i: (fetch_index, ()) for i in range(6)})
+    gaps = [b - a for a, b in zip(stub.arrivals, stub.arrivals[1:])]
+    assert len(stub.arrivals) == 6
+    assert min(gaps) > 0.07   # ~1/10 s apart despite six workers
+
+
+def test_fetch_all_fans_out(stub):
+    stub.default = (200, 0.3)
+    started = time.monotonic()
+    results = nba_fetch.fetch_all({i: (fetch_index, ()) for i in range(nba_fetch.MAX_WORKERS)})
+    elapsed = time.monotonic() - started
+    assert all(df["PERSON_ID"].tolist() == [2544] for df in results.values())
+    assert stub.max_active == nba_fetch.MAX_WORKERS
+    assert elapsed < 0.3 * nba_fetch.MAX_WORKERS / 2   # serially it would take 0.3 s × workers
+
+
+def test_fetch_all_maps_failures_to_none(stub):
+    def boom():
+        raise ValueError("upstream")
+
+    results = nba_fetch.fetch_all({"ok": (fetch_index, ()), "bad": (boom, ())})
+    assert results["bad"] is None
+    assert results["ok"]["PERSON_ID"].tolist() == [2544]
+
+
+def test_fetch_all_nested_in_a_worker_runs_inline():
+    # Every worker blocked on a nested fetch_all would deadlock if those tasks were queued
+    inner = {i: (lambda x: x * 2, (i,)) for i in range(3)}
+    outer = {i: (nba_fetch.fetch_all, (inner,)) for i in range(nba_fetch.MAX_WORKERS * 2)}
+    done = []
+    t = threading.Thread(target=lambda: done.append(nba_fetch.fetch_all(outer)), daemon=True)
+    t.start()
+    t.join(timeout=5)
+    assert done and all(r == {0: 0, 1: 2, 2: 4} for r in done[0].values())
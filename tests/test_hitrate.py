@@ -0,0 +1,180 @@
+"""nba_hitrate kernels against the per-window loops they replaced, plus benchmarks.
+
+    python -m pytest tests/test_hitrate.py                      # correctness + timings
+    python -m pytest tests/test_hitrate.py --benchmark-skip     # correctness only
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import nba_hitrate
+
+STATS = ["PTS", "FG3M", "AST", "REB", "Ast+Reb", "STL", "BLK", "TOV", "FGM", "FGA",
+         "FG3A", "2PM", "2PA", "Pts+Reb", "Pts+Ast", "Stl+Blk", "PRA"]
+WINDOWS = (5, 10)
+
+
+def make_logs(games_per_player, seed=0) -> pd.DataFrame:
+    """Stacked logs, newest game first per player, with the box-score columns the app reads."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for p, n in enumerate(games_per_player):
+        frames.append(pd.DataFrame({
+            "PLAYER_ID": str(p),
+            "GAME_DATE_DT": pd.date_range("2025-10-21", periods=n)[::-1],
+            "MIN": rng.normal(28, 6, n).clip(4, 44).round(1),
+            **{c: rng.poisson(lam, n) for c, lam in
+               [("PTS", 15), ("REB", 5), ("AST", 4), ("STL", 1), ("BLK", 1), ("TOV", 2), ("FGM", 6),
+                ("FGA", 13), ("FG3M", 2), ("FG3A", 5)]},
+        }))
+    frame = pd.concat(frames, ignore_index=True)
+    nba_hitrate.add_derived_stats(frame)
+    return frame
+
+
+def loop_summary(pdata: pd.DataFrame, stat: str, line: float) -> dict:
+    """The pin handler's original per-window loop for one stat / line (pdata newest first)."""
+    windows = [w for w in WINDOWS if len(pdata) >= w]
+    over_list = [(pdata.head(w)[stat] > line).mean() * 100 for w in windows]
+    rates = {w: (over_list[windows.index(w)] if w in windows else np.nan) for w in WINDOWS}
+
+    results = (pdata[stat] > line).tolist()
+    streak_over = results[0]
+    streak_count = 0
+    for r in results:
+        if r != streak_over:
+            break
+        streak_count += 1
+
+    arrow = 0
+    if len(pdata) >= 6:
+        l5_avg = pdata.head(5)[stat].mean()
+        l10_avg = pdata.head(10)[stat].mean() if len(pdata) >= 10 else pdata[5:][stat].mean()
+        diff = l5_avg - l10_avg
+        threshold = max(line * 0.08, 0.5)
+        arrow = 1 if diff > threshold else -1 if diff < -threshold else 0
+
+    recent_min = pdata.head(10)
+    slope = np.nan
+    if len(recent_min) >= 3:
+        slope, _ = np.polyfit(np.arange(len(recent_min)), recent_min["MIN"].values, 1)
+    return {
+        "rates": [rates[w] for w in WINDOWS],
+        "avg_o": np.mean(over_list) if over_list else np.nan,
+        "streak_over": streak_over,
+        "streak_count": streak_count,
+        "trend": arrow,
+        "min_avg": recent_min["MIN"].mean(),
+        "min_slope": slope,
+    }
+
+
+@pytest.fixture(scope="module")
+def logs():
+    # Short logs on purpose: under 5, between 5 and 10, and past 10 games
+    return make_logs([3, 5, 6, 8, 9, 10, 12, 25, 60])
+
+
+def player(frame, pid):
+    return frame[frame["PLAYER_ID"] == pid].reset_index(drop=True)
+
+
+def test_summarize_matches_loop(logs):
+    lines = [14.5, 1.5, 3.5, 4.5, 8.5, 0.5, 0.5, 1.5, 5.5, 12.5, 4.5, 3.5, 7.5, 19.5, 18.5, 1.5, 23.5]
+    for pid in logs["PLAYER_ID"].unique():
+        pdata = player(logs, pid)
+        got = nba_hitrate.summarize(pdata, STATS, lines)
+        for i, (stat, line) in enumerate(zip(STATS, lines)):
+            want = loop_summary(pdata, stat, line)
+            np.testing.assert_allclose(got["rates"][i], want["rates"], equal_nan=True, err_msg=f"{pid} {stat}")
+            np.testing.assert_allclose(got["avg_o"][i], want["avg_o"], equal_nan=True)
+            assert bool(got["streak_over"][i]) == want["streak_over"]
+            assert got["streak_count"][i] == want["streak_count"]
+            assert got["trend"][i] == want["trend"], f"{pid} {stat} {line}"
+        np.testing.assert_allclose(got["min_avg"], want["min_avg"])
+        np.testing.assert_allclose(got["min_slope"], want["min_slope"], equal_nan=True, atol=1e-9)
+
+
+def test_hit_rates_match_loop(logs):
+    grid = np.arange(0.5, 30.6, 1.0)
+    keys, values, n_games = nba_hitrate.stack_logs(logs, ["PTS", "PRA"])
+    rates = nba_hitrate.hit_rates(nba_hitrate.over_mask(values, grid), n_games, WINDOWS)
+    for i, pid in enumerate(keys):
+        pdata = player(logs, pid)
+        for s, stat in enumerate(["PTS", "PRA"]):
+            for l, line in enumerate(grid):
+                np.testing.assert_allclose(rates[i, s, l], loop_summary(pdata, stat, line)["rates"], equal_nan=True)
+
+
+def test_score_props_matches_loop(logs):
+    props = [(pid, stat, line) for pid in logs["PLAYER_ID"].unique()
+             for stat, line in [("PTS", 14.5), ("PRA", 24.5), ("FG3M", 1.5), ("Stl+Blk", 2.5)]]
+    props += [("missing", "PTS", 14.5), ("0", "NOT_A_STAT", 1.5)]
+    got = nba_hitrate.score_props(logs, props)
+    for i, (pid, stat, line) in enumerate(props):
+        if pid == "missing" or stat not in logs.columns:
+            assert np.isnan(got["rates"][i]).all() and np.isnan(got["avg_o"][i])
+            continue
+        want = loop_summary(player(logs, pid), stat, line)
+        np.testing.assert_allclose(got["rates"][i], want["rates"], equal_nan=True)
+        np.testing.assert_allclose(got["avg_o"][i], want["avg_o"], equal_nan=True)
+        assert bool(got["streak_over"][i]) == want["streak_over"]
+        assert got["streak_count"][i] == want["streak_count"]
+        assert got["trend"][i] == want["trend"]
+        np.testing.assert_allclose(got["min_avg"][i], want["min_avg"])
+        np.testing.assert_allclose(got["min_slope"][i], want["min_slope"], equal_nan=True, atol=1e-9)
+
+
+def test_score_props_no_matches(logs):
+    got = nba_hitrate.score_props(logs, [("missing", "PTS", 14.5)])
+    assert np.isnan(got["rates"]).all() and not got["streak_count"].any()
+
+
+def test_scan_matches_loop(logs):
+    grid = [2.5, 10.5, 14.5, 24.5]
+    table = nba_hitrate.scan(logs, ["PTS", "PRA", "FG3M"], grid)
+    arrows = {"↓": -1, "→": 0, "↑": 1}
+    # Players with fewer than 5 games have no window → no rows
+    assert set(table["PLAYER_ID"].astype(str)) == {p for p, n in logs["PLAYER_ID"].value_counts().items() if n >= 5}
+    for row in table.itertuples(index=False):
+        want = loop_summary(player(logs, str(row.PLAYER_ID)), str(row.STAT), row.LINE)
+        np.testing.assert_allclose([row.L5, row.L10], want["rates"], equal_nan=True)
+        np.testing.assert_allclose(row.AVG_O, want["avg_o"])
+        assert str(row.STREAK) == f"{'O' if want['streak_over'] else 'U'}{want['streak_count']}"
+        assert arrows[str(row.TREND)] == want["trend"]
+
+
+def test_scan_min_hit_keeps_either_side(logs):
+    full = nba_hitrate.scan(logs, ["PTS"], np.arange(0.5, 40.6, 1.0))
+    kept = nba_hitrate.scan(logs, ["PTS"], np.arange(0.5, 40.6, 1.0), min_hit=80)
+    expected = full[np.maximum(full["AVG_O"], 100 - full["AVG_O"]) >= 80]
+    assert len(kept) == len(expected)
+    np.testing.assert_allclose(kept["AVG_O"].to_numpy(), expected["AVG_O"].to_numpy())
+
+
+# ── Benchmarks (pytest-benchmark) ───────────────────────────────────────────────
+@pytest.fixture(scope="module")
+def slate():
+    return make_logs([60] * 250, seed=1)
+
+
+def test_bench_scan(benchmark, slate):
+    grid = np.arange(0.5, 60.6, 1.0)
+    table = benchmark(nba_hitrate.scan, slate, STATS, grid, min_hit=80)
+    assert len(table)
+
+
+def test_bench_summarize(benchmark, slate):
+    one = player(slate, "0")
+    lines = np.full(len(STATS), 10.5)
+    result = benchmark(nba_hitrate.summarize, one, STATS, lines)
+    assert result["rates"].shape == (len(STATS), len(WINDOWS))
+
+
+def test_bench_score_props(benchmark, slate):
+    # A 50-prop board spread over the slate
+    rng = np.random.default_rng(2)
+    props = [(str(p), STATS[s], float(rng.integers(0, 30)) + 0.5)
+             for p, s in zip(rng.integers(0, 250, 50), rng.integers(0, len(STATS), 50))]
+    result = benchmark(nba_hitrate.score_props, slate, props)
+    assert len(result["avg_o"]) == len(props)
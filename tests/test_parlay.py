@@ -0,0 +1,151 @@
+"""nba_parlay joint probabilities against hand counts, and the beam search against
+an exhaustive one on a small board."""
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import nba_parlay
+
+# Players 1 and 2 are teammates (same ten GAME_IDs); player 3 plays other games
+HIT_1 = [1, 1, 1, 1, 0, 0, 1, 0, 1, 1]   # PTS over 10.5, newest game first
+HIT_2 = [1, 1, 1, 0, 0, 1, 1, 0, 0, 1]   # REB over 4.5
+HIT_3 = [1, 1, 0, 1, 1, 1, 1, 0, 1, 1]   # PTS over 10.5
+
+
+def game_log(pid, games, pts_hits, reb_hits) -> pd.DataFrame:
+    return pd.DataFrame({
+        "PLAYER_ID": pid,
+        "GAME_ID": games,
+        "GAME_DATE_DT": pd.date_range("2026-01-01", periods=len(games))[::-1],
+        "PTS": [15 if h else 5 for h in pts_hits],
+        "REB": [8 if h else 2 for h in reb_hits],
+    })
+
+
+@pytest.fixture(scope="module")
+def frame():
+    shared = [f"g{g}" for g in range(10)]
+    return pd.concat([
+        game_log("1", shared, HIT_1, [1] * 10),
+        game_log("2", shared, [0] * 10, HIT_2),
+        game_log("3", [f"h{g}" for g in range(10)], HIT_3, [0] * 10),
+    ], ignore_index=True)
+
+
+def leg(pid, stat, line, odds="-110"):
+    return {"player_id": pid, "stat": stat, "line": line, "odds": odds}
+
+
+def test_marginals_and_prices(frame):
+    legs = nba_parlay.Legs([leg("1", "PTS", 10.5), leg("2", "REB", 4.5, "+150"), leg("3", "PTS", 10.5, "")], frame)
+    np.testing.assert_allclose(legs.prob, [0.7, 0.6, 0.8])
+    np.testing.assert_allclose(legs.price, [1 + 100 / 110, 2.5, 1.0])
+
+
+def test_skips_unpriceable_legs(frame):
+    board = [leg("1", "PTS", 10.5), leg(None, "PTS", 10.5), leg("1", "PTS", 10.5, "even"),
+             leg("1", "NOT_A_STAT", 1.5), leg("9", "PTS", 10.5)]
+    legs = nba_parlay.Legs(board, frame)
+    assert legs.entries == [board[0]]
+
+
+def test_same_game_legs_use_the_shared_games(frame):
+    legs = nba_parlay.Legs([leg("1", "PTS", 10.5), leg("2", "REB", 4.5)], frame)
+    both = sum(a and b for a, b in zip(HIT_1, HIT_2))   # 5 of the 10 shared games
+    indep = 0.7 * 0.6
+    prob, correlated = legs.joint((0, 1))
+    assert correlated
+    assert prob == pytest.approx((both + nba_parlay.PRIOR_GAMES * indep) / (10 + nba_parlay.PRIOR_GAMES))
+
+
+def test_same_player_legs_are_correlated(frame):
+    legs = nba_parlay.Legs([leg("1", "PTS", 10.5), leg("1", "REB", 4.5)], frame)
+    prob, correlated = legs.joint((0, 1))
+    # REB always hits, so the pair hits exactly when PTS does
+    assert correlated and prob == pytest.approx((7 + nba_parlay.PRIOR_GAMES * 0.7) / (10 + nba_parlay.PRIOR_GAMES))
+
+
+def test_legs_in_different_games_are_independent(frame):
+    legs = nba_parlay.Legs([leg("1", "PTS", 10.5), leg("2", "REB", 4.5), leg("3", "PTS", 10.5)], frame)
+    assert legs.joint((0, 2)) == (pytest.approx(0.7 * 0.8), False)
+    pair, _ = legs.joint((0, 1))
+    prob, correlated = legs.joint((0, 1, 2))
+    assert correlated and prob == pytest.approx(pair * 0.8)
+
+
+def test_two_lines_of_one_stat_are_never_combined(frame):
+    legs = nba_parlay.Legs([leg("1", "PTS", 10.5), leg("1", "PTS", 4.5), leg("1", "REB", 4.5)], frame)
+    assert not legs.compatible((0,), 1)
+    assert legs.compatible((0,), 2) and not legs.compatible((0,), 0)
+
+
+def test_window_limits_the_record(frame):
+    legs = nba_parlay.Legs([leg("1", "PTS", 10.5)], frame, window=5)
+    assert legs.prob[0] == pytest.approx(sum(HIT_1[:5]) / 5)
+
+
+# ── Beam search ─────────────────────────────────────────────────────────────────
+@pytest.fixture(scope="module")
+def slate():
+    """Eight players over four teams (2k and 2k+1 share GAME_IDs), two props each."""
+    rng = np.random.default_rng(0)
+    n_players, n_games = 8, 20
+    frame = pd.DataFrame({
+        "PLAYER_ID": np.repeat([str(p) for p in range(n_players)], n_games),
+        "GAME_ID": [f"g{p // 2}-{g}" for p in range(n_players) for g in range(n_games)],
+        "GAME_DATE_DT": np.tile(pd.date_range("2025-10-21", periods=n_games).values, n_players),
+        "PTS": rng.poisson(18, n_players * n_games),
+        "REB": rng.poisson(6, n_players * n_games),
+    })
+    board = [leg(str(p), stat, line) for p in range(n_players) for stat, line in [("PTS", 15.5), ("REB", 4.5)]]
+    return board, frame
+
+
+def exhaustive(board, frame, min_legs, max_legs, min_leg_prob, min_prob) -> dict:
+    legs = nba_parlay.Legs(board, frame)
+    eligible = [i for i in range(len(legs)) if legs.prob[i] >= min_leg_prob]
+    out = {}
+    for n in range(min_legs, max_legs + 1):
+        for combo in combinations(eligible, n):
+            if all(legs.compatible(combo[:k], combo[k]) for k in range(1, n)):
+                prob, _ = legs.joint(combo)
+                if prob >= min_prob:
+                    out[tuple(sorted((e["player_id"], e["stat"]) for e in (legs.entries[i] for i in combo)))] = prob
+    return out
+
+
+def test_beam_matches_exhaustive_search(slate):
+    board, frame = slate
+    want = exhaustive(board, frame, 2, 3, 0.5, 0.1)
+    got = nba_parlay.build_parlays(board, frame, min_legs=2, max_legs=3, min_prob=0.1, top=10_000)
+    assert len(want) > 20
+    assert len(got) == len(want)
+    for row in got.itertuples(index=False):
+        combo = tuple(sorted((e["player_id"], e["stat"]) for e in row.LEGS))
+        assert row.PROB == pytest.approx(want[combo])
+        assert row.N == len(combo)
+        assert row.EV == pytest.approx(row.PROB * row.PAYOUT - 1)
+    assert got["PROB"].is_monotonic_decreasing
+
+
+def test_beam_keeps_the_top_parlays(slate):
+    board, frame = slate
+    # Not guaranteed in general; on this board the five best pairs all grow from the three best legs
+    want = sorted(exhaustive(board, frame, 2, 2, 0.5, 0.0).values(), reverse=True)[:5]
+    got = nba_parlay.build_parlays(board, frame, min_legs=2, max_legs=2, min_prob=0.0, beam=3, top=5)
+    np.testing.assert_allclose(got["PROB"], want)
+
+
+def test_min_leg_prob_filters_legs(slate):
+    board, frame = slate
+    legs = nba_parlay.Legs(board, frame)
+    rate = {(e["player_id"], e["stat"]): p for e, p in zip(legs.entries, legs.prob)}
+    got = nba_parlay.build_parlays(board, frame, min_leg_prob=0.7, min_prob=0.0)
+    assert len(got)
+    assert all(rate[e["player_id"], e["stat"]] >= 0.7 for legs_ in got["LEGS"] for e in legs_)
+
+
+def test_empty_frame():
+    assert nba_parlay.build_parlays([leg("1", "PTS", 10.5)], pd.DataFrame()).empty
@@ -0,0 +1,201 @@
+"""nba_projection fits and tail probabilities against per-player loops and a direct
+negative-binomial pmf sum, plus benchmarks.
+
+    python -m pytest tests/test_projection.py                      # correctness + timings
+    python -m pytest tests/test_projection.py --benchmark-skip     # correctness only
+"""
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import nba_hitrate
+import nba_projection
+
+COUNTS = [("PTS", 15), ("REB", 5), ("AST", 4), ("STL", 1), ("BLK", 1), ("TOV", 2), ("FGM", 6),
+          ("FGA", 13), ("FG3M", 2), ("FG3A", 5)]
+
+
+def make_logs(games_per_player, seed=0) -> pd.DataFrame:
+    """Stacked logs, newest game first per player, counts scaled by minutes played."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for p, n in enumerate(games_per_player):
+        minutes = rng.normal(28, 6, n).clip(0, 44).round(1)
+        minutes[rng.random(n) < 0.1] = rng.uniform(0, 4, 1)   # a few early exits
+        frames.append(pd.DataFrame({
+            "PLAYER_ID": str(p),
+            "GAME_ID": [f"00225{p:03d}{g:02d}" for g in range(n, 0, -1)],
+            "GAME_DATE_DT": pd.date_range("2025-10-21", periods=n)[::-1],
+            "MIN": minutes,
+            **{c: rng.poisson(lam * minutes / 28) for c, lam in COUNTS},
+        }))
+    frame = pd.concat(frames, ignore_index=True)
+    nba_hitrate.add_derived_stats(frame)
+    return frame
+
+
+def nbinom_cdf(k: int, mu: float, size: float) -> float:
+    """P(X ≤ k) for NegBinomial(mean mu, size) by summing the pmf term by term."""
+    if mu == 0:
+        return 1.0
+    log_p, log_q = math.log(size / (size + mu)), math.log(mu / (size + mu))
+    return sum(math.exp(math.lgamma(i + size) - math.lgamma(size) - math.lgamma(i + 1)
+                        + size * log_p + i * log_q) for i in range(k + 1))
+
+
+def poisson_cdf(k: int, mu: float) -> float:
+    return sum(math.exp(-mu + i * math.log(mu) - math.lgamma(i + 1)) for i in range(k + 1))
+
+
+def loop_fit(pdata: pd.DataFrame, stat: str) -> tuple:
+    """(mu, size, minutes, games) for one player's stat, following the module docstring's formulas."""
+    rows = pdata.head(nba_projection.WINDOW).reset_index(drop=True)
+    num = den = w_sum = 0.0
+    used = []
+    for g, row in rows.iterrows():
+        if not row["MIN"] >= nba_projection.MIN_MINUTES:
+            continue
+        w = 0.5 ** (g / nba_projection.HALF_LIFE)
+        used.append((w, row["MIN"], row[stat]))
+        num, den, w_sum = num + w * row[stat], den + w * row["MIN"], w_sum + w
+    rate, minutes = num / den, den / w_sum
+    spread = sum(w * (x - rate * m) ** 2 for w, m, x in used)
+    expected = sum(w * rate * m for w, m, _ in used)
+    phi = spread / expected if expected else math.nan
+    mu = rate * minutes if len(used) >= nba_projection.MIN_GAMES else math.nan
+    size = mu / (phi - 1) if phi > 1 else nba_projection.MAX_SIZE
+    size = nba_projection.MAX_SIZE if math.isnan(size) else min(max(size, 1e-3), nba_projection.MAX_SIZE)
+    return mu, size, minutes, len(used)
+
+
+@pytest.fixture(scope="module")
+def logs():
+    # Under MIN_GAMES, around it, under and past WINDOW
+    return make_logs([2, 3, 4, 10, 29, 45])
+
+
+def player(frame, pid):
+    return frame[frame["PLAYER_ID"] == pid].reset_index(drop=True)
+
+
+@pytest.mark.parametrize("mu,size", [(0.4, 2.0), (3.0, 0.7), (14.2, 9.5), (27.5, 40.0), (1.5, 1e-3)])
+def test_cdf_table_matches_pmf_sum(mu, size):
+    table = nba_projection.cdf_table(np.array([mu]), np.array([size]), 60)[0]
+    np.testing.assert_allclose(table, [nbinom_cdf(k, mu, size) for k in range(61)], rtol=1e-9, atol=1e-12)
+
+
+def test_cdf_table_at_max_size_is_poisson():
+    mus = np.array([[0.5, 6.0], [18.0, 31.0]])
+    table = nba_projection.cdf_table(mus, np.full(mus.shape, nba_projection.MAX_SIZE), 50)
+    assert table.shape == (2, 2, 51)
+    for (i, j), mu in np.ndenumerate(mus):
+        np.testing.assert_allclose(table[i, j], [poisson_cdf(k, mu) for k in range(51)], atol=1e-4)
+
+
+def test_cdf_table_zero_mean():
+    table = nba_projection.cdf_table(np.array([0.0]), np.array([5.0]), 4)
+    np.testing.assert_allclose(table[0], 1.0)
+
+
+def test_fit_matches_loop(logs):
+    proj = nba_projection.fit(logs)
+    for pid in logs["PLAYER_ID"].unique():
+        pdata = player(logs, pid)
+        i = proj.keys.index(pid)
+        for j, stat in enumerate(proj.stats):
+            mu, size, minutes, games = loop_fit(pdata, stat)
+            np.testing.assert_allclose(proj.mu[i, j], mu, rtol=1e-9, equal_nan=True, err_msg=f"{pid} {stat}")
+            if not math.isnan(mu):
+                np.testing.assert_allclose(proj.size[i, j], size, rtol=1e-9, err_msg=f"{pid} {stat}")
+        np.testing.assert_allclose(proj.minutes[i], minutes, rtol=1e-9)
+        assert proj.games[i] == games
+
+
+def test_fit_needs_min_games(logs):
+    proj = nba_projection.fit(logs)
+    for pid, games in zip(proj.keys, proj.games):
+        assert np.isnan(proj.mu[proj.keys.index(pid)]).all() == (games < nba_projection.MIN_GAMES)
+
+
+def test_p_over_matches_pmf_sum(logs):
+    proj = nba_projection.fit(logs)
+    lines = [0.5, 4.5, 14.5, 22.5]
+    p = proj.p_over(lines)
+    assert p.shape == (len(proj), len(proj.stats), len(lines))
+    for (i, j), mu in np.ndenumerate(proj.mu):
+        if np.isnan(mu):
+            continue
+        for l, line in enumerate(lines):
+            np.testing.assert_allclose(p[i, j, l], 1 - nbinom_cdf(int(line), mu, proj.size[i, j]), atol=1e-9)
+
+
+def test_p_over_at_matches_pmf_sum(logs):
+    proj = nba_projection.fit(logs)
+    rows = [("5", "PTS", 14.5), ("4", "PRA", 24.5), ("5", "FG3M", 0.5), ("3", "Stl+Blk", 2.5),
+            ("5", "PTS", -3.0),               # below zero: every outcome is over
+            ("missing", "PTS", 14.5), ("5", "NOT_A_STAT", 1.5),
+            ("0", "PTS", 9.5)]                # too few games to project
+    got = proj.p_over_at(*zip(*rows))
+    for (key, stat, line), p in zip(rows, got):
+        if key not in proj or stat not in proj.stats or np.isnan(proj.mean(key, stat)):
+            assert np.isnan(p), (key, stat)
+            continue
+        i, j = proj.keys.index(key), proj.stats.index(stat)
+        want = 1 - nbinom_cdf(int(max(line, 0)), proj.mu[i, j], proj.size[i, j])
+        np.testing.assert_allclose(p, want, atol=1e-9, err_msg=f"{key} {stat} {line}")
+
+
+def test_p_over_at_nothing_projected(logs):
+    proj = nba_projection.fit(logs)
+    assert np.isnan(proj.p_over_at(["missing"], ["PTS"], [10.5])).all()
+
+
+def test_fair_odds():
+    np.testing.assert_allclose(nba_projection.fair_odds([0.6, 0.4, 0.5]), [-150, 150, -100])
+    assert np.isnan(nba_projection.fair_odds([0.0, 1.0])).all()
+    assert nba_projection.format_odds(150.2) == "+150" and nba_projection.format_odds(np.nan) == "—"
+
+
+def test_project_matches_fit_and_refits_only_new_games(logs, monkeypatch):
+    monkeypatch.setattr(nba_projection, "_params", {})
+    first = nba_projection.project(logs)
+    fitted = nba_projection.fit(logs)
+    order = [fitted.keys.index(k) for k in first.keys]
+    np.testing.assert_allclose(first.mu, fitted.mu[order], equal_nan=True)
+    np.testing.assert_allclose(first.size, fitted.size[order])
+
+    refit = []
+    real_fit = nba_projection.fit
+    monkeypatch.setattr(nba_projection, "fit", lambda frame, *a: refit.append(set(frame["PLAYER_ID"])) or
+                        real_fit(frame, *a))
+    nba_projection.project(logs)
+    assert refit == []
+    newest = player(logs, "4").head(1).assign(GAME_ID="0022599999", GAME_DATE_DT=pd.Timestamp("2026-03-01"), PTS=40)
+    nba_projection.project(pd.concat([newest, logs], ignore_index=True))
+    assert refit == [{"4"}]
+
+
+# ── Benchmarks (pytest-benchmark) ───────────────────────────────────────────────
+@pytest.fixture(scope="module")
+def slate():
+    return make_logs([60] * 300, seed=1)
+
+
+def test_bench_fit(benchmark, slate):
+    proj = benchmark(nba_projection.fit, slate)
+    assert proj.mu.shape == (300, len(nba_projection.STATS))
+
+
+def test_bench_p_over(benchmark, slate):
+    proj = nba_projection.fit(slate)
+    p = benchmark(proj.p_over, np.arange(0.5, 60.6, 1.0))
+    assert p.shape == (300, len(nba_projection.STATS), 61)
+
+
+def test_bench_project_cached(benchmark, slate, monkeypatch):
+    monkeypatch.setattr(nba_projection, "_params", {})
+    nba_projection.project(slate)
+    proj = benchmark(nba_projection.project, slate)
+    assert len(proj) == 300